@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Author, Genre, Book, BookInstance
+from .models import Author, Genre, Book, BookInstance, Hold
+from .pagination import EstimatedCountPaginator
+from .search import get_search_backend
+
+ADMIN_SEARCH_LIMIT = 1000
 
 
 class BookInstanceInline(admin.TabularInline):
@@ -8,6 +12,9 @@ class BookInstanceInline(admin.TabularInline):
 
 class BookInstanceAdmin(admin.ModelAdmin):
     list_filter = ('status', 'due_back')
+    list_select_related = ('book',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         (None, {
@@ -21,8 +28,32 @@ class BookInstanceAdmin(admin.ModelAdmin):
 
 class BookAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'display_genre')
+    list_select_related = ('author',)
+    search_fields = ('title',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     inlines = [BookInstanceInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('genre')
+
+    def get_search_results(self, request, queryset, search_term):
+        """Look books up in the full-text index instead of icontains."""
+        if not search_term:
+            return queryset, False
+        hits = get_search_backend().search(search_term, ADMIN_SEARCH_LIMIT)
+        return queryset.filter(pk__in=[hit.book_id for hit in hits]), False
+
+
+class HoldAdmin(admin.ModelAdmin):
+    list_display = ('book', 'patron', 'status', 'created_at', 'expires_at')
+    list_filter = ('status',)
+    list_select_related = ('book', 'patron')
+    raw_id_fields = ('book', 'patron', 'copy')
+    # Holds change state through catalog.holds, which keeps the copies in
+    # step; the admin only shows the queues.
+    readonly_fields = ('status', 'copy', 'ready_at', 'expires_at')
+
 
 class AuthorAdmin(admin.ModelAdmin):
     list_display = (
@@ -39,3 +70,4 @@ admin.site.register(Genre)
 admin.site.register(BookInstance, BookInstanceAdmin)
 admin.site.register(Book, BookAdmin)
 admin.site.register(Author, AuthorAdmin)
+admin.site.register(Hold, HoldAdmin)
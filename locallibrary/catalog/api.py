@@ -0,0 +1,305 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import F
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
+
+from catalog import circulation
+from catalog.conditional import book_list_changed, conditional_get
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog.pagination import KeysetPaginator
+from catalog.query_budget import query_budget
+from catalog.search import search_books
+
+SEARCH_RESULT_LIMIT = 20
+MAX_SEARCH_RESULT_LIMIT = 100
+
+
+@require_GET
+@conditional_get(book_list_changed)
+def search_api(request):
+    """Ranked full-text search over the catalog as JSON."""
+    query = request.GET.get('q', '')
+    try:
+        limit = int(request.GET.get('limit', SEARCH_RESULT_LIMIT))
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    limit = min(max(limit, 1), MAX_SEARCH_RESULT_LIMIT)
+
+    results = [
+        {
+            'id': result['book'].pk,
+            'title': result['book'].title,
+            'author': str(result['book'].author or ''),
+            'url': result['book'].get_absolute_url(),
+            'copies_total': result['book'].copies_total,
+            'copies_available': result['book'].copies_available,
+            'rank': result['rank'],
+            'snippet': result['snippet'],
+        }
+        for result in search_books(query, limit=limit)
+    ]
+    return JsonResponse({'query': query, 'results': results})
+
+
+# Read-only catalog API
+
+API_PAGE_SIZE = 50
+MAX_API_PAGE_SIZE = 500
+MAX_BATCH_SIZE = 500
+
+
+class ApiError(ValueError):
+    pass
+
+
+class ApiResource:
+    """One model exposed through resource_api.
+
+    ``fields`` maps each public field name to the ``.values()`` path it is
+    read from; related paths only join when the field is requested.
+    ``lookups`` maps batch query parameters to the model field they match.
+    """
+
+    model = None
+    fields = {}
+    default_fields = ()
+    ordering = ('id',)
+    lookups = {'ids': 'id'}
+    filters = {}
+
+    def parse_fields(self, value):
+        if not value:
+            return list(self.default_fields)
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(f'Unknown fields: {", ".join(unknown)}.')
+        return names
+
+    def parse_values(self, lookup, value):
+        field = self.model._meta.get_field(self.lookups[lookup])
+        keys = [key.strip() for key in value.split(',') if key.strip()]
+        if len(keys) > MAX_BATCH_SIZE:
+            raise ApiError(f'At most {MAX_BATCH_SIZE} {lookup} at a time.')
+        try:
+            return [field.to_python(key) for key in keys]
+        except ValidationError:
+            raise ApiError(f'{lookup} must be a list of {field.name} values.')
+
+    def queryset(self, names, params, keys=()):
+        """Rows as dicts with only the requested columns, filtered.
+
+        ``keys`` names extra columns every row needs, such as the ordering
+        fields for keyset pagination or the batch lookup field.
+        """
+        columns = {}
+        for name in names:
+            if self.fields[name] is not None:
+                columns[name] = self.fields[name]
+        for key in keys:
+            columns.setdefault(key, key)
+        queryset = self.model.objects.values(
+            *[name for name, path in columns.items() if name == path],
+            **{
+                name: F(path)
+                for name, path in columns.items()
+                if name != path
+            },
+        )
+        for param, lookup in self.filters.items():
+            if params.get(param):
+                try:
+                    queryset = queryset.filter(**{lookup: params[param]})
+                except (ValidationError, ValueError):
+                    raise ApiError(f'Invalid {param} filter.')
+        return queryset
+
+    def serialize(self, rows, names):
+        return [{name: row.get(name) for name in names} for row in rows]
+
+
+class BookResource(ApiResource):
+    model = Book
+    fields = {
+        'id': 'id',
+        'title': 'title',
+        'isbn': 'isbn',
+        'summary': 'summary',
+        'author': 'author',
+        'author_first_name': 'author__first_name',
+        'author_last_name': 'author__last_name',
+        'genres': None,
+        'copies_total': 'copies_total',
+        'copies_available': 'copies_available',
+        'updated_at': 'updated_at',
+        'url': None,
+    }
+    default_fields = ('id', 'title', 'isbn', 'author', 'copies_available')
+    ordering = ('title', 'id')
+    lookups = {'ids': 'id', 'isbns': 'isbn'}
+    filters = {'author': 'author'}
+
+    def serialize(self, rows, names):
+        results = super().serialize(rows, names)
+        if 'genres' in names:
+            genres = {}
+            through = Book.genre.through.objects.filter(
+                book_id__in=[row['id'] for row in rows]
+            ).values_list('book_id', 'genre__name').order_by('genre__name')
+            for book_id, genre in through:
+                genres.setdefault(book_id, []).append(genre)
+            for row, result in zip(rows, results):
+                result['genres'] = genres.get(row['id'], [])
+        if 'url' in names:
+            for row, result in zip(rows, results):
+                result['url'] = reverse('book-detail', args=[row['id']])
+        return results
+
+
+class AuthorResource(ApiResource):
+    model = Author
+    fields = {
+        'id': 'id',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'date_of_birth': 'date_of_birth',
+        'date_of_death': 'date_of_death',
+        'updated_at': 'updated_at',
+        'url': None,
+    }
+    default_fields = ('id', 'first_name', 'last_name')
+    ordering = ('last_name', 'first_name', 'id')
+
+    def serialize(self, rows, names):
+        results = super().serialize(rows, names)
+        if 'url' in names:
+            for row, result in zip(rows, results):
+                result['url'] = reverse('author-detail', args=[row['id']])
+        return results
+
+
+class GenreResource(ApiResource):
+    model = Genre
+    fields = {'id': 'id', 'name': 'name'}
+    default_fields = ('id', 'name')
+    ordering = ('name', 'id')
+
+
+class BookInstanceResource(ApiResource):
+    # Borrowers are deliberately not exposed.
+    model = BookInstance
+    fields = {
+        'id': 'id',
+        'book': 'book',
+        'book_title': 'book__title',
+        'imprint': 'imprint',
+        'status': 'status',
+        'due_back': 'due_back',
+    }
+    default_fields = ('id', 'book', 'status', 'due_back')
+    filters = {'book': 'book', 'status': 'status'}
+
+
+RESOURCES = {
+    'books': BookResource(),
+    'authors': AuthorResource(),
+    'genres': GenreResource(),
+    'bookinstances': BookInstanceResource(),
+}
+
+
+def parse_limit(value):
+    try:
+        limit = int(value or API_PAGE_SIZE)
+    except ValueError:
+        raise ApiError('limit must be an integer')
+    return min(max(limit, 1), MAX_API_PAGE_SIZE)
+
+
+@require_GET
+@query_budget(2)
+def resource_api(request, resource):
+    """List, batch-fetch or page through one catalog model as JSON.
+
+    ``?fields=a,b`` selects the fields, ``?ids=1,2`` (or another lookup
+    such as ``?isbns=``) fetches a batch, and otherwise ``?cursor=`` pages
+    through the whole table.
+    """
+    if resource not in RESOURCES:
+        return JsonResponse({'error': f'Unknown resource {resource!r}'},
+                            status=404)
+    api = RESOURCES[resource]
+    try:
+        names = api.parse_fields(request.GET.get('fields'))
+        lookup = next(
+            (lookup for lookup in api.lookups if lookup in request.GET), None
+        )
+        if lookup is not None:
+            keys = api.parse_values(lookup, request.GET[lookup])
+            field = api.lookups[lookup]
+            queryset = api.queryset(names, request.GET, keys=('id', field))
+            rows = {
+                row[field]: row
+                for row in queryset.filter(**{f'{field}__in': keys})
+            }
+            return JsonResponse({
+                'results': api.serialize(
+                    [rows[key] for key in keys if key in rows], names
+                ),
+                'missing': [key for key in keys if key not in rows],
+            })
+
+        queryset = api.queryset(names, request.GET, keys=api.ordering)
+        paginator = KeysetPaginator(
+            queryset, parse_limit(request.GET.get('limit')), api.ordering
+        )
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidPage as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except ApiError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'results': api.serialize(page.object_list, names),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@require_POST
+def circulation_api(request):
+    """Return, renew or lend a batch of scanned copies in one transaction.
+
+    The JSON body has ``action`` (return, renew or lend), ``ids`` (copy
+    UUIDs), and ``due_back`` and ``borrower`` (a username) where the action
+    needs them. The response reports a result for every scanned id.
+    """
+    try:
+        payload = json.loads(request.body)
+        if not isinstance(payload, dict) or not isinstance(
+            payload.get('ids'), list
+        ):
+            raise circulation.CirculationError('ids must be a list.')
+        results = circulation.apply_batch(
+            request.user,
+            payload.get('action'),
+            payload['ids'],
+            due_back=payload.get('due_back'),
+            borrower=payload.get('borrower'),
+        )
+    except ValueError as e:
+        # Covers malformed JSON as well as CirculationError.
+        return JsonResponse({'error': str(e)}, status=400)
+
+    summary = {}
+    for item in results:
+        summary[item['result']] = summary.get(item['result'], 0) + 1
+    forbidden = summary.get(circulation.FORBIDDEN) == len(results)
+    return JsonResponse(
+        {'action': payload['action'], 'results': results,
+         'summary': summary},
+        status=403 if results and forbidden else 200,
+    )
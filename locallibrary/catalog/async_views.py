@@ -0,0 +1,255 @@
+"""Async versions of the catalog read views, for serving under ASGI.
+
+They render the same templates with the same context as the views in
+catalog.views, and are routed instead of them when CATALOG_ASYNC_VIEWS is
+set (see catalog.urls).
+"""
+import functools
+import time
+from contextlib import nullcontext
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404
+from django.template.response import TemplateResponse
+
+from catalog import holds, page_cache
+from catalog.conditional import (
+    alatest_change, aobject_change, auser_state, not_modified_response,
+    set_validators
+)
+from catalog.constants import LoanStatus, PAGINATION_SIZE
+from catalog.loans import aloan_summary
+from catalog.models import Author, Book, BookInstance
+from catalog.pagination import EstimatedCountPaginator, KeysetPaginator
+from catalog.routers import use_primary
+from catalog.stats import aget_catalog_stats
+from catalog.visits import count_visit, remember_visit, visitor_visits
+
+
+def read_view(last_modified=None, page_tags=None):
+    """Async counterpart of PageCacheMixin and ConditionalGetMixin.
+
+    ``last_modified(**kwargs)`` and ``page_tags(context)`` play the parts of
+    get_last_modified() and get_page_cache_tags().
+    """
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            # Resolve the user up front so neither this wrapper nor the
+            # templates touch the session synchronously.
+            request.user = await request.auser()
+            cacheable = page_tags is not None and page_cache.is_cacheable(
+                request
+            )
+            if cacheable:
+                response = await sync_to_async(page_cache.get_cached_page)(
+                    request
+                )
+                if response is not None:
+                    return page_cache.conditional_cached_response(
+                        request, response
+                    )
+
+            started = time.time()
+            changed = None
+            if last_modified and request.method in ('GET', 'HEAD'):
+                changed = await last_modified(**kwargs)
+            if changed is not None:
+                state = await auser_state(request.user)
+                response = not_modified_response(request, changed, state)
+                if response is not None:
+                    return response
+
+            # Pages for the shared cache are read from the primary, as in
+            # PageCacheMixin.
+            with use_primary() if cacheable else nullcontext():
+                response = await view_func(request, *args, **kwargs)
+                if hasattr(response, 'render') and not response.is_rendered:
+                    # The menu's loan count, which the context processor
+                    # would otherwise read with a synchronous query.
+                    if 'loan_summary' not in response.context_data:
+                        response.context_data['loan_summary'] = (
+                            await aloan_summary(request.user)
+                        )
+                    response.render()
+            if changed is not None:
+                set_validators(request, response, changed, state)
+            if (cacheable and response.status_code == 200
+                    and not response.cookies):
+                await sync_to_async(page_cache.cache_page)(
+                    request, response, page_tags(response.context_data),
+                    started,
+                )
+            return response
+        return wrapper
+    return decorator
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+def numbered_page(paginator, number):
+    page = paginator.page(number)
+    page.object_list = list(page.object_list)
+    return page
+
+
+async def paginate(request, queryset, ordering, context_object_name):
+    """Keyset-paginate like KeysetPaginationMixin and build the context."""
+    try:
+        if 'page' in request.GET:
+            # Old numbered links keep working, as with the sync views.
+            paginator = EstimatedCountPaginator(
+                queryset.order_by(*ordering), PAGINATION_SIZE
+            )
+            page = await sync_to_async(numbered_page)(
+                paginator, request.GET['page']
+            )
+        else:
+            paginator = KeysetPaginator(queryset, PAGINATION_SIZE, ordering)
+            page = await paginator.apage(request.GET.get('cursor'))
+    except InvalidPage as e:
+        raise Http404(str(e))
+    return {
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'object_list': page.object_list,
+        context_object_name: page.object_list,
+    }
+
+
+@read_view()
+async def index(request):
+    """View function for home page of site."""
+    stats = await aget_catalog_stats()
+
+    num_visits = visitor_visits(request)
+    await sync_to_async(count_visit)()
+
+    context = {
+        'num_books': stats.num_books,
+        'num_instances': stats.num_instances,
+        'num_instances_available': stats.num_instances_available,
+        'num_authors': stats.num_authors,
+        'num_visits': num_visits,
+        'num_total_visits': stats.num_visits,
+    }
+    response = TemplateResponse(request, 'index.html', context)
+    return remember_visit(response, num_visits)
+
+
+async def book_list_changed():
+    return await alatest_change(Book)
+
+
+@read_view(book_list_changed, page_cache.book_list_tags)
+async def book_list(request):
+    context = await paginate(
+        request,
+        Book.objects.select_related('author'),
+        ('title', 'id'),
+        'book_list',
+    )
+    return TemplateResponse(request, 'catalog/book_list.html', context)
+
+
+async def book_changed(pk):
+    return await aobject_change(Book, pk)
+
+
+@read_view(book_changed, page_cache.book_detail_tags)
+async def book_detail(request, pk):
+    try:
+        book = await Book.objects.select_related('author').prefetch_related(
+            'genre'
+        ).aget(pk=pk)
+    except Book.DoesNotExist:
+        raise Http404('No book found matching the query')
+    book_instances = await alist(BookInstance.objects.filter(book_id=pk))
+    can_mark_returned = await request.user.ahas_perm(
+        'catalog.can_mark_returned'
+    )
+
+    for copy in book_instances:
+        copy.is_available = (copy.status == LoanStatus.AVAILABLE.value)
+
+    context = {
+        'object': book,
+        'book': book,
+        'book_instances': book_instances,
+        'can_mark_returned': can_mark_returned,
+    }
+    return TemplateResponse(request, 'catalog/book_detail.html', context)
+
+
+async def author_list_changed():
+    return await alatest_change(Author)
+
+
+@read_view(author_list_changed, page_cache.author_list_tags)
+async def author_list(request):
+    context = await paginate(
+        request,
+        Author.objects.all(),
+        ('last_name', 'first_name', 'id'),
+        'author_list',
+    )
+    context['can_add_author'] = await request.user.ahas_perm(
+        'catalog.can_add_author'
+    )
+    return TemplateResponse(request, 'catalog/author_list.html', context)
+
+
+async def author_changed(pk):
+    return await aobject_change(Author, pk)
+
+
+@read_view(author_changed, page_cache.author_detail_tags)
+async def author_detail(request, pk):
+    try:
+        author = await Author.objects.aget(pk=pk)
+    except Author.DoesNotExist:
+        raise Http404('No author found matching the query')
+    book_set = await alist(
+        Book.objects.filter(author_id=pk).order_by('title')
+    )
+    can_update = await request.user.ahas_perm('catalog.change_author')
+    can_delete = await request.user.ahas_perm('catalog.delete_author')
+
+    context = {
+        'object': author,
+        'author': author,
+        'book_set': book_set,
+        'can_update_author': can_update,
+        'can_delete_author': can_delete,
+    }
+    return TemplateResponse(request, 'catalog/author_detail.html', context)
+
+
+@read_view()
+async def loaned_books_by_user(request):
+    """Return the books on loan to the current user."""
+    if not request.user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    summary = await aloan_summary(request.user)
+    paginator = Paginator(summary.loans, PAGINATION_SIZE)
+    try:
+        page = paginator.page(request.GET.get('page') or 1)
+    except InvalidPage as e:
+        raise Http404(str(e))
+    context = {
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'object_list': page.object_list,
+        'bookinstance_list': page.object_list,
+        'loan_summary': summary,
+    }
+    context['holds'] = await alist(holds.patron_holds(request.user))
+    return TemplateResponse(
+        request, 'catalog/bookinstance_list_borrowed_user.html', context
+    )
@@ -0,0 +1,78 @@
+"""Permission checks answered from the shared cache.
+
+ModelBackend loads a user's permissions, their own and their groups', with
+two queries and keeps them on the user object, which only lives for one
+request. CachedPermissionBackend keeps the loaded set in the cache under
+the user's id and a permissions version token. catalog.signals replaces
+the token whenever a user's groups, permissions, superuser or active flag,
+or a group's permissions, change, so a revoked permission stops working
+on the next check in every process.
+
+Enable it with PERMISSION_CACHE only when the cache is shared by all
+workers (Redis); a per-process cache would miss other workers' changes.
+"""
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+
+from catalog.routers import use_primary
+
+VERSION_KEY = 'perms:version'
+
+
+def permissions_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # add() keeps a token that a concurrent change has just set.
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def replace_version():
+    # A fresh random token, not a counter, so that a token lost to
+    # eviction never comes back with a value old entries were stored under.
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_permissions():
+    """Forget every cached permission set.
+
+    The token is replaced at once and again on commit, in case another
+    request cached the old permissions under the new token in between.
+    """
+    replace_version()
+    transaction.on_commit(replace_version)
+
+
+def permissions_key(user_id):
+    return f'perms:{permissions_version()}:{user_id}'
+
+
+class CachedPermissionBackend(ModelBackend):
+
+    def get_all_permissions(self, user_obj, obj=None):
+        cacheable = (
+            getattr(settings, 'PERMISSION_CACHE', False)
+            and obj is None
+            and user_obj.is_active
+            and not user_obj.is_anonymous
+            and not hasattr(user_obj, '_perm_cache')
+        )
+        if cacheable:
+            key = permissions_key(user_obj.pk)
+            perms = cache.get(key)
+            if perms is None:
+                # From the primary, not a replica that may not have the
+                # change that invalidated the entry yet.
+                with use_primary():
+                    perms = super().get_all_permissions(user_obj)
+                cache.set(
+                    key, perms,
+                    getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 3600),
+                )
+            user_obj._perm_cache = perms
+        return super().get_all_permissions(user_obj, obj)
@@ -0,0 +1,300 @@
+import datetime
+import uuid
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from catalog import holds
+from catalog.constants import HoldStatus, LoanStatus
+from catalog.models import BookInstance, Hold
+from catalog.signals import instances_transitioned
+
+RETURN = 'return'
+RENEW = 'renew'
+LEND = 'lend'
+ACTIONS = (RETURN, RENEW, LEND)
+MAX_BATCH_SIZE = 1000
+LOAN_WEEKS = 3
+MAX_LOAN_WEEKS = 4
+# Times checkout_any() picks again after losing a copy to another desk.
+CHECKOUT_ATTEMPTS = 5
+
+# Statuses a copy must have for each action to apply to it.
+ELIGIBLE = {
+    RETURN: {LoanStatus.ON_LOAN.value},
+    RENEW: {LoanStatus.ON_LOAN.value},
+    LEND: {LoanStatus.AVAILABLE.value, LoanStatus.RESERVED.value},
+}
+
+OK = 'ok'
+INVALID = 'invalid'
+NOT_FOUND = 'not_found'
+WRONG_STATUS = 'wrong_status'
+FORBIDDEN = 'forbidden'
+# Lent to someone other than the patron whose hold reserved the copy.
+HELD = 'held'
+
+
+class CirculationError(ValueError):
+    pass
+
+
+def validate_due_date(value):
+    """Apply the renewal form's rule: today to four weeks ahead."""
+    if isinstance(value, str):
+        try:
+            value = datetime.date.fromisoformat(value)
+        except ValueError:
+            raise CirculationError('due_back must be a YYYY-MM-DD date.')
+    elif not isinstance(value, datetime.date):
+        raise CirculationError('due_back must be a YYYY-MM-DD date.')
+    today = datetime.date.today()
+    if value < today:
+        raise CirculationError('due_back is in the past.')
+    if value > today + datetime.timedelta(weeks=MAX_LOAN_WEEKS):
+        raise CirculationError('due_back is more than 4 weeks ahead.')
+    return value
+
+
+def parse_ids(values):
+    """Map each scanned value to its UUID, or None if it is unreadable."""
+    parsed = {}
+    for value in values:
+        try:
+            parsed[value] = uuid.UUID(value)
+        except ValueError:
+            parsed[value] = None
+    return parsed
+
+
+def get_borrower(value):
+    if not isinstance(value, str):
+        raise CirculationError('borrower must be a username.')
+    try:
+        return User.objects.get(username=value, is_active=True)
+    except User.DoesNotExist:
+        raise CirculationError(f'Unknown borrower {value!r}.')
+
+
+def loan_changes(borrower, due_back=None):
+    """The fields a copy lent to ``borrower`` is updated with."""
+    return {
+        'status': LoanStatus.ON_LOAN.value,
+        'borrower': borrower,
+        'due_back': validate_due_date(
+            due_back or datetime.date.today()
+            + datetime.timedelta(weeks=LOAN_WEEKS)
+        ),
+    }
+
+
+def apply_batch(user, action, values, due_back=None, borrower=None):
+    """Apply one action to a batch of copies and report on each of them.
+
+    Everything happens in one transaction: a locking SELECT of the
+    scanned copies, then a single UPDATE for those in the right status.
+    Returns a list of ``{'id': ..., 'result': ...}`` in scan order.
+    """
+    if action not in ACTIONS:
+        raise CirculationError(f'Unknown action {action!r}.')
+    if len(values) > MAX_BATCH_SIZE:
+        raise CirculationError(f'At most {MAX_BATCH_SIZE} copies at a time.')
+    values = list(dict.fromkeys(str(value) for value in values))
+    if not user.has_perm('catalog.can_mark_returned'):
+        return [{'id': value, 'result': FORBIDDEN} for value in values]
+
+    changes = {'updated_at': timezone.now()}
+    if action == RETURN:
+        changes.update(
+            status=LoanStatus.AVAILABLE.value, borrower=None, due_back=None
+        )
+    elif action == RENEW:
+        if due_back is None:
+            raise CirculationError('renew needs due_back.')
+        changes['due_back'] = validate_due_date(due_back)
+    else:
+        if borrower is None:
+            raise CirculationError('lend needs a borrower.')
+        changes.update(loan_changes(get_borrower(borrower), due_back))
+
+    parsed = parse_ids(values)
+    ids = list(dict.fromkeys(pk for pk in parsed.values() if pk))
+    results = {}
+    with transaction.atomic():
+        copies = {
+            copy['id']: copy
+            for copy in BookInstance.objects.select_for_update().filter(
+                pk__in=ids
+            ).values('id', 'book_id', 'status', 'borrower_id')
+        }
+        eligible = []
+        for copy_id in ids:
+            copy = copies.get(copy_id)
+            if copy is None:
+                results[copy_id] = NOT_FOUND
+            elif copy['status'] not in ELIGIBLE[action]:
+                results[copy_id] = WRONG_STATUS
+            else:
+                results[copy_id] = OK
+                eligible.append(copy)
+
+        if action == LEND:
+            kept = holds.reserved_for_others(
+                [
+                    copy['id'] for copy in eligible
+                    if copy['status'] == LoanStatus.RESERVED.value
+                ],
+                changes['borrower'].pk,
+            )
+            for copy_id in kept:
+                results[copy_id] = HELD
+            eligible = [copy for copy in eligible if copy['id'] not in kept]
+
+        if eligible:
+            BookInstance.objects.filter(
+                pk__in=[copy['id'] for copy in eligible]
+            ).update(**changes)
+            # update() sends no model signals; this one keeps counters,
+            # cached pages and timestamps in step.
+            instances_transitioned.send(
+                sender=BookInstance,
+                transitions=[
+                    (copy['book_id'], copy['status'],
+                     changes.get('status', copy['status']))
+                    for copy in eligible
+                ],
+                borrower_ids={
+                    copy['borrower_id'] for copy in eligible
+                } | {getattr(changes.get('borrower'), 'pk', None)},
+            )
+            if action == LEND:
+                holds.fulfil_holds(
+                    changes['borrower'].pk,
+                    [(copy['id'], copy['book_id']) for copy in eligible],
+                )
+    return [
+        {'id': value, 'result': results.get(parsed[value], INVALID)}
+        for value in values
+    ]
+
+
+# Single-copy operations for the desk views. Each is one conditional
+# UPDATE that writes only the changed columns of a copy still in the
+# status the operation expects, so when two desks race exactly one of
+# them wins and the other is told so instead of overwriting the change.
+
+def change_copy(copy_id, from_status, changes, book_id=None,
+                borrower_id=None):
+    """Apply ``changes`` to the copy if it is still in ``from_status``.
+
+    ``book_id`` and ``borrower_id`` are the copy's book and its borrower
+    before the change; callers that pass the book pass the borrower they
+    read with it, which saves a query.
+    Returns the copy's book id if this call made the change, else None.
+    """
+    changes = dict(changes, updated_at=timezone.now())
+    # No savepoint inside a caller's transaction: nothing here is rolled
+    # back on its own.
+    with transaction.atomic(savepoint=False):
+        if book_id is None:
+            row = BookInstance.objects.filter(
+                pk=copy_id, status=from_status
+            ).values_list('book_id', 'borrower_id').first()
+            if row is None:
+                return None
+            book_id, borrower_id = row
+        if not BookInstance.objects.filter(
+            pk=copy_id, status=from_status
+        ).update(**changes):
+            return None
+        # Sent for a renewal too: the due date shows on the book's page
+        # and in the borrower's loan summary.
+        instances_transitioned.send(
+            sender=BookInstance,
+            transitions=[
+                (book_id, from_status, changes.get('status', from_status))
+            ],
+            borrower_ids={
+                borrower_id, getattr(changes.get('borrower'), 'pk', None)
+            },
+        )
+    return book_id
+
+
+def return_copy(copy_id, book_id=None, borrower_id=None):
+    """Check a copy on loan back in. Returns whether this call did it."""
+    return change_copy(copy_id, LoanStatus.ON_LOAN.value, {
+        'status': LoanStatus.AVAILABLE.value,
+        'borrower': None,
+        'due_back': None,
+    }, book_id, borrower_id) is not None
+
+
+def renew_copy(copy_id, due_back, book_id=None, borrower_id=None):
+    """Move the due date of a copy on loan. Returns whether it was."""
+    return change_copy(copy_id, LoanStatus.ON_LOAN.value, {
+        'due_back': validate_due_date(due_back),
+    }, book_id, borrower_id) is not None
+
+
+def checkout_copy(copy_id, borrower, due_back=None, book_id=None):
+    """Lend one copy to ``borrower``. Returns whether this call did it.
+
+    A copy reserved by a hold can only be lent to the hold's patron.
+    """
+    changes = loan_changes(borrower, due_back)
+    with transaction.atomic():
+        book_id = change_copy(
+            copy_id, LoanStatus.AVAILABLE.value, changes, book_id
+        )
+        if book_id is None and Hold.objects.filter(
+            copy_id=copy_id, patron=borrower,
+            status=HoldStatus.READY.value,
+        ).exists():
+            book_id = change_copy(
+                copy_id, LoanStatus.RESERVED.value, changes
+            )
+        if book_id is None:
+            return False
+        holds.fulfil_holds(borrower.pk, [(copy_id, book_id)])
+    return True
+
+
+def pick_available(book_id):
+    """Lock one available copy of a book and return its id, or None."""
+    available = BookInstance.objects.filter(
+        book_id=book_id, status=LoanStatus.AVAILABLE.value
+    )
+    # With SKIP LOCKED each desk takes the first copy no other desk has
+    # locked; without it a random pick keeps desks mostly apart.
+    if connection.features.has_select_for_update_skip_locked:
+        available = available.order_by('pk')
+    else:
+        available = available.order_by('?')
+    return holds.locked(available).values_list('pk', flat=True).first()
+
+
+def checkout_any(book_id, borrower, due_back=None):
+    """Lend ``borrower`` any available copy of a book.
+
+    The copy is picked with SELECT ... FOR UPDATE SKIP LOCKED, so desks
+    checking out the same title take different copies without waiting on
+    each other, and lent by the same conditional UPDATE as checkout_copy().
+    A desk that still loses a copy, on databases without SKIP LOCKED,
+    picks again. Returns the id of the copy lent, or None if none was
+    available.
+    """
+    changes = loan_changes(borrower, due_back)
+    for _ in range(CHECKOUT_ATTEMPTS):
+        with transaction.atomic():
+            copy_id = pick_available(book_id)
+            if copy_id is None:
+                return None
+            if change_copy(
+                copy_id, LoanStatus.AVAILABLE.value, changes, book_id
+            ) is None:
+                continue
+            holds.fulfil_holds(borrower.pk, [(copy_id, book_id)])
+        return copy_id
+    return None
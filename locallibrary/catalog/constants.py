@@ -13,4 +13,17 @@ class LoanStatus(Enum):
     AVAILABLE = 'a'
     RESERVED = 'r'
 
+
+class HoldStatus(Enum):
+    WAITING = 'w'
+    READY = 'r'
+    FULFILLED = 'f'
+    CANCELLED = 'c'
+    EXPIRED = 'e'
+
+
+# Holds still in a book's queue; a patron has at most one per book.
+ACTIVE_HOLD_STATUSES = (HoldStatus.WAITING.value, HoldStatus.READY.value)
+
+
 PAGINATION_SIZE = 10
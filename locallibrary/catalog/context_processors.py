@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
+from catalog.loans import loan_summary
+
+
+def loans(request):
+    """The user's loan summary for the menu, read only if a page shows it.
+
+    Views that already have the summary put it in their own context, which
+    takes precedence over this one.
+    """
+    return {
+        'loan_summary': SimpleLazyObject(lambda: loan_summary(request.user)),
+    }
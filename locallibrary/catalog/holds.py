@@ -0,0 +1,247 @@
+"""Hold queues: patrons waiting for a copy of a book.
+
+A copy that becomes available goes to the oldest waiting hold on its
+book: the copy is set to RESERVED and the hold to READY until the patron
+borrows it or ``HOLD_PICKUP_DAYS`` pass, when it moves on to the next
+patron in the queue.
+
+Allocation locks rows with SELECT ... FOR UPDATE SKIP LOCKED, so
+concurrent returns of a popular book each take different waiting holds
+and copies instead of queueing behind one row lock. Every UPDATE also
+re-checks the status it expects, so on databases without SKIP LOCKED a
+hold or copy is still never allocated twice.
+"""
+import datetime
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from catalog.constants import HoldStatus, LoanStatus
+from catalog.models import BookInstance, Hold
+from catalog.signals import instances_transitioned
+
+WAITING = HoldStatus.WAITING.value
+READY = HoldStatus.READY.value
+AVAILABLE = LoanStatus.AVAILABLE.value
+RESERVED = LoanStatus.RESERVED.value
+# Copies handed out by one allocate() call.
+MAX_ALLOCATION = 100
+BATCH_SIZE = 500
+
+
+class HoldError(ValueError):
+    pass
+
+
+def locked(queryset):
+    """Lock the selected rows, skipping those other transactions hold."""
+    if connection.features.has_select_for_update_skip_locked:
+        return queryset.select_for_update(skip_locked=True)
+    return queryset.select_for_update()
+
+
+def place_hold(patron, book):
+    """Queue ``patron`` for ``book`` and return the new hold.
+
+    The patron's user row is locked while the check and insert run, so
+    two requests from the same patron cannot both pass the check. The
+    partial unique constraint backs this up where the database enforces
+    it; MySQL does not.
+    """
+    try:
+        with transaction.atomic():
+            User.objects.select_for_update().filter(pk=patron.pk).first()
+            if Hold.objects.active().filter(
+                book=book, patron=patron
+            ).exists():
+                raise HoldError('You already have a hold on this book.')
+            hold = Hold.objects.create(book=book, patron=patron)
+    except IntegrityError:
+        raise HoldError('You already have a hold on this book.')
+    # A copy may be on the shelf already.
+    allocate_on_commit([book.pk])
+    return hold
+
+
+def cancel_hold(patron, hold_id):
+    """Cancel one of ``patron``'s active holds, freeing its copy."""
+    with transaction.atomic():
+        hold = Hold.objects.active().select_for_update().filter(
+            pk=hold_id, patron=patron
+        ).first()
+        if hold is None:
+            raise HoldError('No such hold.')
+        Hold.objects.filter(pk=hold.pk).update(
+            status=HoldStatus.CANCELLED.value
+        )
+        if hold.status == READY:
+            release_copies([(hold.copy_id, hold.book_id)])
+    return hold
+
+
+def allocate(book_id):
+    """Reserve available copies of a book for its oldest waiting holds.
+
+    Returns the ids of the holds that became ready.
+    """
+    now = timezone.now()
+    expires_at = now + datetime.timedelta(
+        days=getattr(settings, 'HOLD_PICKUP_DAYS', 7)
+    )
+    ready = []
+    waiting = Hold.objects.filter(book_id=book_id, status=WAITING)
+    # In a transaction so that the reads go to the primary.
+    with transaction.atomic():
+        if not waiting.exists():
+            # The usual case; a hold placed meanwhile runs its own
+            # allocate().
+            return ready
+        # Copies first: each returned copy is either seen here or by the
+        # allocate() run of whoever holds its lock.
+        copies = list(locked(BookInstance.objects.filter(
+            book_id=book_id, status=AVAILABLE
+        )).order_by('pk').values_list('pk', flat=True)[:MAX_ALLOCATION])
+        if not copies:
+            return ready
+        holds = list(locked(waiting).order_by(
+            'created_at', 'id'
+        ).values_list('pk', flat=True)[:len(copies)])
+
+        for hold_id, copy_id in zip(holds, copies):
+            if not BookInstance.objects.filter(
+                pk=copy_id, status=AVAILABLE
+            ).update(status=RESERVED, updated_at=now):
+                continue
+            if not Hold.objects.filter(pk=hold_id, status=WAITING).update(
+                status=READY, copy_id=copy_id, ready_at=now,
+                expires_at=expires_at,
+            ):
+                BookInstance.objects.filter(pk=copy_id).update(
+                    status=AVAILABLE
+                )
+                continue
+            ready.append(hold_id)
+
+        if ready:
+            instances_transitioned.send(
+                sender=BookInstance,
+                transitions=[(book_id, AVAILABLE, RESERVED)] * len(ready),
+            )
+    return ready
+
+
+def allocate_on_commit(book_ids):
+    """Run allocate() for each book once the current transaction commits.
+
+    Outside a transaction it runs straight away.
+    """
+    for book_id in book_ids:
+        transaction.on_commit(partial(allocate, book_id))
+
+
+def release_copies(copies):
+    """Put reserved copies back on the shelf for the next hold.
+
+    ``copies`` lists ``(copy_id, book_id)`` pairs.
+    """
+    released = [
+        (copy_id, book_id) for copy_id, book_id in copies
+        if BookInstance.objects.filter(pk=copy_id, status=RESERVED).update(
+            status=AVAILABLE, updated_at=timezone.now()
+        )
+    ]
+    if released:
+        instances_transitioned.send(
+            sender=BookInstance,
+            transitions=[
+                (book_id, RESERVED, AVAILABLE) for _, book_id in released
+            ],
+        )
+
+
+def patron_holds(patron):
+    """The patron's active holds with their places in the queues."""
+    return Hold.objects.active().filter(patron=patron).select_related(
+        'book'
+    ).annotate_position()
+
+
+def reserved_for_others(copy_ids, patron_id):
+    """The copies among ``copy_ids`` that are kept for another patron."""
+    if not copy_ids:
+        return set()
+    return set(Hold.objects.filter(
+        copy_id__in=copy_ids, status=READY
+    ).exclude(patron_id=patron_id).values_list('copy_id', flat=True))
+
+
+def fulfil_holds(patron_id, copies):
+    """Close the patron's holds on the books just lent to them.
+
+    ``copies`` lists the ``(copy_id, book_id)`` pairs lent. A ready hold
+    that kept a different copy of one of those books gives it back.
+    """
+    lent = {copy_id for copy_id, _ in copies}
+    holds = list(Hold.objects.active().select_for_update().filter(
+        patron_id=patron_id, book_id__in={book_id for _, book_id in copies},
+    ).values_list('pk', 'copy_id', 'book_id'))
+    if not holds:
+        return
+    Hold.objects.filter(pk__in=[pk for pk, _, _ in holds]).update(
+        status=HoldStatus.FULFILLED.value
+    )
+    release_copies([
+        (copy_id, book_id) for _, copy_id, book_id in holds
+        if copy_id is not None and copy_id not in lent
+    ])
+
+
+def expire_holds(now=None, batch_size=BATCH_SIZE):
+    """Expire ready holds that were not collected in time.
+
+    Their copies go to the next patron in each queue. Returns the number
+    of holds expired.
+    """
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            holds = list(locked(Hold.objects.filter(
+                status=READY, expires_at__lt=now
+            )).order_by('expires_at', 'id').values_list(
+                'pk', 'copy_id', 'book_id'
+            )[:batch_size])
+            if not holds:
+                return expired
+            Hold.objects.filter(pk__in=[pk for pk, _, _ in holds]).update(
+                status=HoldStatus.EXPIRED.value
+            )
+            release_copies([
+                (copy_id, book_id) for _, copy_id, book_id in holds
+                if copy_id is not None
+            ])
+        expired += len(holds)
+
+
+# A copy becoming available goes to the book's queue. The allocation runs
+# after the change commits, so it never extends the lending transaction.
+
+@receiver(post_save, sender=BookInstance)
+def allocate_saved_copy(sender, instance, created, raw=False, **kwargs):
+    if raw or instance.status != AVAILABLE:
+        return
+    if created or instance.loaded_value('status') != AVAILABLE:
+        allocate_on_commit([instance.book_id])
+
+
+@receiver(instances_transitioned)
+def allocate_transitioned_copies(sender, transitions, **kwargs):
+    allocate_on_commit({
+        book_id for book_id, old, new in transitions
+        if new == AVAILABLE and old != AVAILABLE
+    })
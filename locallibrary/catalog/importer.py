@@ -0,0 +1,282 @@
+import csv
+import json
+import uuid
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from catalog import page_cache, search
+from catalog.constants import (
+    MAX_LENGTH_AUTHOR_NAME,
+    MAX_LENGTH_ISBN,
+    MAX_LENGTH_NAME,
+    MAX_LENGTH_SUMMARY,
+    LoanStatus,
+)
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog.signals import touch_authors
+from catalog.stats import STATUS_COUNTERS, adjust_catalog_stats
+
+STATUSES = {status.value for status in LoanStatus}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def read_csv(stream):
+    """Yield records from CSV with a header row; genres are ;-separated."""
+    for row in csv.DictReader(stream):
+        yield row
+
+
+def read_jsonl(stream):
+    """Yield one record per non-blank JSON Lines line."""
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def text_field(record, name, default=''):
+    """A string field of the record; JSON Lines may hold any type."""
+    value = record.get(name) or default
+    if not isinstance(value, str):
+        raise ImportRowError(f'{name} must be a string')
+    return value
+
+
+def clean_record(record):
+    """Normalize an input record into the fields the importer uses."""
+    if not isinstance(record, dict):
+        raise ImportRowError('record must be an object')
+    isbn = text_field(record, 'isbn').strip()
+    title = text_field(record, 'title').strip()
+    if not isbn or not title:
+        raise ImportRowError('isbn and title are required')
+    if len(isbn) > MAX_LENGTH_ISBN:
+        raise ImportRowError(f'isbn {isbn!r} is too long')
+
+    genres = record.get('genres') or []
+    if isinstance(genres, str):
+        genres = genres.split(';')
+    elif not (
+        isinstance(genres, list)
+        and all(isinstance(name, str) for name in genres)
+    ):
+        raise ImportRowError('genres must be a string or a list of strings')
+    genres = sorted({
+        name.strip()[:MAX_LENGTH_NAME] for name in genres if name.strip()
+    })
+
+    status = text_field(
+        record, 'status', LoanStatus.AVAILABLE.value
+    ).strip()
+    if status not in STATUSES:
+        raise ImportRowError(f'unknown status {status!r}')
+    try:
+        copies = int(record.get('copies') or 0)
+    except (TypeError, ValueError):
+        raise ImportRowError('copies must be a number')
+
+    first_name = text_field(record, 'author_first_name').strip()
+    last_name = text_field(record, 'author_last_name').strip()
+    return {
+        'isbn': isbn,
+        'title': title[:MAX_LENGTH_NAME],
+        'summary': text_field(record, 'summary')[:MAX_LENGTH_SUMMARY],
+        'author': (
+            (
+                first_name[:MAX_LENGTH_AUTHOR_NAME],
+                last_name[:MAX_LENGTH_AUTHOR_NAME],
+            )
+            if first_name or last_name else None
+        ),
+        'genres': genres,
+        'copies': max(copies, 0),
+        'imprint': text_field(record, 'imprint')[:MAX_LENGTH_NAME],
+        'status': status,
+    }
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    books: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    authors: int = 0
+    genres: int = 0
+    copies: int = 0
+    errors: list = field(default_factory=list)
+
+
+class CatalogImporter:
+    """Load books, authors, genres and copies with batched bulk inserts.
+
+    Authors and genres are resolved through in-memory maps that are
+    loaded once and extended as new ones are created, and books whose
+    ISBN already exists are skipped, so re-running an import is safe.
+    Each batch is committed in its own transaction.
+    """
+
+    max_errors_kept = 20
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.stats = ImportStats()
+        self.authors = {
+            (first_name, last_name): pk
+            for pk, first_name, last_name in Author.objects.values_list(
+                'pk', 'first_name', 'last_name'
+            ).iterator()
+        }
+        self.genres = dict(
+            Genre.objects.values_list('name', 'pk').iterator()
+        )
+
+    def import_batch(self, records, first_row=0):
+        """Import one batch of raw records in a single transaction."""
+        cleaned = []
+        for offset, record in enumerate(records):
+            self.stats.rows += 1
+            try:
+                cleaned.append(clean_record(record))
+            except ImportRowError as e:
+                self.stats.invalid += 1
+                if len(self.stats.errors) < self.max_errors_kept:
+                    self.stats.errors.append(f'row {first_row + offset}: {e}')
+
+        with transaction.atomic():
+            self._insert(cleaned)
+
+    def _insert(self, cleaned):
+        existing = set(
+            Book.objects.filter(
+                isbn__in=[row['isbn'] for row in cleaned]
+            ).values_list('isbn', flat=True)
+        )
+        rows = []
+        for row in cleaned:
+            if row['isbn'] in existing:
+                self.stats.duplicates += 1
+                continue
+            existing.add(row['isbn'])
+            rows.append(row)
+        if not rows:
+            return
+
+        new_authors = self._create_missing_authors(
+            {row['author'] for row in rows if row['author']}
+        )
+        new_genres = self._create_missing_genres(
+            {name for row in rows for name in row['genres']}
+        )
+
+        Book.objects.bulk_create([
+            Book(
+                title=row['title'],
+                summary=row['summary'],
+                isbn=row['isbn'],
+                author_id=self.authors.get(row['author']),
+                **self._copy_counters(row),
+            )
+            for row in rows
+        ])
+        # Look the new ids up by ISBN; MySQL does not return them from a
+        # bulk insert.
+        book_ids = dict(
+            Book.objects.filter(
+                isbn__in=[row['isbn'] for row in rows]
+            ).values_list('isbn', 'pk')
+        )
+
+        Book.genre.through.objects.bulk_create([
+            Book.genre.through(
+                book_id=book_ids[row['isbn']],
+                genre_id=self.genres[name],
+            )
+            for row in rows
+            for name in row['genres']
+        ], batch_size=self.batch_size)
+
+        copies = [
+            BookInstance(
+                id=uuid.uuid4(),
+                book_id=book_ids[row['isbn']],
+                imprint=row['imprint'],
+                status=row['status'],
+            )
+            for row in rows
+            for _ in range(row['copies'])
+        ]
+        BookInstance.objects.bulk_create(copies, batch_size=self.batch_size)
+
+        # bulk_create does not send signals, so bring the derived data up
+        # to date here.
+        adjust_catalog_stats(
+            num_books=len(rows),
+            num_authors=new_authors,
+            num_instances=len(copies),
+            num_instances_available=sum(
+                copy.status == LoanStatus.AVAILABLE.value for copy in copies
+            ),
+        )
+        search.index_books(book_ids.values())
+        author_ids = {
+            self.authors[row['author']] for row in rows if row['author']
+        }
+        # Their pages list the new books; see catalog.conditional.
+        touch_authors(pk__in=author_ids)
+        page_cache.purge('book-list', 'author-list', *{
+            f'author:{author_id}' for author_id in author_ids
+        })
+
+        self.stats.books += len(rows)
+        self.stats.authors += new_authors
+        self.stats.genres += new_genres
+        self.stats.copies += len(copies)
+
+    def _copy_counters(self, row):
+        # The copies are inserted below without signals, so start each book
+        # with its final counts.
+        counters = {'copies_total': row['copies']}
+        if row['status'] in STATUS_COUNTERS:
+            counters[STATUS_COUNTERS[row['status']]] = row['copies']
+        return counters
+
+    def _create_missing_authors(self, names):
+        missing = sorted(name for name in names if name not in self.authors)
+        if not missing:
+            return 0
+        Author.objects.bulk_create([
+            Author(first_name=first_name, last_name=last_name)
+            for first_name, last_name in missing
+        ])
+        created = Author.objects.filter(
+            last_name__in={last_name for _, last_name in missing}
+        ).values_list('pk', 'first_name', 'last_name')
+        for pk, first_name, last_name in created:
+            self.authors.setdefault((first_name, last_name), pk)
+        return len(missing)
+
+    def _create_missing_genres(self, names):
+        missing = sorted(name for name in names if name not in self.genres)
+        if not missing:
+            return 0
+        Genre.objects.bulk_create([Genre(name=name) for name in missing])
+        self.genres.update(
+            Genre.objects.filter(name__in=missing).values_list('name', 'pk')
+        )
+        return len(missing)
+
+
+def batched(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,235 @@
+import http.client
+import threading
+import time
+from dataclasses import dataclass, field
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+)
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance
+
+# Query strings for the views that need one to do any real work.
+QUERY_STRINGS = {
+    'search': '?q=the',
+    'api-search': '?q=the',
+}
+# The load test only sends GET requests.
+POST_ONLY = {
+    'mark-returned', 'api-circulation', 'place-hold', 'cancel-hold',
+}
+
+
+@dataclass
+class LoadTestResult:
+    name: str
+    duration: float = 0.0
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    statuses: dict = field(default_factory=dict)
+    endpoints: dict = field(default_factory=dict)
+
+    @property
+    def requests(self):
+        return len(self.latencies) + self.errors
+
+    @property
+    def requests_per_second(self):
+        return self.requests / self.duration if self.duration else 0.0
+
+    def percentile(self, percent):
+        """Latency in milliseconds below which ``percent`` of requests fell."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index] * 1000
+
+    def record(self, latencies, errors, statuses):
+        self.latencies.extend(latencies)
+        self.errors += errors
+        for status, count in statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+    def as_dict(self):
+        data = {
+            'name': self.name,
+            'requests': self.requests,
+            'errors': self.errors,
+            'requests_per_second': round(self.requests_per_second, 1),
+            'p50_ms': round(self.percentile(50), 2),
+            'p95_ms': round(self.percentile(95), 2),
+            'p99_ms': round(self.percentile(99), 2),
+            'statuses': {
+                str(status): count
+                for status, count in sorted(self.statuses.items())
+            },
+        }
+        if self.endpoints:
+            data['endpoints'] = {
+                name: endpoint.as_dict()
+                for name, endpoint in self.endpoints.items()
+            }
+        return data
+
+
+def worker(base_url, paths, deadline, result, lock, offset, headers=None):
+    """Request the paths in turn over one keep-alive connection.
+
+    ``paths`` holds ``(endpoint, path)`` pairs; the figures are recorded
+    for the whole run and for each endpoint.
+    """
+    parts = urlsplit(base_url)
+    connection_class = (
+        http.client.HTTPSConnection if parts.scheme == 'https'
+        else http.client.HTTPConnection
+    )
+    connection = connection_class(parts.netloc, timeout=30)
+    prefix = parts.path.rstrip('/')
+    seen = {endpoint: LoadTestResult(endpoint) for endpoint, _ in paths}
+    number = offset
+    while time.monotonic() < deadline:
+        endpoint, path = paths[number % len(paths)]
+        number += 1
+        started = time.monotonic()
+        try:
+            connection.request('GET', prefix + path, headers=headers or {})
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            seen[endpoint].errors += 1
+            connection.close()
+            continue
+        seen[endpoint].record(
+            [time.monotonic() - started], 0, {response.status: 1}
+        )
+    connection.close()
+    with lock:
+        for endpoint, local in seen.items():
+            for target in (result, result.endpoints[endpoint]):
+                target.record(local.latencies, local.errors, local.statuses)
+
+
+def run_load_test(name, base_url, paths, concurrency=10, duration=10.0,
+                  headers=None):
+    """Hit ``base_url`` with ``concurrency`` clients for ``duration`` s.
+
+    ``paths`` may mix plain paths with ``(endpoint, path)`` pairs.
+    """
+    paths = [
+        (path, path) if isinstance(path, str) else tuple(path)
+        for path in paths
+    ]
+    result = LoadTestResult(name)
+    for endpoint, _ in paths:
+        result.endpoints.setdefault(endpoint, LoadTestResult(endpoint))
+    lock = threading.Lock()
+    started = time.monotonic()
+    deadline = started + duration
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(base_url, paths, deadline, result, lock, number, headers),
+        )
+        for number in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.duration = time.monotonic() - started
+    for endpoint in result.endpoints.values():
+        endpoint.duration = result.duration
+    return result
+
+
+def sample_kwargs():
+    """URL arguments for the patterns that take some, from the database."""
+    book = Book.objects.order_by('pk').values_list('pk', flat=True).first()
+    author = Author.objects.order_by('pk').values_list(
+        'pk', flat=True
+    ).first()
+    copy = BookInstance.objects.order_by('pk').values_list(
+        'pk', flat=True
+    ).first()
+    return {
+        'book-detail': {'pk': book},
+        'author-detail': {'pk': author},
+        'author-update': {'pk': author},
+        'author-delete': {'pk': author},
+        'renew-book-librarian': {'pk': copy},
+        'api-resource': {'resource': 'books'},
+        'export-catalog': {'kind': 'books', 'fmt': 'csv'},
+    }
+
+
+def catalog_paths():
+    """An ``(endpoint, path)`` pair for every GET view in catalog.urls.
+
+    Views whose arguments have no sample in the database yet, such as a
+    book detail page before any book exists, are left out.
+    """
+    from catalog import urls
+
+    samples = sample_kwargs()
+    paths = []
+    for pattern in urls.urlpatterns:
+        name = pattern.name
+        if name in POST_ONLY:
+            continue
+        kwargs = {}
+        if pattern.pattern.converters:
+            if name not in samples:
+                raise ValueError(f'No sample URL arguments for {name!r}.')
+            kwargs = samples[name]
+            if any(value is None for value in kwargs.values()):
+                continue
+        path = reverse(name, kwargs=kwargs) + QUERY_STRINGS.get(name, '')
+        paths.append((name, path))
+    return paths
+
+
+def login_cookie(username):
+    """A Cookie header value for a new session logged in as ``username``.
+
+    The session is saved like ``Client.force_login()`` does, so the
+    target server must share this database and session store.
+    """
+    user = get_user_model()._default_manager.get_by_natural_key(username)
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore()
+    session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+def compare(baseline, current):
+    """Rows of (target, endpoint, old, new) p95 and req/s between reports.
+
+    Both arguments are reports as written by the loadtest command; only
+    the targets and endpoints present in both are compared.
+    """
+    old_targets = {target['name']: target for target in baseline['targets']}
+    rows = []
+    for target in current['targets']:
+        old = old_targets.get(target['name'])
+        if old is None:
+            continue
+        pairs = [('*', old, target)] + [
+            (name, old['endpoints'][name], endpoint)
+            for name, endpoint in target.get('endpoints', {}).items()
+            if name in old.get('endpoints', {})
+        ]
+        for endpoint, before, after in pairs:
+            rows.append((
+                target['name'], endpoint,
+                before['p95_ms'], after['p95_ms'],
+                before['requests_per_second'], after['requests_per_second'],
+            ))
+    return rows
@@ -0,0 +1,109 @@
+"""Per-user summary of the copies on loan, kept in the cache.
+
+The My Borrowed pages and the navigation bar read a user's loans, with
+the books' titles and due dates, from one cached list built by a single
+query. catalog.signals deletes a user's entry whenever a copy is lent to
+them, returned, renewed or otherwise changed while theirs, and when a
+borrowed book's title changes. Overdue flags are worked out on each read,
+so they turn over at midnight without an invalidation. Summaries are
+read from the primary, since a lagging replica could refill an entry
+that was just invalidated with the loans from before the change.
+"""
+from datetime import date
+from typing import NamedTuple
+from uuid import UUID
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from catalog.constants import LoanStatus
+from catalog.models import BookInstance
+from catalog.routers import use_primary
+
+FIELDS = ('id', 'book_id', 'book__title', 'due_back')
+
+
+class Loan(NamedTuple):
+    id: UUID
+    book_id: int
+    title: str
+    due_back: date
+
+    @property
+    def is_overdue(self):
+        return bool(self.due_back and date.today() > self.due_back)
+
+
+class LoanSummary:
+    """A user's loans in due date order, with counts for the menu."""
+
+    def __init__(self, rows):
+        self.loans = [Loan(*row) for row in rows]
+
+    def __len__(self):
+        return len(self.loans)
+
+    def __iter__(self):
+        return iter(self.loans)
+
+    @property
+    def count(self):
+        return len(self.loans)
+
+    @property
+    def overdue_count(self):
+        return sum(loan.is_overdue for loan in self.loans)
+
+
+def summary_key(user_id):
+    return f'loans:{user_id}'
+
+
+def loans_query(user_id):
+    return BookInstance.objects.filter(
+        borrower_id=user_id, status=LoanStatus.ON_LOAN.value
+    ).order_by('due_back', 'id').values_list(*FIELDS)
+
+
+def timeout():
+    return getattr(settings, 'LOAN_SUMMARY_TIMEOUT', 300)
+
+
+def loan_summary(user):
+    """The user's loans, from the cache or one query on a miss."""
+    if not user.is_authenticated:
+        return LoanSummary([])
+    key = summary_key(user.pk)
+    rows = cache.get(key)
+    if rows is None:
+        with use_primary():
+            rows = list(loans_query(user.pk))
+        cache.set(key, rows, timeout())
+    return LoanSummary(rows)
+
+
+async def aloan_summary(user):
+    """Async counterpart of loan_summary()."""
+    if not user.is_authenticated:
+        return LoanSummary([])
+    key = summary_key(user.pk)
+    rows = await cache.aget(key)
+    if rows is None:
+        with use_primary():
+            rows = [row async for row in loans_query(user.pk)]
+        await cache.aset(key, rows, timeout())
+    return LoanSummary(rows)
+
+
+def invalidate_loan_summaries(user_ids):
+    """Forget the summaries of the given users.
+
+    The entries go at once, for reads later in the same transaction, and
+    again on commit, in case another request read the old rows from the
+    database and cached them in between.
+    """
+    keys = [summary_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
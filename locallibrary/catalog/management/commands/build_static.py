@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from catalog.loadtest import catalog_paths
+from catalog.static_build import page_weights
+
+
+class Command(BaseCommand):
+    help = (
+        'Collect the static files with trimmed stylesheets, hashed names '
+        'and gzip and brotli copies, then report the bytes each catalog '
+        'page transfers for its static assets before and after. Brotli '
+        'files are only written when the brotli package is installed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Page to report on; defaults to every catalog GET view.',
+        )
+        parser.add_argument(
+            '--no-report', action='store_false', dest='report',
+            help='Only collect the files.',
+        )
+
+    def handle(self, *args, **options):
+        call_command(
+            'collectstatic', interactive=False,
+            verbosity=options['verbosity'], stdout=self.stdout,
+        )
+        if not options['report']:
+            return
+
+        self.stdout.write(
+            f'\n{"page":<32}{"html":>10}{"assets before":>16}'
+            f'{"assets after":>16}{"saved":>8}'
+        )
+        total_before = total_after = 0
+        paths = options['paths'] or [path for _, path in catalog_paths()]
+        for path, html, before, after in page_weights(paths):
+            total_before += before
+            total_after += after
+            self.write_row(path, html, before, after)
+        self.stdout.write(self.style.SUCCESS(
+            f'Static assets under {settings.STATIC_ROOT}: '
+            f'{total_before} bytes before, {total_after} after, '
+            f'over {len(paths)} pages.'
+        ))
+
+    def write_row(self, path, html, before, after):
+        saved = 1 - after / before if before else 0
+        self.stdout.write(
+            f'{path[:31]:<32}{html:>10}{before:>16}{after:>16}{saved:>8.0%}'
+        )
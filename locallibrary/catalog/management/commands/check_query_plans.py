@@ -0,0 +1,74 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from catalog.models import Book
+from catalog.query_plans import access_paths, explain, full_scans, seed
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed sample data, EXPLAIN the query behind each catalog view and '
+        'fail if any plan reads a catalog table without an index. The '
+        'sample data is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=2000)
+        parser.add_argument('--copies-per-book', type=int, default=3)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Print every plan, not only the failing ones.',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        self.failures = []
+        try:
+            with transaction.atomic(using=using):
+                self.check_plans(using, options)
+                raise Rollback
+        except Rollback:
+            pass
+        if self.failures:
+            raise CommandError(
+                'Full table scans in: ' + ', '.join(self.failures)
+            )
+        self.stdout.write(self.style.SUCCESS('Every plan uses an index.'))
+
+    def check_plans(self, using, options):
+        connection = connections[using]
+        seed(options['books'], options['copies_per_book'], using)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+                # The planner still picks a sequential scan when no index
+                # fits; this only stops it preferring one on small tables.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        user = User.objects.using(using).filter(
+            username__startswith='plan-borrower-'
+        ).first()
+        book = Book.objects.using(using).filter(
+            isbn__startswith='P'
+        ).first()
+        for label, queryset in access_paths(user, book).items():
+            plan = explain(queryset, using)
+            scans = [
+                table for table in full_scans(plan, connection.vendor)
+                if table.startswith('catalog_')
+            ]
+            if scans:
+                self.failures.append(label)
+                self.stdout.write(self.style.ERROR(
+                    f'{label}: full scan of {", ".join(scans)}'
+                ))
+            else:
+                self.stdout.write(f'{label}: ok')
+            if scans or options['verbose_plans']:
+                self.stdout.write(plan)
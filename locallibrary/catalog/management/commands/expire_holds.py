@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from catalog.holds import BATCH_SIZE, expire_holds
+
+
+class Command(BaseCommand):
+    help = (
+        'Expire ready holds whose copies were not collected in time and '
+        'pass the copies to the next patrons in the queues. Run from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        expired = expire_holds(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} holds.'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.exports import (
+    EXPORTS, FORMATS, ExportError, parse_filters, stream_export
+)
+
+
+class Command(BaseCommand):
+    help = 'Stream books, authors or copies to CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument(
+            '--output', help='Output file; defaults to stdout.'
+        )
+        parser.add_argument('--status', help='Copy status code, e.g. o.')
+        parser.add_argument('--due-after', help='YYYY-MM-DD, inclusive.')
+        parser.add_argument('--due-before', help='YYYY-MM-DD, inclusive.')
+        parser.add_argument('--author', help='Author id.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_filters(options['kind'], options)
+            lines = stream_export(
+                options['kind'], options['format'], filters,
+                chunk_size=options['chunk_size'],
+            )
+            if options['output']:
+                with open(options['output'], 'w', newline='',
+                          encoding='utf-8') as output:
+                    output.writelines(lines)
+            else:
+                for line in lines:
+                    self.stdout.write(line, ending='')
+        except ExportError as e:
+            raise CommandError(str(e))
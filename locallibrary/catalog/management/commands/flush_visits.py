@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from catalog.visits import flush_visits
+
+
+class Command(BaseCommand):
+    help = 'Write the home page visits counted in the cache to the database.'
+
+    def handle(self, *args, **options):
+        flushed = flush_visits()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} visits.'))
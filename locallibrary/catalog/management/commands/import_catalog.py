@@ -0,0 +1,119 @@
+import itertools
+import json
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.importer import CatalogImporter, batched, read_csv, read_jsonl
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream books, authors, genres and copies from CSV or JSON Lines '
+        'into the catalog with batched bulk inserts. Each record has isbn, '
+        'title, summary, author_first_name, author_last_name, genres '
+        '(";"-separated in CSV), copies, imprint and status.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file, or - for stdin.')
+        parser.add_argument(
+            '--format',
+            choices=sorted(READERS),
+            help='Input format; guessed from the file extension if omitted.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='File recording how many rows have been committed.',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip the rows already committed according to --checkpoint.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or self.guess_format(path)
+        checkpoint = options['checkpoint']
+        if options['resume'] and not checkpoint:
+            raise CommandError('--resume needs --checkpoint.')
+
+        skip = 0
+        if options['resume'] and os.path.exists(checkpoint):
+            skip = self.read_checkpoint(checkpoint, path)
+            self.stdout.write(f'Resuming after row {skip}.')
+
+        importer = CatalogImporter(batch_size=options['batch_size'])
+        started = time.monotonic()
+        done = skip
+        stream = sys.stdin if path == '-' else open(
+            path, newline='', encoding='utf-8'
+        )
+        try:
+            records = itertools.islice(
+                READERS[input_format](stream), skip, None
+            )
+            for batch in batched(records, options['batch_size']):
+                importer.import_batch(batch, first_row=done)
+                done += len(batch)
+                if checkpoint:
+                    self.write_checkpoint(checkpoint, path, done)
+                self.report_progress(importer.stats, started)
+        except json.JSONDecodeError as e:
+            raise CommandError(f'Invalid JSON after row {done}: {e}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        stats = importer.stats
+        elapsed = time.monotonic() - started
+        for error in stats.errors:
+            self.stderr.write(f'Skipped {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {stats.rows} rows in {elapsed:.1f}s '
+            f'({stats.rows / max(elapsed, 1e-6):.0f} rows/s): '
+            f'{stats.books} books, {stats.authors} new authors, '
+            f'{stats.genres} new genres, {stats.copies} copies; '
+            f'{stats.duplicates} duplicate and {stats.invalid} invalid '
+            f'rows skipped.'
+        ))
+
+    def guess_format(self, path):
+        extension = os.path.splitext(path)[1].lstrip('.').lower()
+        if extension == 'json':
+            extension = 'jsonl'
+        if extension not in READERS:
+            raise CommandError('Cannot guess the input format; use --format.')
+        return extension
+
+    def report_progress(self, stats, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'  {stats.rows} rows, {stats.books} books, '
+            f'{stats.copies} copies ({stats.rows / max(elapsed, 1e-6):.0f} '
+            f'rows/s)'
+        )
+
+    def read_checkpoint(self, checkpoint, path):
+        with open(checkpoint) as f:
+            state = json.load(f)
+        if state.get('path') != os.path.abspath(path):
+            raise CommandError(
+                f'{checkpoint} belongs to {state.get("path")}, not {path}.'
+            )
+        return state['rows']
+
+    def write_checkpoint(self, checkpoint, path, rows):
+        tmp_path = f'{checkpoint}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'path': os.path.abspath(path), 'rows': rows}, f)
+        os.replace(tmp_path, checkpoint)
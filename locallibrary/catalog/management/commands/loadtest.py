@@ -0,0 +1,124 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from catalog.loadtest import (
+    catalog_paths, compare, login_cookie, run_load_test
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test running servers and compare requests per second and '
+        'latency percentiles, overall and per endpoint. Without --path, '
+        'every GET view in catalog.urls is requested, with sample ids read '
+        'from this project\'s database. To compare WSGI with ASGI, start '
+        'the web process from the Procfile on one port and the asgi '
+        'process on another, then pass --target wsgi=http://127.0.0.1:8000 '
+        '--target asgi=http://127.0.0.1:8001. To compare releases, save a '
+        'report with --json and pass it to the next run as --baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', dest='targets', metavar='NAME=URL',
+            help='Server to test; repeat to compare several.',
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Path to request, relative to each target; repeatable.',
+        )
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument(
+            '--user',
+            help='Send the requests logged in as this user.',
+        )
+        parser.add_argument(
+            '--label', default='',
+            help='Name of the release under test, stored in the report.',
+        )
+        parser.add_argument(
+            '--json', metavar='FILE',
+            help='Write the results as JSON to FILE, or - for stdout.',
+        )
+        parser.add_argument(
+            '--baseline', metavar='FILE',
+            help='Earlier --json report to compare p95 and req/s with.',
+        )
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['targets'] or ['local=http://127.0.0.1:8000']:
+            name, sep, url = target.partition('=')
+            if not sep or not url.startswith(('http://', 'https://')):
+                raise CommandError(f'Expected NAME=URL, got {target!r}.')
+            targets.append((name, url))
+        paths = options['paths'] or catalog_paths()
+        headers = {}
+        if options['user']:
+            headers['Cookie'] = login_cookie(options['user'])
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        # Keep stdout for the report when it is written there.
+        out = self.stderr if options['json'] == '-' else self.stdout
+        out.write(
+            f'{"target":<24}{"requests":>10}{"errors":>8}{"req/s":>10}'
+            f'{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}'
+        )
+        results = []
+        for name, url in targets:
+            result = run_load_test(
+                name, url, paths,
+                concurrency=options['concurrency'],
+                duration=options['duration'],
+                headers=headers,
+            )
+            results.append(result)
+            self.write_row(out, name, result)
+            if len(result.endpoints) > 1:
+                for endpoint, endpoint_result in result.endpoints.items():
+                    self.write_row(out, f'  {endpoint}', endpoint_result)
+
+        report = {
+            'label': options['label'],
+            'started_at': timezone.now().isoformat(),
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'user': options['user'],
+            'targets': [result.as_dict() for result in results],
+        }
+        if baseline is not None:
+            self.write_comparison(out, baseline, report)
+        if options['json'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+        elif options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+    def write_row(self, out, name, result):
+        out.write(
+            f'{name[:23]:<24}{result.requests:>10}{result.errors:>8}'
+            f'{result.requests_per_second:>10.1f}'
+            f'{result.percentile(50):>10.1f}'
+            f'{result.percentile(95):>10.1f}'
+            f'{result.percentile(99):>10.1f}'
+        )
+
+    def write_comparison(self, out, baseline, report):
+        label = baseline.get('label') or 'baseline'
+        out.write(f'\nCompared with {label}:')
+        out.write(
+            f'{"target":<12}{"endpoint":<24}{"p95 ms":>16}{"req/s":>18}'
+        )
+        for target, endpoint, old_p95, p95, old_rps, rps in compare(
+            baseline, report
+        ):
+            out.write(
+                f'{target:<12}{endpoint[:23]:<24}'
+                f'{old_p95:>8.1f}{p95:>8.1f}{old_rps:>9.1f}{rps:>9.1f}'
+            )
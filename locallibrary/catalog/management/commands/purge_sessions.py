@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from catalog.sessions import (
+    BATCH_SIZE, purge_expired_sessions, uses_session_table
+)
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions from the database in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not uses_session_table():
+            self.stdout.write(
+                'The session engine does not use the database; '
+                'nothing to purge.'
+            )
+            return
+        deleted = purge_expired_sessions(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} expired sessions.'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from catalog.stats import rebuild_catalog_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the home page catalog counters from scratch.'
+
+    def handle(self, *args, **options):
+        stats = rebuild_catalog_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt catalog stats: {stats.num_books} books, '
+            f'{stats.num_instances} copies '
+            f'({stats.num_instances_available} available), '
+            f'{stats.num_authors} authors.'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from catalog.stats import reconcile_all_book_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount every book\'s copies by status and fix any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        checked, fixed = reconcile_all_book_counters(
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} books, fixed {fixed}.'
+        ))
@@ -0,0 +1,343 @@
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# psycopg_pool statistics reported for each pooled database alias.
+POOL_STATS = (
+    'pool_min', 'pool_max', 'pool_size', 'pool_available',
+    'requests_waiting', 'requests_num', 'requests_wait_ms',
+    'requests_errors', 'connections_num',
+)
+# The ones that describe the pool now rather than count since it started.
+POOL_GAUGES = ('pool_min', 'pool_max', 'pool_size', 'pool_available',
+               'requests_waiting')
+
+
+class MetricsRegistry:
+    """Per-endpoint request, latency and SQL counters for one process.
+
+    When ``METRICS_DIR`` is set, every process periodically writes its
+    totals to ``metrics-<pid>.json`` in that directory, and snapshot()
+    merges the files so all gunicorn workers are reported together. The
+    counters of workers that have exited are kept, so totals never go
+    down, but their pool gauges are not.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = defaultdict(int)
+            self.latency = {}
+            self.sql_queries = defaultdict(int)
+            self.sql_seconds = defaultdict(float)
+            self.sql_sampled = defaultdict(int)
+            self.db_connections = defaultdict(int)
+            self.last_flush = time.monotonic()
+
+    def observe(self, view, method, status, seconds, queries,
+                sql_seconds=None):
+        """Record one finished request."""
+        with self.lock:
+            self.requests[f'{view}|{method}|{status}'] += 1
+            histogram = self.latency.setdefault(view, {
+                'buckets': [0] * len(LATENCY_BUCKETS),
+                'sum': 0.0,
+                'count': 0,
+            })
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram['buckets'][i] += 1
+                    break
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+            self.sql_queries[view] += queries
+            if sql_seconds is not None:
+                self.sql_seconds[view] += sql_seconds
+                self.sql_sampled[view] += 1
+        self.maybe_flush()
+
+    def connection_opened(self, alias):
+        with self.lock:
+            self.db_connections[alias] += 1
+
+    def local_snapshot(self):
+        pools = database_pool_stats()
+        with self.lock:
+            return {
+                'requests': dict(self.requests),
+                'latency': json.loads(json.dumps(self.latency)),
+                'sql_queries': dict(self.sql_queries),
+                'sql_seconds': dict(self.sql_seconds),
+                'sql_sampled': dict(self.sql_sampled),
+                'db_connections': dict(self.db_connections),
+                'db_pools': pools,
+            }
+
+    def maybe_flush(self):
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 10)
+        if time.monotonic() - self.last_flush >= interval:
+            self.flush()
+
+    def flush(self):
+        """Write this process's totals to the shared metrics directory."""
+        self.last_flush = time.monotonic()
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as tmp:
+            json.dump(self.local_snapshot(), tmp)
+        os.replace(
+            tmp_path, os.path.join(directory, f'metrics-{os.getpid()}.json')
+        )
+
+    def snapshot(self):
+        """Return the totals of every process sharing METRICS_DIR."""
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return self.local_snapshot()
+        self.flush()
+        merged = empty_snapshot()
+        for name in sorted(os.listdir(directory)):
+            if not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with open(path) as f:
+                    merge_snapshot(
+                        merged, json.load(f), live=is_live(path, name)
+                    )
+            except (OSError, ValueError):
+                continue
+        return merged
+
+
+def is_live(path, name):
+    """Whether a metrics file belongs to a running, recently seen worker.
+
+    A file not written for METRICS_STALE_AFTER seconds is treated as dead
+    too, in case its PID has been reused by an unrelated process.
+    """
+    stale_after = getattr(settings, 'METRICS_STALE_AFTER', 300)
+    if time.time() - os.path.getmtime(path) > stale_after:
+        return False
+    pid = int(name[len('metrics-'):-len('.json')])
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def database_pool_stats():
+    """This process's psycopg pool statistics by database alias.
+
+    Only pools that exist already are reported; looking one up through
+    ``connection.pool`` would create it.
+    """
+    stats = {}
+    for alias in connections:
+        pools = getattr(type(connections[alias]), '_connection_pools', {})
+        pool = pools.get(alias)
+        if pool is not None:
+            values = pool.get_stats()
+            stats[alias] = {name: values.get(name, 0) for name in POOL_STATS}
+    return stats
+
+
+def empty_snapshot():
+    return {
+        'requests': {},
+        'latency': {},
+        'sql_queries': {},
+        'sql_seconds': {},
+        'sql_sampled': {},
+        'db_connections': {},
+        'db_pools': {},
+    }
+
+
+def merge_snapshot(into, other, live=True):
+    for key in ('requests', 'sql_queries', 'sql_seconds', 'sql_sampled',
+                'db_connections'):
+        for label, value in other.get(key, {}).items():
+            into[key][label] = into[key].get(label, 0) + value
+    # Pool sizes add up too: their sum is what the workers together may
+    # open against the database's connection limit.
+    for alias, stats in other.get('db_pools', {}).items():
+        target = into['db_pools'].setdefault(alias, {})
+        for name, value in stats.items():
+            if live or name not in POOL_GAUGES:
+                target[name] = target.get(name, 0) + value
+    for view, histogram in other.get('latency', {}).items():
+        target = into['latency'].setdefault(view, {
+            'buckets': [0] * len(LATENCY_BUCKETS),
+            'sum': 0.0,
+            'count': 0,
+        })
+        for i, count in enumerate(histogram['buckets']):
+            target['buckets'][i] += count
+        target['sum'] += histogram['sum']
+        target['count'] += histogram['count']
+    return into
+
+
+def escape_label(value):
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def labels(**values):
+    pairs = ','.join(
+        f'{name}="{escape_label(value)}"' for name, value in values.items()
+    )
+    return '{' + pairs + '}'
+
+
+def render_prometheus(snapshot):
+    """Format a snapshot in the Prometheus text exposition format."""
+    lines = [
+        '# HELP catalog_http_requests_total Requests by URL name, method '
+        'and status.',
+        '# TYPE catalog_http_requests_total counter',
+    ]
+    for key, count in sorted(snapshot['requests'].items()):
+        view, method, status = key.split('|')
+        lines.append(
+            f'catalog_http_requests_total'
+            f'{labels(view=view, method=method, status=status)} {count}'
+        )
+
+    lines += [
+        '# HELP catalog_http_request_duration_seconds Request latency by '
+        'URL name.',
+        '# TYPE catalog_http_request_duration_seconds histogram',
+    ]
+    for view, histogram in sorted(snapshot['latency'].items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, histogram['buckets']):
+            cumulative += count
+            lines.append(
+                'catalog_http_request_duration_seconds_bucket'
+                f'{labels(view=view, le=bound)} {cumulative}'
+            )
+        lines += [
+            'catalog_http_request_duration_seconds_bucket'
+            f'{labels(view=view, le="+Inf")} {histogram["count"]}',
+            'catalog_http_request_duration_seconds_sum'
+            f'{labels(view=view)} {histogram["sum"]}',
+            'catalog_http_request_duration_seconds_count'
+            f'{labels(view=view)} {histogram["count"]}',
+        ]
+
+    for name, key, kind, help_text in (
+        ('catalog_sql_queries_total', 'sql_queries', 'counter',
+         'SQL queries run by URL name.'),
+        ('catalog_sql_duration_seconds_total', 'sql_seconds', 'counter',
+         'SQL time by URL name, over sampled requests only.'),
+        ('catalog_sql_sampled_requests_total', 'sql_sampled', 'counter',
+         'Requests whose SQL time was measured.'),
+    ):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for view, value in sorted(snapshot[key].items()):
+            lines.append(f'{name}{labels(view=view)} {value}')
+
+    lines += [
+        '# HELP catalog_db_connections_total Connections opened by Django, '
+        'by database alias; with a pool, each is a checkout.',
+        '# TYPE catalog_db_connections_total counter',
+    ]
+    for alias, count in sorted(snapshot.get('db_connections', {}).items()):
+        lines.append(f'catalog_db_connections_total{labels(alias=alias)} '
+                     f'{count}')
+
+    pools = snapshot.get('db_pools', {})
+    for name, stat, scale, kind, help_text in (
+        ('catalog_db_pool_max_connections', 'pool_max', 1, 'gauge',
+         'Most connections the pools may open.'),
+        ('catalog_db_pool_connections', 'pool_size', 1, 'gauge',
+         'Connections open in the pools, busy or idle.'),
+        ('catalog_db_pool_idle_connections', 'pool_available', 1, 'gauge',
+         'Idle connections ready in the pools.'),
+        ('catalog_db_pool_waiting_requests', 'requests_waiting', 1, 'gauge',
+         'Requests queued for a connection.'),
+        ('catalog_db_pool_checkouts_total', 'requests_num', 1, 'counter',
+         'Connections handed out by the pools.'),
+        ('catalog_db_pool_wait_seconds_total', 'requests_wait_ms', 0.001,
+         'counter', 'Time spent waiting for a pooled connection.'),
+        ('catalog_db_pool_timeouts_total', 'requests_errors', 1, 'counter',
+         'Requests that gave up waiting for a connection.'),
+    ):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for alias, stats in sorted(pools.items()):
+            lines.append(
+                f'{name}{labels(alias=alias)} {stats.get(stat, 0) * scale}'
+            )
+    lines += [
+        '# HELP catalog_db_pool_saturation Share of the pool capacity in '
+        'use.',
+        '# TYPE catalog_db_pool_saturation gauge',
+    ]
+    for alias, stats in sorted(pools.items()):
+        busy = stats.get('pool_size', 0) - stats.get('pool_available', 0)
+        capacity = stats.get('pool_max', 0)
+        saturation = busy / capacity if capacity else 0.0
+        lines.append(
+            f'catalog_db_pool_saturation{labels(alias=alias)} '
+            f'{saturation:.3f}'
+        )
+
+    return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    registry.connection_opened(connection.alias)
+
+
+def metrics_allowed(request):
+    """Allow staff users, or callers presenting METRICS_TOKEN."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        header = request.headers.get('Authorization', '')
+        if hmac.compare_digest(
+            header.encode(), f'Bearer {token}'.encode()
+        ):
+            return True
+    return request.user.is_active and request.user.is_staff
+
+
+def metrics_view(request):
+    """Expose the collected metrics in Prometheus text format."""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_prometheus(registry.snapshot()), content_type=CONTENT_TYPE
+    )
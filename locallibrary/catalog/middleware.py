@@ -0,0 +1,130 @@
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async
+)
+from django.conf import settings
+from django.db import connections
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from catalog.metrics import registry
+
+UNRESOLVED = '<unresolved>'
+
+
+class SQLRecorder:
+    """Execute wrapper counting every query and timing sampled requests."""
+
+    def __init__(self, timed):
+        self.timed = timed
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        if not self.timed:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+class RequestMetricsMiddleware:
+    """Record latency and SQL usage per resolved URL name.
+
+    Queries are always counted; only a ``METRICS_SQL_SAMPLE_RATE`` share
+    of requests also pays for timing each statement. Under ASGI the
+    middleware stays async, so async views run without a thread hop.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = self.recorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            wrap_connections(stack, recorder)
+            response = self.get_response(request)
+        self.observe(request, response, recorder, start)
+        return response
+
+    async def __acall__(self, request):
+        recorder = self.recorder()
+        start = time.perf_counter()
+        stack = ExitStack()
+        # Queries run in the request's thread-sensitive executor thread,
+        # whose connections are not the event loop thread's.
+        await sync_to_async(wrap_connections)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.observe(request, response, recorder, start)
+        return response
+
+    def recorder(self):
+        sample_rate = getattr(settings, 'METRICS_SQL_SAMPLE_RATE', 0.1)
+        return SQLRecorder(timed=random.random() < sample_rate)
+
+    def observe(self, request, response, recorder, start):
+        elapsed = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else UNRESOLVED
+        registry.observe(
+            view or UNRESOLVED,
+            request.method,
+            response.status_code,
+            elapsed,
+            recorder.queries,
+            recorder.seconds if recorder.timed else None,
+        )
+
+
+def wrap_connections(stack, recorder):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise, kept async under ASGI.
+
+    WhiteNoiseMiddleware is sync only, which would put every request
+    behind it through a thread. Here only the static files themselves,
+    which are opened from disk, are served from a thread.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(
+                request.path_info
+            )
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
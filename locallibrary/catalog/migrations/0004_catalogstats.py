@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_alter_bookinstance_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('num_books', models.IntegerField(default=0)),
+                ('num_instances', models.IntegerField(default=0)),
+                ('num_instances_available', models.IntegerField(default=0)),
+                ('num_authors', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'catalog stats',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+STATS_PK = 1
+
+
+def seed_catalog_stats(apps, schema_editor):
+    Author = apps.get_model('catalog', 'Author')
+    Book = apps.get_model('catalog', 'Book')
+    BookInstance = apps.get_model('catalog', 'BookInstance')
+    CatalogStats = apps.get_model('catalog', 'CatalogStats')
+    CatalogStats.objects.update_or_create(
+        pk=STATS_PK,
+        defaults={
+            'num_books': Book.objects.count(),
+            'num_instances': BookInstance.objects.count(),
+            'num_instances_available': BookInstance.objects.filter(
+                status='a'
+            ).count(),
+            'num_authors': Author.objects.count(),
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_catalogstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_catalog_stats, migrations.RunPython.noop),
+    ]
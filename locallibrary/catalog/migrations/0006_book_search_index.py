@@ -0,0 +1,49 @@
+from django.db import migrations
+
+# The DDL is frozen here rather than read from catalog.search, so that
+# later changes to the search code cannot change what this migration did.
+CREATE_INDEX = {
+    'sqlite': [
+        'CREATE VIRTUAL TABLE IF NOT EXISTS catalog_book_fts '
+        'USING fts5(title, summary, authors, genres, '
+        "tokenize='unicode61 remove_diacritics 2')",
+    ],
+    'postgresql': [
+        'CREATE TABLE IF NOT EXISTS catalog_book_fts ('
+        'book_id bigint PRIMARY KEY, '
+        'title text NOT NULL, summary text NOT NULL, '
+        'authors text NOT NULL, genres text NOT NULL, '
+        'document tsvector NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS catalog_book_fts_document '
+        'ON catalog_book_fts USING GIN (document)',
+    ],
+    'mysql': [
+        'CREATE TABLE IF NOT EXISTS catalog_book_fts ('
+        'book_id bigint NOT NULL PRIMARY KEY, '
+        'title varchar(200) NOT NULL, summary text NOT NULL, '
+        'authors text NOT NULL, genres text NOT NULL, '
+        'FULLTEXT KEY catalog_book_fts_text '
+        '(title, summary, authors, genres)'
+        ') ENGINE=InnoDB DEFAULT CHARSET=utf8mb4',
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    for statement in CREATE_INDEX[schema_editor.connection.vendor]:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    schema_editor.execute('DROP TABLE IF EXISTS catalog_book_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_seed_catalogstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:24
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+STATUS_COUNTERS = {
+    'copies_available': 'a',
+    'copies_on_loan': 'o',
+    'copies_reserved': 'r',
+    'copies_maintenance': 'm',
+}
+
+
+def count_copies(apps, schema_editor):
+    Book = apps.get_model('catalog', 'Book')
+    BookInstance = apps.get_model('catalog', 'BookInstance')
+
+    def copies(**filters):
+        counts = BookInstance.objects.filter(
+            book=OuterRef('pk'), **filters
+        ).order_by().values('book').annotate(n=Count('pk')).values('n')
+        return Coalesce(Subquery(counts), 0)
+
+    Book.objects.update(
+        copies_total=copies(),
+        **{
+            field: copies(status=status)
+            for field, status in STATUS_COUNTERS.items()
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_book_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='copies_available',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_maintenance',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_on_loan',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_reserved',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_total',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_copies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_book_copy_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['last_name', 'first_name', 'id'], name='author_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['title', 'id'], name='book_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookinstance',
+            index=models.Index(fields=['borrower', 'status', 'due_back'], name='bookinst_borrower_status_due'),
+        ),
+        migrations.AddIndex(
+            model_name='bookinstance',
+            index=models.Index(fields=['status', 'due_back'], name='bookinst_status_due'),
+        ),
+        migrations.AddIndex(
+            model_name='bookinstance',
+            index=models.Index(fields=['book', 'status'], name='bookinst_book_status'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='bookinstance',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='catalogstats',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogstats',
+            name='num_visits',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
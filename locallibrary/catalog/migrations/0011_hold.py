@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0010_catalogstats_num_visits'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('w', 'Waiting'), ('r', 'Ready'), ('f', 'Fulfilled'), ('c', 'Cancelled'), ('e', 'Expired')], default='w', max_length=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('ready_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='catalog.book')),
+                ('copy', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='holds', to='catalog.bookinstance')),
+                ('patron', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['book', 'status', 'created_at', 'id'], name='hold_queue_idx'), models.Index(fields=['patron', 'status'], name='hold_patron_status'), models.Index(fields=['status', 'expires_at'], name='hold_status_expires')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ('w', 'r'))), fields=('book', 'patron'), name='hold_one_active_per_patron')],
+            },
+        ),
+    ]
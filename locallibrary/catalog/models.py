@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse
 from django.contrib.auth.models import User
@@ -10,6 +11,8 @@ from .constants import (
     MAX_LENGTH_ISBN,
     MAX_LENGTH_SUMMARY,
     MAX_LENGTH_UNIQUE_ID,
+    ACTIVE_HOLD_STATUSES,
+    HoldStatus,
     LoanStatus
 )
 
@@ -51,9 +54,47 @@ class Book(models.Model):
         help_text=_('Select a genre for this book'),
     )
 
+    # Copy counts maintained by catalog.signals whenever a BookInstance is
+    # created, deleted or changes status.
+    copies_total = models.IntegerField(default=0, editable=False)
+    copies_available = models.IntegerField(default=0, editable=False)
+    copies_on_loan = models.IntegerField(default=0, editable=False)
+    copies_reserved = models.IntegerField(default=0, editable=False)
+    copies_maintenance = models.IntegerField(default=0, editable=False)
+
+    # Also bumped by catalog.signals when the book's copies, author or
+    # genres change, so it dates everything shown on the book's page.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    COUNTER_FIELDS = (
+        'copies_total',
+        'copies_available',
+        'copies_on_loan',
+        'copies_reserved',
+        'copies_maintenance',
+    )
+
+    class Meta:
+        indexes = [
+            # BookListView orders by (title, id).
+            models.Index(fields=['title', 'id'], name='book_title_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Never write back counters that may have changed in the database
+        # since this object was loaded.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse('book-detail', args=[str(self.id)])
 
@@ -63,6 +104,26 @@ class Book(models.Model):
     display_genre.short_description = 'Genre'
 
 
+class BookInstanceQuerySet(models.QuerySet):
+
+    def on_loan(self):
+        return self.filter(status=LoanStatus.ON_LOAN.value)
+
+    def overdue(self, today=None):
+        """Copies on loan whose due date has passed, filtered in SQL."""
+        return self.on_loan().filter(due_back__lt=today or date.today())
+
+    def annotate_overdue(self, today=None):
+        """Add an ``overdue`` boolean computed by the database."""
+        return self.annotate(overdue=models.ExpressionWrapper(
+            models.Q(
+                status=LoanStatus.ON_LOAN.value,
+                due_back__lt=today or date.today(),
+            ),
+            output_field=models.BooleanField(),
+        ))
+
+
 class BookInstance(models.Model):
     """Model representing a specific copy of a book."""
 
@@ -92,6 +153,40 @@ class BookInstance(models.Model):
         help_text='Book availability',
     )
 
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BookInstanceQuerySet.as_manager()
+
+    # Fields whose previous values the signal handlers need to compare.
+    TRACKED_FIELDS = ('status', 'book_id', 'borrower_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        instance._loaded = {
+            name: loaded[name]
+            for name in cls.TRACKED_FIELDS
+            if name in loaded
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.mark_loaded()
+
+    def mark_loaded(self):
+        self._loaded = {
+            name: getattr(self, name) for name in self.TRACKED_FIELDS
+        }
+
+    def loaded_value(self, name):
+        """Value of a tracked field as last read from or saved to the DB."""
+        if self._state.adding:
+            return None
+        loaded = getattr(self, '_loaded', {})
+        return loaded[name] if name in loaded else getattr(self, name)
+
     @property
     def is_overdue(self):
         return self.due_back and date.today() > self.due_back
@@ -99,11 +194,110 @@ class BookInstance(models.Model):
     class Meta:
         ordering = ['due_back']
         permissions = (("can_mark_returned", "Set book as returned"),)
+        indexes = [
+            # A borrower's loans, sorted by due date.
+            models.Index(
+                fields=['borrower', 'status', 'due_back'],
+                name='bookinst_borrower_status_due',
+            ),
+            # Status counts, the admin status filter and overdue sweeps.
+            models.Index(
+                fields=['status', 'due_back'], name='bookinst_status_due',
+            ),
+            # Copies of a book and the per-book counter recount.
+            models.Index(
+                fields=['book', 'status'], name='bookinst_book_status',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.id} ({self.book.title})'
 
 
+class HoldQuerySet(models.QuerySet):
+
+    def active(self):
+        return self.filter(status__in=ACTIVE_HOLD_STATUSES)
+
+    def annotate_position(self):
+        """Add each waiting hold's 1-based ``position`` in its queue."""
+        ahead = Hold.objects.filter(
+            models.Q(created_at__lt=models.OuterRef('created_at'))
+            | models.Q(
+                created_at=models.OuterRef('created_at'),
+                pk__lt=models.OuterRef('pk'),
+            ),
+            book=models.OuterRef('book'),
+            status=HoldStatus.WAITING.value,
+        ).order_by().values('book').annotate(
+            count=models.Count('pk')
+        ).values('count')
+        return self.annotate(position=models.Case(
+            models.When(
+                status=HoldStatus.WAITING.value,
+                then=Coalesce(models.Subquery(ahead), 0) + 1,
+            ),
+            default=None,
+            output_field=models.IntegerField(),
+        ))
+
+
+class Hold(models.Model):
+    """A patron's place in the queue for the next copy of a book.
+
+    Waiting holds are served oldest first by catalog.holds, which reserves
+    a returned copy for the hold and marks it ready for pickup.
+    """
+
+    book = models.ForeignKey('Book', on_delete=models.CASCADE)
+    patron = models.ForeignKey(User, on_delete=models.CASCADE)
+    status = models.CharField(
+        max_length=1,
+        choices=[
+            (status.value, _(status.name.capitalize()))
+            for status in HoldStatus
+        ],
+        default=HoldStatus.WAITING.value,
+    )
+    # The copy reserved for the patron once the hold is ready.
+    copy = models.ForeignKey(
+        'BookInstance', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='holds',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    ready_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    objects = HoldQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            # The queue of a book, oldest first.
+            models.Index(
+                fields=['book', 'status', 'created_at', 'id'],
+                name='hold_queue_idx',
+            ),
+            # A patron's holds and the sweep of uncollected ones.
+            models.Index(
+                fields=['patron', 'status'], name='hold_patron_status',
+            ),
+            models.Index(
+                fields=['status', 'expires_at'], name='hold_status_expires',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['book', 'patron'],
+                condition=models.Q(status__in=ACTIVE_HOLD_STATUSES),
+                name='hold_one_active_per_patron',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.book} for {self.patron} ({self.get_status_display()})'
+
+
 class Author(models.Model):
     """Model representing an author."""
 
@@ -111,12 +305,39 @@ class Author(models.Model):
     last_name = models.CharField(max_length=MAX_LENGTH_AUTHOR_NAME)
     date_of_birth = models.DateField(null=True, blank=True)
     date_of_death = models.DateField('Died', null=True, blank=True)
+    # Also bumped by catalog.signals when one of the author's books changes.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ['last_name', 'first_name']
+        indexes = [
+            models.Index(
+                fields=['last_name', 'first_name', 'id'],
+                name='author_name_idx',
+            ),
+        ]
 
     def get_absolute_url(self):
         return reverse('author-detail', args=[str(self.id)])
 
     def __str__(self):
         return f'{self.last_name}, {self.first_name}'
+
+
+class CatalogStats(models.Model):
+    """Materialized record counts shown on the home page."""
+
+    num_books = models.IntegerField(default=0)
+    num_instances = models.IntegerField(default=0)
+    num_instances_available = models.IntegerField(default=0)
+    num_authors = models.IntegerField(default=0)
+    # Home page views, written behind from the cache by catalog.visits.
+    num_visits = models.BigIntegerField(default=0)
+    # When a book, author or copy was last added or removed.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'catalog stats'
+
+    def __str__(self):
+        return f'{self.num_books} books, {self.num_instances} copies'
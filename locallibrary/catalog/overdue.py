@@ -0,0 +1,42 @@
+import datetime
+
+from django.db.models import Count, Min
+
+from catalog.models import BookInstance
+
+CHUNK_SIZE = 1000
+COLUMNS = ('borrower_id', 'username', 'email', 'loans', 'oldest_due_back',
+           'days_overdue')
+
+
+def borrower_summaries(today=None, chunk_size=CHUNK_SIZE):
+    """Yield one overdue summary per borrower, in borrower id order.
+
+    Each chunk is a single GROUP BY query over the overdue loans of the next
+    ``chunk_size`` borrowers, so no copy is ever loaded into memory and no
+    query holds a long-running transaction open.
+    """
+    today = today or datetime.date.today()
+    overdue = BookInstance.objects.overdue(today).filter(
+        borrower__isnull=False
+    )
+    last_id = 0
+    while True:
+        rows = list(
+            overdue.filter(borrower_id__gt=last_id)
+            .values('borrower_id', 'borrower__username', 'borrower__email')
+            .annotate(loans=Count('pk'), oldest_due_back=Min('due_back'))
+            .order_by('borrower_id')[:chunk_size]
+        )
+        if not rows:
+            return
+        for row in rows:
+            yield {
+                'borrower_id': row['borrower_id'],
+                'username': row['borrower__username'],
+                'email': row['borrower__email'],
+                'loans': row['loans'],
+                'oldest_due_back': row['oldest_due_back'],
+                'days_overdue': (today - row['oldest_due_back']).days,
+            }
+        last_id = rows[-1]['borrower_id']
@@ -0,0 +1,195 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import translation
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from catalog.routers import use_primary
+
+PAGE_KEY_PREFIX = 'page'
+TAG_KEY_PREFIX = 'page-tag'
+# Allowance for clocks of different workers disagreeing, in seconds.
+CLOCK_SKEW = 1.0
+
+
+def get_cache():
+    return caches[getattr(settings, 'PAGE_CACHE_ALIAS', 'default')]
+
+
+def is_cacheable(request):
+    """Only anonymous GET and HEAD requests share cached pages."""
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+    )
+
+
+def page_key(request):
+    """Cache key for the URL, query string and active language."""
+    url = hashlib.sha256(request.get_full_path().encode()).hexdigest()
+    return f'{PAGE_KEY_PREFIX}:{translation.get_language()}:{url}'
+
+
+def tag_key(tag):
+    return f'{TAG_KEY_PREFIX}:{tag}'
+
+
+def new_version(purged_at=0):
+    """A version token recording when the tag was last purged."""
+    return f'{purged_at:.6f}:{uuid.uuid4().hex}'
+
+
+def purged_at(version):
+    try:
+        return float(version.split(':', 1)[0])
+    except (AttributeError, ValueError):
+        return 0
+
+
+def get_tag_versions(tags):
+    """Current version token of each tag, creating missing ones."""
+    cache = get_cache()
+    keys = {tag: tag_key(tag) for tag in tags}
+    stored = cache.get_many(keys.values())
+    missing = [tag for tag, key in keys.items() if key not in stored]
+    if missing:
+        # add() leaves a token alone if a purge set one in the meantime.
+        for tag in missing:
+            cache.add(keys[tag], new_version(), timeout=None)
+        stored.update(cache.get_many([keys[tag] for tag in missing]))
+    return {tag: stored.get(key) for tag, key in keys.items()}
+
+
+def get_cached_page(request):
+    """Return the cached response, or None if missing or purged."""
+    cache = get_cache()
+    entry = cache.get(page_key(request))
+    if entry is None:
+        return None
+    current = cache.get_many([tag_key(tag) for tag in entry['tags']])
+    for tag, version in entry['tags'].items():
+        if current.get(tag_key(tag)) != version:
+            return None
+    return entry['response']
+
+
+def cache_page(request, response, tags, started):
+    """Store a rendered response, valid until any of its tags is purged.
+
+    ``started`` is the time.time() at which the view began reading. A
+    page whose tags were purged since then may show the data from before
+    the change, under the version from after it, so it is not stored.
+    """
+    versions = get_tag_versions(tags)
+    if any(
+        purged_at(version) >= started - CLOCK_SKEW
+        for version in versions.values()
+    ):
+        return
+    get_cache().set(
+        page_key(request),
+        {'tags': versions, 'response': response},
+        getattr(settings, 'PAGE_CACHE_TIMEOUT', 300),
+    )
+
+
+def purge(*tags):
+    """Invalidate every cached page that carries one of the tags.
+
+    Each tag gets a fresh random version token rather than an incremented
+    counter, so a token lost to eviction can never come back with a value
+    an old page was stored under. The tags are purged at once and again
+    when the current transaction commits, so that pages rendered from
+    the data as it was before the commit are not kept.
+    """
+    if tags:
+        set_versions(tags)
+        transaction.on_commit(lambda: set_versions(tags))
+
+
+def set_versions(tags):
+    now = time.time()
+    get_cache().set_many(
+        {tag_key(tag): new_version(now) for tag in tags}, timeout=None
+    )
+
+
+def conditional_cached_response(request, response):
+    """Answer a conditional request from a cached page's headers.
+
+    The entry is current, so its validators are too.
+    """
+    return get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=parse_http_date_safe(
+            response.get('Last-Modified', '')
+        ),
+        response=response,
+    )
+
+
+class PageCacheMixin:
+    """Serve anonymous requests for the view from the page cache.
+
+    List it first, before QueryBudgetMixin, so that a hit returns before
+    any other mixin runs. Views name the tags of a rendered page in
+    get_page_cache_tags().
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        response = get_cached_page(request)
+        if response is not None:
+            return conditional_cached_response(request, response)
+
+        started = time.time()
+        # Rendered from the primary: a lagging replica could still hold the
+        # data a purge has just replaced.
+        with use_primary():
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        if response.status_code == 200 and not response.cookies:
+            cache_page(
+                request, response,
+                self.get_page_cache_tags(response.context_data), started,
+            )
+        return response
+
+    def get_page_cache_tags(self, context):
+        return []
+
+
+# Tags of the pages rendered by the catalog views, from their context.
+
+def book_list_tags(context):
+    tags = ['book-list']
+    for book in context['book_list']:
+        tags += [f'book:{book.pk}', f'author:{book.author_id}']
+    return tags
+
+
+def book_detail_tags(context):
+    book = context['book']
+    return [f'book:{book.pk}', f'author:{book.author_id}'] + [
+        f'genre:{genre.pk}' for genre in book.genre.all()
+    ]
+
+
+def author_list_tags(context):
+    return ['author-list'] + [
+        f'author:{author.pk}' for author in context['author_list']
+    ]
+
+
+def author_detail_tags(context):
+    return [f'author:{context["author"].pk}'] + [
+        f'book:{book.pk}' for book in context['book_set']
+    ]
@@ -0,0 +1,294 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import F, Q, QuerySet
+from django.http import Http404
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+# Row counts that catalog.signals keeps up to date, by CatalogStats field.
+MAINTAINED_COUNTS = {
+    'catalog.book': 'num_books',
+    'catalog.bookinstance': 'num_instances',
+    'catalog.author': 'num_authors',
+}
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class KeysetPage:
+    """A page of results plus opaque cursors for its neighbours.
+
+    Mirrors the parts of django.core.paginator.Page that the templates use,
+    without a page number or a total count.
+    """
+
+    is_keyset = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Paginate a queryset by seeking past the last row of the previous page.
+
+    ``ordering`` lists the field names the queryset is sorted on, ascending,
+    and must end with a unique field so that every row has a distinct key.
+    Nullable fields sort last. Each page costs one indexed range query of
+    ``per_page + 1`` rows, whatever its depth, and no COUNT(*) is run.
+    Querysets of ``.values()`` dicts work too, as long as they include the
+    ordering fields.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.fields = [
+            queryset.model._meta.get_field(name) for name in ordering
+        ]
+
+    def page(self, cursor=None):
+        """Return the page that the given cursor points to."""
+        direction, key, queryset = self._page_query(cursor)
+        return self._make_page(direction, key, list(queryset))
+
+    async def apage(self, cursor=None):
+        """Async counterpart of page()."""
+        direction, key, queryset = self._page_query(cursor)
+        rows = [row async for row in queryset]
+        return self._make_page(direction, key, rows)
+
+    def _page_query(self, cursor):
+        if cursor:
+            direction, key = self.decode_cursor(cursor)
+        else:
+            direction, key = NEXT, None
+
+        queryset = self.queryset.order_by(*self._ordering(direction))
+        if key is not None:
+            queryset = queryset.filter(self._seek(direction, key))
+        return direction, key, queryset[:self.per_page + 1]
+
+    def _make_page(self, direction, key, rows):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == PREVIOUS:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, key is not None
+
+        return KeysetPage(
+            rows,
+            next_cursor=(
+                self.encode_cursor(NEXT, rows[-1])
+                if rows and has_next else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(PREVIOUS, rows[0])
+                if rows and has_previous else None
+            ),
+        )
+
+    def encode_cursor(self, direction, obj):
+        if isinstance(obj, dict):
+            key = [obj[field.name] for field in self.fields]
+        else:
+            key = [getattr(obj, field.attname) for field in self.fields]
+        payload = json.dumps([direction, key], cls=DjangoJSONEncoder)
+        token = base64.urlsafe_b64encode(payload.encode())
+        return token.decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, key = json.loads(base64.urlsafe_b64decode(padded))
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if len(key) != len(self.fields):
+                raise ValueError(key)
+            return direction, [
+                None if value is None else field.to_python(value)
+                for field, value in zip(self.fields, key)
+            ]
+        except (binascii.Error, TypeError, ValueError, ValidationError):
+            raise InvalidCursor(_('Invalid cursor.'))
+
+    def _ordering(self, direction):
+        ordering = []
+        for field in self.fields:
+            if direction == NEXT:
+                ordering.append(
+                    F(field.name).asc(nulls_last=True)
+                    if field.null else F(field.name).asc()
+                )
+            else:
+                ordering.append(
+                    F(field.name).desc(nulls_first=True)
+                    if field.null else F(field.name).desc()
+                )
+        return ordering
+
+    def _seek(self, direction, key):
+        """Build "(f1, f2, ...) > (v1, v2, ...)" with NULLs sorting last."""
+        condition = Q(pk__in=[])
+        for field, value in reversed(list(zip(self.fields, key))):
+            name = field.name
+            if value is None:
+                equal = Q(**{f'{name}__isnull': True})
+                if direction == NEXT:
+                    beyond = Q(pk__in=[])
+                else:
+                    beyond = Q(**{f'{name}__isnull': False})
+            else:
+                equal = Q(**{name: value})
+                if direction == NEXT:
+                    beyond = Q(**{f'{name}__gt': value})
+                    if field.null:
+                        beyond |= Q(**{f'{name}__isnull': True})
+                else:
+                    beyond = Q(**{f'{name}__lt': value})
+            condition = beyond | (equal & condition)
+        return condition
+
+
+class KeysetPaginationMixin:
+    """Switch a ListView to cursor pagination over ``keyset_ordering``.
+
+    Requests that still carry the ``page`` parameter fall back to the
+    regular numbered paginator so existing links keep working.
+    """
+
+    keyset_ordering = None
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.page_kwarg in self.request.GET or not self.keyset_ordering:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_ordering)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidPage as e:
+            raise Http404(str(e))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+def maintained_count(model, using):
+    """The row count kept in CatalogStats, for the models that have one."""
+    from catalog.models import CatalogStats
+
+    field = MAINTAINED_COUNTS.get(model._meta.label_lower)
+    if field is None:
+        return None
+    return CatalogStats.objects.using(using).values_list(
+        field, flat=True
+    ).first()
+
+
+def planner_count(model, using):
+    """The planner's row estimate for a whole table, where there is one."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)',
+                [connection.ops.quote_name(table)],
+            )
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s',
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for tables that were never analyzed.
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def filtered_count_estimate(queryset):
+    """The planner's estimate of the rows a filtered queryset matches."""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """A Paginator that does not count large result sets exactly.
+
+    Unfiltered querysets take their size from the counters in CatalogStats
+    or the database's table statistics. Filtered ones are counted up to
+    ``PAGINATION_EXACT_COUNT_LIMIT`` rows, which is exact for selective
+    filters; past that the query planner's estimate is used where the
+    database gives one. ``count_is_estimated`` tells the templates to say
+    "about".
+    """
+
+    count_is_estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        limit = getattr(settings, 'PAGINATION_EXACT_COUNT_LIMIT', 10000)
+        query = queryset.query
+        if query.where or query.distinct or query.group_by is not None:
+            counted = queryset.order_by()[:limit].count()
+            estimate = (
+                filtered_count_estimate(queryset) if counted >= limit
+                else None
+            )
+            if estimate is None or estimate <= limit:
+                # Selective filter, or nothing better than an exact count:
+                # an estimate below the rows already counted is wrong.
+                return counted if counted < limit else super().count
+        else:
+            estimate = maintained_count(queryset.model, queryset.db)
+            if estimate is None:
+                estimate = planner_count(queryset.model, queryset.db)
+            if estimate is None or estimate < limit:
+                return super().count
+        self.count_is_estimated = True
+        return max(estimate, limit)
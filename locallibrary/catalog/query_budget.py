@@ -0,0 +1,108 @@
+import functools
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import resolve
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """Database execute wrapper that counts the statements it sees."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries(budget, label):
+    """Count the queries run in the block and report a budget overrun.
+
+    With ``QUERY_BUDGET_STRICT`` enabled an overrun raises
+    QueryBudgetExceeded, otherwise it is logged as a warning.
+    """
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+    if counter.count > budget:
+        message = (
+            f'{label} ran {counter.count} queries, '
+            f'over its budget of {budget}'
+        )
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def run_within_budget(budget, label, view, request, *args, **kwargs):
+    with count_queries(budget, label) as counter:
+        response = view(request, *args, **kwargs)
+        # Template responses render lazily; render them here so that
+        # queries triggered from the template count against the view.
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+    response.query_count = counter.count
+    return response
+
+
+def query_budget(budget):
+    """Decorator declaring the most SQL queries a view function may run."""
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            return run_within_budget(
+                budget, view_func.__qualname__, view_func,
+                request, *args, **kwargs
+            )
+        wrapper.query_budget = budget
+        return wrapper
+    return decorator
+
+
+class QueryBudgetMixin:
+    """Class-based view counterpart of the query_budget decorator.
+
+    List it before any other mixin so that permission checks are counted.
+    """
+
+    query_budget = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.query_budget is None:
+            return super().dispatch(request, *args, **kwargs)
+        return run_within_budget(
+            self.query_budget, type(self).__qualname__, super().dispatch,
+            request, *args, **kwargs
+        )
+
+
+def get_query_budget(view):
+    """Return the budget declared on a resolved view callable."""
+    view_class = getattr(view, 'view_class', None)
+    if view_class is not None:
+        return view_class.query_budget
+    return getattr(view, 'query_budget', None)
+
+
+class QueryBudgetTestMixin:
+    """TestCase helpers that fail when a view overruns its query budget."""
+
+    def assertWithinQueryBudget(self, url, data=None, method='get',
+                                **extra):
+        budget = get_query_budget(resolve(url.split('?')[0]).func)
+        self.assertIsNotNone(budget, f'{url} does not declare a budget')
+        with override_settings(QUERY_BUDGET_STRICT=True):
+            response = getattr(self.client, method)(url, data, **extra)
+        self.assertLessEqual(response.query_count, budget)
+        return response
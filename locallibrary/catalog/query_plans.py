@@ -0,0 +1,118 @@
+import datetime
+import json
+import re
+import uuid
+
+from django.contrib.auth.models import User
+from django.db import connections
+
+from catalog.constants import LoanStatus
+from catalog.models import Author, Book, BookInstance
+
+
+def access_paths(user, book):
+    """The queries behind each view, keyed by a short label."""
+    today = datetime.date.today()
+    return {
+        'book-list': Book.objects.select_related('author').order_by(
+            'title', 'id'
+        )[:10],
+        'author-list': Author.objects.order_by(
+            'last_name', 'first_name', 'id'
+        )[:10],
+        'book-detail copies': book.bookinstance_set.all(),
+        'my-borrowed': BookInstance.objects.filter(
+            borrower=user, status=LoanStatus.ON_LOAN.value
+        ).select_related('book').order_by('due_back', 'id')[:10],
+        'index available count': BookInstance.objects.filter(
+            status=LoanStatus.AVAILABLE.value
+        ),
+        'admin status filter': BookInstance.objects.filter(
+            status=LoanStatus.ON_LOAN.value, due_back__lt=today
+        ),
+        'book-list freshness': Book.objects.order_by(
+            '-updated_at'
+        ).values('updated_at')[:1],
+        'author-list freshness': Author.objects.order_by(
+            '-updated_at'
+        ).values('updated_at')[:1],
+        'book counters recount': BookInstance.objects.filter(
+            book_id__in=[book.pk]
+        ).values('book_id', 'status'),
+    }
+
+
+def explain(queryset, using='default'):
+    """Return the backend's plan for the queryset as text."""
+    vendor = connections[using].vendor
+    if vendor == 'mysql':
+        return queryset.using(using).explain(format='json')
+    return queryset.using(using).explain()
+
+
+def full_scans(plan, vendor):
+    """Tables the plan reads in full, without an index."""
+    if vendor == 'sqlite':
+        # "SCAN t" is a full scan; "SCAN t USING INDEX i" walks an index.
+        return re.findall(r'\bSCAN (\w+)(?! USING)\s*$', plan, re.MULTILINE)
+    if vendor == 'postgresql':
+        return re.findall(r'Seq Scan on (\w+)', plan)
+    if vendor == 'mysql':
+        tables = []
+
+        def walk(node):
+            if isinstance(node, dict):
+                if node.get('access_type') == 'ALL':
+                    tables.append(node.get('table_name'))
+                for value in node.values():
+                    walk(value)
+            elif isinstance(node, list):
+                for value in node:
+                    walk(value)
+
+        walk(json.loads(plan))
+        return tables
+    raise NotImplementedError(f'Cannot read {vendor} query plans.')
+
+
+def seed(books, copies_per_book, using='default'):
+    """Insert a spread of authors, books, borrowers and copies."""
+    Author.objects.using(using).bulk_create([
+        Author(first_name=f'First{i}', last_name=f'Last{i % 500}')
+        for i in range(max(books // 4, 1))
+    ])
+    authors = list(
+        Author.objects.using(using).values_list('pk', flat=True)
+    )
+    Book.objects.using(using).bulk_create([
+        Book(
+            title=f'Book {i:07d}',
+            summary='Seeded for the query plan check.',
+            isbn=f'P{i:012d}',
+            author_id=authors[i % len(authors)],
+        )
+        for i in range(books)
+    ])
+    User.objects.using(using).bulk_create([
+        User(username=f'plan-borrower-{i}') for i in range(50)
+    ])
+    users = list(User.objects.using(using).filter(
+        username__startswith='plan-borrower-'
+    ).values_list('pk', flat=True))
+    statuses = [status.value for status in LoanStatus]
+    book_ids = Book.objects.using(using).filter(
+        isbn__startswith='P'
+    ).values_list('pk', flat=True)
+    today = datetime.date.today()
+    BookInstance.objects.using(using).bulk_create([
+        BookInstance(
+            id=uuid.uuid4(),
+            book_id=book_id,
+            imprint='Seeded',
+            status=statuses[n % len(statuses)],
+            borrower_id=users[n % len(users)],
+            due_back=today + datetime.timedelta(days=n % 60 - 30),
+        )
+        for book_id in book_ids
+        for n in range(copies_per_book)
+    ], batch_size=1000)
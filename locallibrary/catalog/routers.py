@@ -0,0 +1,185 @@
+"""Send reads to the replica databases and everything else to the primary.
+
+Reads go to a healthy alias from ``DATABASE_REPLICAS`` unless the current
+request or block is pinned to the primary: requests that write are, and
+so are the following requests of the same client for
+``REPLICA_STICKY_SECONDS`` (see ReplicaStickinessMiddleware), so that
+people see their own renewals, returns and edits despite replication
+lag. Writes, and reads made for update such as ``select_for_update()``,
+always go to the primary.
+
+So do the reads that fill shared caches: pages for the anonymous page
+cache, loan summaries and permission sets. Those entries are dropped on
+every change, and a replica that has not replayed the change yet would
+put the old data straight back until the entry times out.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PRIMARY = DEFAULT_DB_ALIAS
+STICKY_COOKIE = 'use_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_use_primary = ContextVar('use_primary', default=False)
+
+
+@contextmanager
+def use_primary():
+    """Route every read in the block to the primary."""
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class ReplicaHealth:
+    """Per-process record of which replicas answered their last check.
+
+    A replica is checked at most every ``REPLICA_HEALTH_CHECK_INTERVAL``
+    seconds; one that cannot be reached, or on PostgreSQL lags more than
+    ``REPLICA_MAX_LAG`` seconds behind, is skipped until the next check.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked = {}
+
+    def is_healthy(self, alias):
+        interval = getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 30)
+        with self.lock:
+            healthy, checked_at = self.checked.get(alias, (None, 0))
+            fresh = time.monotonic() - checked_at < interval
+            if healthy is not None and fresh:
+                return healthy
+            # Let other threads use the previous answer while this one
+            # checks.
+            self.checked[alias] = (bool(healthy), time.monotonic())
+        healthy = check_replica(alias)
+        with self.lock:
+            self.checked[alias] = (healthy, time.monotonic())
+        return healthy
+
+    def reset(self):
+        with self.lock:
+            self.checked.clear()
+
+
+health = ReplicaHealth()
+
+
+def check_replica(alias):
+    """Whether ``alias`` answers a query and is not too far behind."""
+    if alias not in connections:
+        return False
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # A replica that has replayed all it received is current,
+                # however long ago the last write on the primary was.
+                cursor.execute(
+                    'SELECT CASE WHEN pg_last_wal_receive_lsn() = '
+                    'pg_last_wal_replay_lsn() THEN 0 ELSE COALESCE('
+                    'EXTRACT(EPOCH FROM now() - '
+                    'pg_last_xact_replay_timestamp()), 0) END'
+                )
+                lag = cursor.fetchone()[0]
+                max_lag = getattr(settings, 'REPLICA_MAX_LAG', 30)
+                return lag <= max_lag
+            cursor.execute('SELECT 1')
+            return True
+    except DatabaseError:
+        connection.close()
+        return False
+
+
+def healthy_replicas():
+    return [
+        alias for alias in getattr(settings, 'DATABASE_REPLICAS', ())
+        if health.is_healthy(alias)
+    ]
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if _use_primary.get() or connections[PRIMARY].in_atomic_block:
+            # Reads inside a transaction on the primary must see its
+            # uncommitted writes.
+            return PRIMARY
+        replicas = healthy_replicas()
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class ReplicaStickinessMiddleware:
+    """Pin a client's reads to the primary for a while after it writes.
+
+    Requests with an unsafe method read from the primary and set a cookie
+    asking for the same during the next ``REPLICA_STICKY_SECONDS``. The
+    pin is a context variable, so it also reaches the threads that async
+    views run their queries in.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not is_sticky(request):
+            return self.get_response(request)
+        with use_primary():
+            response = self.get_response(request)
+        return stick(request, response)
+
+    async def __acall__(self, request):
+        if not is_sticky(request):
+            return await self.get_response(request)
+        with use_primary():
+            response = await self.get_response(request)
+        return stick(request, response)
+
+
+def is_sticky(request):
+    """Whether the request's reads should go to the primary."""
+    if not getattr(settings, 'DATABASE_REPLICAS', None):
+        return False
+    if request.method not in SAFE_METHODS:
+        return True
+    try:
+        return float(request.COOKIES[STICKY_COOKIE]) > time.time()
+    except (KeyError, ValueError):
+        return False
+
+
+def stick(request, response):
+    if request.method not in SAFE_METHODS:
+        seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+        response.set_cookie(
+            STICKY_COOKIE, f'{time.time() + seconds:.0f}',
+            max_age=seconds, httponly=True, samesite='Lax',
+        )
+    return response
@@ -0,0 +1,323 @@
+import re
+from dataclasses import dataclass
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from catalog.models import Book
+
+INDEX_TABLE = 'catalog_book_fts'
+# Postgres text search configuration; 'simple' does no stemming, which
+# keeps English and Vietnamese titles searchable with the same index.
+PG_SEARCH_CONFIG = 'simple'
+SNIPPET_WORDS = 16
+# Private-use characters delimit highlighted terms in the raw snippets.
+# They cannot be typed into the search box and are swapped for <mark>
+# tags only after the snippet text has been escaped.
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_END = '\ue001'
+
+TERM_RE = re.compile(r'\w+')
+
+
+@dataclass
+class SearchHit:
+    book_id: int
+    rank: float
+    snippet: str
+
+
+class SearchBackend:
+    """Full-text index over book titles, summaries, authors and genres.
+
+    Each database vendor keeps the index in its own native structure in
+    the ``catalog_book_fts`` table, which migration 0006 creates.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {INDEX_TABLE}')
+
+    def remove(self, book_ids):
+        book_ids = list(book_ids)
+        if not book_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(book_ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {INDEX_TABLE} '
+                f'WHERE {self.key_column} IN ({placeholders})',
+                book_ids,
+            )
+
+    def prune(self):
+        """Remove the entries of books that no longer exist."""
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {INDEX_TABLE} '
+                f'WHERE {self.key_column} NOT IN '
+                f'(SELECT id FROM {Book._meta.db_table})'
+            )
+
+    def index(self, documents):
+        raise NotImplementedError
+
+    def search(self, query, limit):
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 virtual table keyed by the book id as rowid."""
+
+    key_column = 'rowid'
+
+    def index(self, documents):
+        self.remove(document[0] for document in documents)
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {INDEX_TABLE} '
+                '(rowid, title, summary, authors, genres) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                documents,
+            )
+
+    def search(self, query, limit):
+        terms = TERM_RE.findall(query)
+        if not terms:
+            return []
+        # Quote every term so user input cannot use FTS5 query syntax,
+        # and prefix-match the last one for search-as-you-type.
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, -bm25({INDEX_TABLE}, 10.0, 1.0, 5.0, 3.0), '
+                f"snippet({INDEX_TABLE}, -1, %s, %s, '…', %s) "
+                f'FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s '
+                'ORDER BY 2 DESC LIMIT %s',
+                [HIGHLIGHT_START, HIGHLIGHT_END, SNIPPET_WORDS, match, limit],
+            )
+            return [SearchHit(*row) for row in cursor.fetchall()]
+
+
+class PostgreSQLSearchBackend(SearchBackend):
+    """Weighted tsvector column with a GIN index."""
+
+    key_column = 'book_id'
+
+    def index(self, documents):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {INDEX_TABLE} '
+                '(book_id, title, summary, authors, genres, document) '
+                'VALUES (%s, %s, %s, %s, %s, '
+                "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'B') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'C') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'D')) "
+                'ON CONFLICT (book_id) DO UPDATE SET '
+                'title = EXCLUDED.title, summary = EXCLUDED.summary, '
+                'authors = EXCLUDED.authors, genres = EXCLUDED.genres, '
+                'document = EXCLUDED.document',
+                [
+                    (
+                        book_id, title, summary, authors, genres,
+                        PG_SEARCH_CONFIG, title,
+                        PG_SEARCH_CONFIG, authors,
+                        PG_SEARCH_CONFIG, genres,
+                        PG_SEARCH_CONFIG, summary,
+                    )
+                    for book_id, title, summary, authors, genres in documents
+                ],
+            )
+
+    def search(self, query, limit):
+        # Rank and limit first so ts_headline only runs on returned rows.
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT hit.book_id, hit.rank, ts_headline('
+                "%s::regconfig, hit.title || ' ' || hit.summary, hit.query, "
+                '%s) FROM ('
+                'SELECT book_id, title, summary, query, '
+                'ts_rank_cd(document, query) AS rank '
+                f'FROM {INDEX_TABLE}, '
+                'websearch_to_tsquery(%s::regconfig, %s) AS query '
+                'WHERE document @@ query '
+                'ORDER BY rank DESC LIMIT %s) AS hit '
+                'ORDER BY hit.rank DESC',
+                [
+                    PG_SEARCH_CONFIG,
+                    f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, '
+                    f'MaxWords={SNIPPET_WORDS}, MinWords=5',
+                    PG_SEARCH_CONFIG, query, limit,
+                ],
+            )
+            return [SearchHit(*row) for row in cursor.fetchall()]
+
+
+class MySQLSearchBackend(SearchBackend):
+    """InnoDB table with a FULLTEXT index across all searchable columns."""
+
+    key_column = 'book_id'
+
+    def index(self, documents):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'REPLACE INTO {INDEX_TABLE} '
+                '(book_id, title, summary, authors, genres) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                documents,
+            )
+
+    def search(self, query, limit):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT book_id, MATCH (title, summary, authors, genres) '
+                'AGAINST (%s IN NATURAL LANGUAGE MODE) AS score, '
+                f'title, summary FROM {INDEX_TABLE} '
+                'WHERE MATCH (title, summary, authors, genres) '
+                'AGAINST (%s IN NATURAL LANGUAGE MODE) '
+                'ORDER BY score DESC LIMIT %s',
+                [query, query, limit],
+            )
+            terms = TERM_RE.findall(query)
+            return [
+                SearchHit(book_id, score, highlight_terms(
+                    f'{title} {summary}', terms
+                ))
+                for book_id, score, title, summary in cursor.fetchall()
+            ]
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgreSQLSearchBackend,
+    'mysql': MySQLSearchBackend,
+}
+
+
+def get_search_backend(using=None):
+    """Return the search backend matching the database vendor."""
+    conn = using or connection
+    return BACKENDS[conn.vendor](conn)
+
+
+def highlight_terms(text, terms):
+    """Cut a snippet around the first matching term and mark all matches."""
+    words = text.split()
+    lowered = {term.lower() for term in terms}
+    first = next(
+        (
+            i for i, word in enumerate(words)
+            if any(t in lowered for t in TERM_RE.findall(word.lower()))
+        ),
+        0,
+    )
+    start = max(first - SNIPPET_WORDS // 4, 0)
+    window = words[start:start + SNIPPET_WORDS]
+    marked = [
+        f'{HIGHLIGHT_START}{word}{HIGHLIGHT_END}'
+        if any(t in lowered for t in TERM_RE.findall(word.lower()))
+        else word
+        for word in window
+    ]
+    snippet = ' '.join(marked)
+    if start:
+        snippet = '… ' + snippet
+    if start + SNIPPET_WORDS < len(words):
+        snippet += ' …'
+    return snippet
+
+
+def render_snippet(snippet):
+    """Escape a raw snippet and turn its markers into <mark> tags."""
+    html = escape(snippet or '')
+    html = html.replace(HIGHLIGHT_START, '<mark>')
+    html = html.replace(HIGHLIGHT_END, '</mark>')
+    return mark_safe(html)
+
+
+def build_documents(book_ids):
+    """Return (id, title, summary, authors, genres) rows for the books."""
+    genres = {}
+    genre_rows = Book.genre.through.objects.filter(
+        book_id__in=book_ids
+    ).values_list('book_id', 'genre__name').order_by('book_id', 'genre__name')
+    for book_id, name in genre_rows:
+        genres.setdefault(book_id, []).append(name)
+
+    books = Book.objects.filter(pk__in=book_ids).values_list(
+        'id', 'title', 'summary', 'author__first_name', 'author__last_name'
+    )
+    return [
+        (
+            book_id,
+            title,
+            summary,
+            ' '.join(filter(None, [first_name, last_name])),
+            ' '.join(genres.get(book_id, [])),
+        )
+        for book_id, title, summary, first_name, last_name in books
+    ]
+
+
+def index_books(book_ids):
+    """Add or refresh the index entries of the given books."""
+    book_ids = list(book_ids)
+    if not book_ids:
+        return
+    documents = build_documents(book_ids)
+    backend = get_search_backend()
+    backend.index(documents)
+    missing = set(book_ids) - {document[0] for document in documents}
+    backend.remove(missing)
+
+
+def remove_books(book_ids):
+    get_search_backend().remove(book_ids)
+
+
+def rebuild_index(batch_size=1000):
+    """Re-index every book in primary key order; return the count.
+
+    Entries are refreshed in place and stale ones pruned at the end, so
+    searches keep working while the rebuild runs.
+    """
+    backend = get_search_backend()
+    indexed = 0
+    last_id = 0
+    while True:
+        book_ids = list(
+            Book.objects.filter(pk__gt=last_id)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not book_ids:
+            backend.prune()
+            return indexed
+        backend.index(build_documents(book_ids))
+        indexed += len(book_ids)
+        last_id = book_ids[-1]
+
+
+def search_books(query, limit=20):
+    """Return ranked results with their Book objects and HTML snippets."""
+    query = query.strip()
+    if not query:
+        return []
+    hits = get_search_backend().search(query, limit)
+    books = Book.objects.select_related('author').in_bulk(
+        [hit.book_id for hit in hits]
+    )
+    return [
+        {
+            'book': books[hit.book_id],
+            'rank': hit.rank,
+            'snippet': render_snippet(hit.snippet),
+        }
+        for hit in hits
+        if hit.book_id in books
+    ]
@@ -0,0 +1,222 @@
+"""Synthetic catalog data for load tests and query plan checks.
+
+Popularity is Zipfian: a few authors write most of the books, and a few
+books and borrowers account for most of the loans, as in a real library.
+"""
+import datetime
+import itertools
+import random
+import uuid
+from dataclasses import dataclass
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+
+from catalog import page_cache, search
+from catalog.constants import LoanStatus
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog.signals import touch_authors
+from catalog.stats import rebuild_catalog_stats, reconcile_book_counters
+
+FIRST_NAMES = (
+    'Ada', 'Ben', 'Chloe', 'Dev', 'Emma', 'Femi', 'Grace', 'Hiro', 'Iris',
+    'Jon', 'Kira', 'Liam', 'Mei', 'Noah', 'Olga', 'Priya', 'Quinn', 'Ravi',
+    'Sara', 'Tom', 'Uma', 'Vic', 'Wen', 'Yusuf', 'Zoe',
+)
+LAST_NAMES = (
+    'Adams', 'Brown', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Hill',
+    'Ito', 'Jones', 'Khan', 'Lopez', 'Moore', 'Nguyen', 'Okafor', 'Patel',
+    'Rossi', 'Silva', 'Taylor', 'Walker', 'Young',
+)
+WORDS = (
+    'shadow', 'river', 'empire', 'garden', 'winter', 'secret', 'machine',
+    'island', 'crown', 'letter', 'storm', 'city', 'mirror', 'forest',
+    'voyage', 'memory', 'fire', 'glass', 'night', 'song', 'stone', 'tide',
+)
+GENRE_NAMES = (
+    'Fantasy', 'Science Fiction', 'Mystery', 'Romance', 'History', 'Poetry',
+    'Horror', 'Biography', 'Travel', 'Philosophy', 'Crime', 'Humour',
+)
+
+# Copies not on loan are mostly available, with a few reserved or in
+# maintenance.
+SHELF_STATUSES = (
+    (LoanStatus.AVAILABLE.value,) * 8
+    + (LoanStatus.RESERVED.value, LoanStatus.MAINTENANCE.value)
+)
+
+
+@dataclass
+class SeedStats:
+    authors: int = 0
+    genres: int = 0
+    books: int = 0
+    copies: int = 0
+    users: int = 0
+    loans: int = 0
+
+
+def zipf_weights(n, skew):
+    """Cumulative weights giving the item of rank k a share of 1/k**skew."""
+    return list(itertools.accumulate(
+        1 / (rank ** skew) for rank in range(1, n + 1)
+    ))
+
+
+def zipf_sample(rng, population, k, skew):
+    """``k`` picks from ``population``, its first items the most popular."""
+    if not population:
+        return []
+    weights = zipf_weights(len(population), skew)
+    return rng.choices(population, cum_weights=weights, k=k)
+
+
+def batched(items, size):
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+class CatalogSeeder:
+    """Bulk insert a synthetic catalog on top of whatever is there.
+
+    ISBNs and usernames carry a per-run token so that repeated runs add to
+    the catalog instead of colliding with earlier ones.
+    """
+
+    def __init__(self, skew=1.1, seed=None, batch_size=1000):
+        self.skew = skew
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        # Not drawn from self.rng, so that runs with the same seed differ.
+        self.token = uuid.uuid4().hex[:6]
+        self.stats = SeedStats()
+
+    def run(self, authors=100, books=1000, genres=10, copies_per_book=3,
+            users=100, loans=500):
+        with transaction.atomic():
+            author_ids = self.create_authors(authors)
+            genre_ids = self.create_genres(genres)
+            book_ids = self.create_books(books, author_ids, genre_ids)
+            user_ids = self.create_users(users)
+            self.create_copies(book_ids, copies_per_book, user_ids, loans)
+
+            # bulk_create sends no signals, so bring the derived data up
+            # to date in bulk.
+            for batch in batched(book_ids, self.batch_size):
+                reconcile_book_counters(batch)
+                search.index_books(batch)
+            for batch in batched(author_ids, self.batch_size):
+                touch_authors(pk__in=batch)
+            rebuild_catalog_stats()
+        page_cache.purge('book-list', 'author-list')
+        return self.stats
+
+    def name(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def create_authors(self, count):
+        last_pk = Author.objects.aggregate(last=Max('pk'))['last'] or 0
+        Author.objects.bulk_create([
+            Author(first_name=first_name, last_name=last_name)
+            for first_name, last_name in (self.name() for _ in range(count))
+        ], batch_size=self.batch_size)
+        self.stats.authors = count
+        # Look the new ids up; MySQL does not return them from a bulk insert.
+        return list(Author.objects.filter(
+            pk__gt=last_pk
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_genres(self, count):
+        names = [
+            GENRE_NAMES[i % len(GENRE_NAMES)]
+            + (f' {i // len(GENRE_NAMES) + 1}' if i >= len(GENRE_NAMES)
+               else '')
+            for i in range(count)
+        ]
+        existing = set(Genre.objects.filter(
+            name__in=names
+        ).values_list('name', flat=True))
+        Genre.objects.bulk_create([
+            Genre(name=name) for name in names if name not in existing
+        ])
+        self.stats.genres = len(set(names) - existing)
+        return list(Genre.objects.filter(
+            name__in=names
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_books(self, count, author_ids, genre_ids):
+        authors = zipf_sample(self.rng, author_ids, count, self.skew)
+        Book.objects.bulk_create([
+            Book(
+                title=' '.join(self.rng.sample(WORDS, 3)).capitalize(),
+                summary=' '.join(self.rng.choices(WORDS, k=30)),
+                isbn=f'S{self.token}{i:06d}',
+                author_id=author,
+            )
+            for i, author in enumerate(authors)
+        ], batch_size=self.batch_size)
+        self.stats.books = count
+        book_ids = list(Book.objects.filter(
+            isbn__startswith=f'S{self.token}'
+        ).order_by('isbn').values_list('pk', flat=True))
+
+        if genre_ids:
+            Book.genre.through.objects.bulk_create([
+                Book.genre.through(book_id=book_id, genre_id=genre_id)
+                for book_id in book_ids
+                for genre_id in set(zipf_sample(
+                    self.rng, genre_ids, self.rng.randint(1, 2), self.skew
+                ))
+            ], batch_size=self.batch_size)
+        return book_ids
+
+    def create_users(self, count):
+        User.objects.bulk_create([
+            User(username=f'reader-{self.token}-{i}')
+            for i in range(count)
+        ], batch_size=self.batch_size)
+        self.stats.users = count
+        return list(User.objects.filter(
+            username__startswith=f'reader-{self.token}-'
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_copies(self, book_ids, copies_per_book, user_ids, loans):
+        """Insert the copies, lending out those of the popular books.
+
+        Loans go to books picked with Zipfian weights, each to a copy
+        still on the shelf; picks of a fully lent book are dropped.
+        """
+        shelf = {book_id: copies_per_book for book_id in book_ids}
+        lent = {book_id: [] for book_id in book_ids}
+        picks = zipf_sample(self.rng, book_ids, loans, self.skew)
+        borrowers = zipf_sample(self.rng, user_ids, loans, self.skew)
+        today = datetime.date.today()
+        for book_id, borrower in zip(picks, borrowers):
+            if shelf[book_id]:
+                shelf[book_id] -= 1
+                # About one loan in ten is overdue.
+                due_back = today + datetime.timedelta(
+                    days=self.rng.randint(-3, 27)
+                )
+                lent[book_id].append((borrower, due_back))
+
+        def copies():
+            for book_id in book_ids:
+                for borrower, due_back in lent[book_id]:
+                    yield BookInstance(
+                        id=uuid.uuid4(), book_id=book_id, imprint='Seeded',
+                        status=LoanStatus.ON_LOAN.value,
+                        borrower_id=borrower, due_back=due_back,
+                    )
+                for _ in range(shelf[book_id]):
+                    yield BookInstance(
+                        id=uuid.uuid4(), book_id=book_id, imprint='Seeded',
+                        status=self.rng.choice(SHELF_STATUSES),
+                    )
+
+        for batch in batched(copies(), self.batch_size):
+            BookInstance.objects.bulk_create(batch)
+            self.stats.copies += len(batch)
+        self.stats.loans = sum(len(loaned) for loaned in lent.values())
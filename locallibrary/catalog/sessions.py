@@ -0,0 +1,34 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def uses_session_table():
+    """Whether the session engine keeps rows in django_session."""
+    engine = import_module(settings.SESSION_ENGINE)
+    return issubclass(engine.SessionStore, DBSessionStore)
+
+
+def purge_expired_sessions(batch_size=BATCH_SIZE, now=None):
+    """Delete expired sessions a batch at a time; return how many.
+
+    Unlike ``clearsessions``, which deletes every expired row in one
+    statement, each DELETE here touches at most ``batch_size`` rows so it
+    never holds locks on a large part of the table.
+    """
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        keys = list(
+            Session.objects.filter(expire_date__lt=now)
+            .values_list('session_key', flat=True)[:batch_size]
+        )
+        if not keys:
+            return deleted
+        Session.objects.filter(session_key__in=keys).delete()
+        deleted += len(keys)
@@ -0,0 +1,357 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from catalog import auth, loans, page_cache, search
+from catalog.constants import LoanStatus
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog.stats import (
+    adjust_book_counters, adjust_catalog_stats, adjust_many_book_counters,
+    copy_deltas
+)
+
+AVAILABLE = LoanStatus.AVAILABLE.value
+
+# Sent by code that changes copies with QuerySet.update(), which sends no
+# model signals. ``transitions`` lists (book_id, old_status, new_status)
+# for each copy changed, and ``borrower_ids``, where given, the users whose
+# loans changed: the copies' borrowers before and after.
+instances_transitioned = Signal()
+
+
+# Catalog statistics
+
+@receiver(post_save, sender=Book)
+def count_book_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_catalog_stats(num_books=1)
+
+
+@receiver(post_delete, sender=Book)
+def count_book_deleted(sender, instance, **kwargs):
+    adjust_catalog_stats(num_books=-1)
+
+
+@receiver(post_save, sender=Author)
+def count_author_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_catalog_stats(num_authors=1)
+
+
+@receiver(post_delete, sender=Author)
+def count_author_deleted(sender, instance, **kwargs):
+    adjust_catalog_stats(num_authors=-1)
+
+
+@receiver(post_save, sender=BookInstance)
+def count_bookinstance_saved(sender, instance, created, raw=False,
+                             **kwargs):
+    if raw:
+        return
+    old_status = None if created else instance.loaded_value('status')
+    adjust_catalog_stats(
+        num_instances=1 if created else 0,
+        num_instances_available=(
+            (instance.status == AVAILABLE) - (old_status == AVAILABLE)
+        ),
+    )
+
+
+@receiver(post_delete, sender=BookInstance)
+def count_bookinstance_deleted(sender, instance, **kwargs):
+    adjust_catalog_stats(
+        num_instances=-1,
+        num_instances_available=-(
+            instance.loaded_value('status') == AVAILABLE
+        ),
+    )
+
+
+# Per-book copy counters
+
+@receiver(post_save, sender=BookInstance)
+def count_book_copies_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_book_counters(
+            instance.book_id, **copy_deltas(None, instance.status, total=1)
+        )
+        return
+
+    old_book_id = instance.loaded_value('book_id')
+    old_status = instance.loaded_value('status')
+    if old_book_id != instance.book_id:
+        adjust_book_counters(
+            old_book_id, **copy_deltas(old_status, None, total=-1)
+        )
+        adjust_book_counters(
+            instance.book_id, **copy_deltas(None, instance.status, total=1)
+        )
+    else:
+        adjust_book_counters(
+            instance.book_id, **copy_deltas(old_status, instance.status)
+        )
+
+
+@receiver(post_delete, sender=BookInstance)
+def count_book_copies_deleted(sender, instance, **kwargs):
+    adjust_book_counters(
+        instance.loaded_value('book_id'),
+        **copy_deltas(instance.loaded_value('status'), None, total=-1)
+    )
+
+
+@receiver(instances_transitioned)
+def count_copy_transitions(sender, transitions, **kwargs):
+    adjust_catalog_stats(num_instances_available=sum(
+        (new == AVAILABLE) - (old == AVAILABLE)
+        for _, old, new in transitions
+    ))
+    deltas_by_book = {}
+    for book_id, old, new in transitions:
+        deltas = deltas_by_book.setdefault(book_id, {})
+        for field, delta in copy_deltas(old, new).items():
+            deltas[field] = deltas.get(field, 0) + delta
+    adjust_many_book_counters(deltas_by_book)
+
+
+# Full-text search index
+
+@receiver(post_save, sender=Book)
+def index_book_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_books([instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def index_book_deleted(sender, instance, **kwargs):
+    search.remove_books([instance.pk])
+
+
+def remember_books(instance, books):
+    """Note the affected books before their relations are cleared."""
+    instance._search_book_ids = list(books.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def index_book_genres_changed(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            search.index_books([instance.pk])
+    elif action == 'pre_clear':
+        remember_books(instance, Book.objects.filter(genre=instance))
+    elif action in ('post_add', 'post_remove'):
+        search.index_books(pk_set)
+    elif action == 'post_clear':
+        search.index_books(instance._search_book_ids)
+
+
+@receiver(pre_delete, sender=Author)
+def remember_author_books(sender, instance, **kwargs):
+    remember_books(instance, Book.objects.filter(author=instance))
+
+
+@receiver(pre_delete, sender=Genre)
+def remember_genre_books(sender, instance, **kwargs):
+    remember_books(instance, Book.objects.filter(genre=instance))
+
+
+@receiver(post_save, sender=Author)
+def index_author_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        search.index_books(
+            Book.objects.filter(author=instance).values_list('pk', flat=True)
+        )
+
+
+@receiver(post_save, sender=Genre)
+def index_genre_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        search.index_books(
+            Book.objects.filter(genre=instance).values_list('pk', flat=True)
+        )
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+def index_relation_deleted(sender, instance, **kwargs):
+    search.index_books(getattr(instance, '_search_book_ids', []))
+
+
+# Anonymous page cache
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def purge_book_pages(sender, instance, **kwargs):
+    # Any change to a book can move it between list pages.
+    page_cache.purge(
+        f'book:{instance.pk}', 'book-list', f'author:{instance.author_id}'
+    )
+
+
+@receiver(post_save, sender=BookInstance)
+@receiver(post_delete, sender=BookInstance)
+def purge_copy_pages(sender, instance, **kwargs):
+    book_ids = {instance.book_id, instance.loaded_value('book_id')}
+    page_cache.purge(
+        *(f'book:{book_id}' for book_id in book_ids if book_id is not None)
+    )
+
+
+@receiver(instances_transitioned)
+def purge_transitioned_pages(sender, transitions, **kwargs):
+    page_cache.purge(*{f'book:{book_id}' for book_id, _, _ in transitions})
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def purge_author_pages(sender, instance, **kwargs):
+    page_cache.purge(f'author:{instance.pk}', 'author-list')
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def purge_genre_pages(sender, instance, **kwargs):
+    page_cache.purge(f'genre:{instance.pk}')
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def purge_book_genre_pages(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            page_cache.purge(f'book:{instance.pk}')
+    elif action in ('post_add', 'post_remove'):
+        page_cache.purge(*(f'book:{pk}' for pk in pk_set))
+    elif action == 'post_clear':
+        page_cache.purge(f'genre:{instance.pk}')
+
+
+# Cached loan summaries (see catalog.loans)
+
+@receiver(post_save, sender=BookInstance)
+@receiver(post_delete, sender=BookInstance)
+def invalidate_copy_loans(sender, instance, raw=False, **kwargs):
+    if not raw:
+        loans.invalidate_loan_summaries(
+            [instance.borrower_id, instance.loaded_value('borrower_id')]
+        )
+
+
+@receiver(instances_transitioned)
+def invalidate_transitioned_loans(sender, borrower_ids=(), **kwargs):
+    loans.invalidate_loan_summaries(borrower_ids)
+
+
+@receiver(post_save, sender=Book)
+def invalidate_book_loans(sender, instance, created, raw=False, **kwargs):
+    # The summaries show the title of each book on loan.
+    if not created and not raw:
+        loans.invalidate_loan_summaries(
+            BookInstance.objects.filter(
+                book=instance, status=LoanStatus.ON_LOAN.value
+            ).values_list('borrower_id', flat=True).distinct()
+        )
+
+
+# Modification times read by catalog.conditional. Copies bump their book
+# in adjust_book_counters.
+
+def touch_books(**filters):
+    Book.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+def touch_authors(**filters):
+    Author.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def touch_book_author(sender, instance, raw=False, **kwargs):
+    if instance.author_id is not None and not raw:
+        touch_authors(pk=instance.author_id)
+
+
+@receiver(post_save, sender=Author)
+def touch_author_books(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        touch_books(author=instance)
+
+
+@receiver(post_save, sender=Genre)
+def touch_genre_books(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        touch_books(genre=instance)
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+def touch_related_books(sender, instance, **kwargs):
+    book_ids = getattr(instance, '_search_book_ids', [])
+    if book_ids:
+        touch_books(pk__in=book_ids)
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def touch_book_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_books(pk=instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        touch_books(pk__in=pk_set)
+    elif action == 'post_clear':
+        touch_books(pk__in=instance._search_book_ids)
+
+
+# Cached permission sets (see catalog.auth)
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_changed_permissions(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        auth.invalidate_permissions()
+
+
+# Flags that grant or withhold every permission at once.
+USER_PERMISSION_FLAGS = ('is_superuser', 'is_active')
+
+
+@receiver(pre_save, sender=User)
+def remember_user_flags(sender, instance, raw=False, update_fields=None,
+                        **kwargs):
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(
+        USER_PERMISSION_FLAGS
+    ):
+        # e.g. the last_login update on every sign-in.
+        return
+    instance._permission_flags = User.objects.filter(
+        pk=instance.pk
+    ).values(*USER_PERMISSION_FLAGS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_flags(sender, instance, **kwargs):
+    flags = getattr(instance, '_permission_flags', None)
+    if flags and any(
+        flags[name] != getattr(instance, name)
+        for name in USER_PERMISSION_FLAGS
+    ):
+        auth.invalidate_permissions()
+    instance._permission_flags = None
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_delete, sender=Group)
+def invalidate_permission_objects(sender, **kwargs):
+    # Deleting a group or permission removes its relations without
+    # sending m2m_changed.
+    auth.invalidate_permissions()
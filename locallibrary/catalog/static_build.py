@@ -0,0 +1,250 @@
+"""Static asset build: trimmed stylesheets and per-page transfer sizes.
+
+The storage below is what collectstatic writes with. Before hashing and
+compressing, it drops from the stylesheets in ``STATIC_TRIM_CSS`` every
+rule whose selectors name a class, id or element that no catalog or
+registration template uses, nor the markup Django renders for forms.
+WhiteNoise then serves the hashed copies
+with far-future cache headers, and their gzip and brotli versions to
+clients that accept them.
+"""
+import os
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+
+from django import forms
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.test import Client
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+# Elements every page has, whether or not a template spells them out.
+KEEP_ELEMENTS = {'html', 'body'}
+CHOICES = [('a', 'A'), ('b', 'B')]
+
+TEMPLATE_TAG_RE = re.compile(r'{%.*?%}|{{.*?}}|{#.*?#}', re.S)
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+# Pseudo-class arguments and attribute conditions restrict a match; they
+# never need anything of their own to be present.
+SELECTOR_NOISE_RE = re.compile(r'\([^()]*\)|\[[^\]]*\]')
+CLASS_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+ID_RE = re.compile(r'#(-?[_a-zA-Z][\w-]*)')
+ELEMENT_RE = re.compile(r'(?:^|[\s>+~])([a-zA-Z][\w-]*)')
+ASSET_RE = re.compile(r'(?:href|src)="([^"]+)"')
+
+
+class UsedSelectors(HTMLParser):
+    """Collect the classes, ids and elements a template can produce."""
+
+    def __init__(self):
+        super().__init__()
+        self.classes = set()
+        self.ids = set()
+        self.elements = set(KEEP_ELEMENTS)
+
+    def handle_starttag(self, tag, attrs):
+        self.elements.add(tag)
+        for name, value in attrs:
+            if name == 'class' and value:
+                self.classes.update(value.split())
+            elif name == 'id' and value:
+                self.ids.add(value)
+
+    def feed_template(self, source):
+        # Keep the words inside {% if %} branches, e.g. class="{% if
+        # overdue %}text-danger{% endif %}", and drop the tags themselves.
+        self.feed(TEMPLATE_TAG_RE.sub(' ', source))
+
+
+class SampleForm(forms.Form):
+    """A field of each kind, to render the markup Django adds to forms.
+
+    Templates such as ``{{ form.as_table }}`` name none of the rows,
+    labels, inputs and error lists that they produce.
+    """
+
+    text = forms.CharField(help_text='Help')
+    notes = forms.CharField(widget=forms.Textarea)
+    flag = forms.BooleanField()
+    choice = forms.ChoiceField(choices=CHOICES)
+    radio = forms.ChoiceField(choices=CHOICES, widget=forms.RadioSelect)
+    checkboxes = forms.MultipleChoiceField(
+        choices=CHOICES, widget=forms.CheckboxSelectMultiple
+    )
+    date = forms.DateField(widget=forms.SelectDateWidget)
+    upload = forms.FileField()
+    hidden = forms.CharField(widget=forms.HiddenInput)
+
+    def clean(self):
+        raise forms.ValidationError('Invalid')
+
+
+def rendered_forms():
+    """The sample form in each layout, unbound and with every error."""
+    for form in (SampleForm(), SampleForm(data={})):
+        yield from (form.as_table(), form.as_p(), form.as_ul(),
+                    form.as_div())
+
+
+def template_dirs():
+    """The catalog app's templates and the project's, e.g. registration."""
+    return [
+        Path(__file__).resolve().parent / 'templates',
+        *(Path(path) for path in settings.TEMPLATES[0]['DIRS']),
+    ]
+
+
+def used_selectors(dirs=None):
+    used = UsedSelectors()
+    for directory in dirs or template_dirs():
+        for path in sorted(Path(directory).rglob('*.html')):
+            used.feed_template(path.read_text(encoding='utf-8'))
+    for html in rendered_forms():
+        used.feed(html)
+    return used
+
+
+def selector_is_used(selector, used):
+    bare = selector
+    while SELECTOR_NOISE_RE.search(bare):
+        bare = SELECTOR_NOISE_RE.sub('', bare)
+    bare = re.sub(r'::?[\w-]+', '', bare)
+    return (
+        all(name in used.classes for name in CLASS_RE.findall(bare))
+        and all(name in used.ids for name in ID_RE.findall(bare))
+        and all(
+            name.lower() in used.elements
+            for name in ELEMENT_RE.findall(bare)
+        )
+    )
+
+
+def split_rules(css):
+    """Yield ``(prelude, body)`` for each top-level rule of ``css``."""
+    depth = 0
+    start = 0
+    prelude = None
+    for index, char in enumerate(css):
+        if char == '{':
+            if depth == 0:
+                prelude = css[start:index].strip()
+                start = index + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                yield prelude, css[start:index].strip()
+                start = index + 1
+        elif char == ';' and depth == 0:
+            # Statements such as @charset or @import.
+            yield css[start:index + 1].strip(), None
+            start = index + 1
+
+
+def trim_css(css, used):
+    """Drop the rules of ``css`` that no template can match."""
+    rules = []
+    for prelude, body in split_rules(COMMENT_RE.sub('', css)):
+        if body is None:
+            rules.append(prelude)
+        elif prelude.startswith(('@media', '@supports')):
+            inner = trim_css(body, used)
+            if inner:
+                rules.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            # @font-face, @keyframes, @page: kept whole.
+            rules.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [
+                selector.strip() for selector in prelude.split(',')
+                if selector_is_used(selector.strip(), used)
+            ]
+            if selectors:
+                rules.append(f'{",".join(selectors)}{{{body}}}')
+    return '\n'.join(rules)
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """Hashed, precompressed static files with trimmed stylesheets.
+
+    Names missing from the manifest, as in tests run before
+    ``build_static``, are served under their plain names.
+    """
+
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            used = None
+            for name in getattr(settings, 'STATIC_TRIM_CSS', ()):
+                if name not in paths:
+                    continue
+                used = used or used_selectors()
+                storage, path = paths[name]
+                with storage.open(path) as f:
+                    css = f.read().decode('utf-8')
+                if self.exists(name):
+                    self.delete(name)
+                self.save(name, ContentFile(trim_css(css, used).encode()))
+                # Hash and compress the trimmed copy, not the source.
+                paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None:
+                raise
+            return name
+
+
+def served_size(name):
+    """Bytes sent for a collected file to a client accepting br and gzip."""
+    path = staticfiles_storage.path(name)
+    for suffix in ('.br', '.gz', ''):
+        if os.path.exists(path + suffix):
+            return os.path.getsize(path + suffix)
+    return 0
+
+
+def page_weights(paths):
+    """Yield ``(path, html, before, after)`` byte counts for each page.
+
+    ``before`` sums the page's static assets as the source files, which
+    is what was sent before this build; ``after`` sums the trimmed,
+    compressed files now in STATIC_ROOT. The HTML is the same in both.
+    """
+    originals = {
+        hashed: name
+        for name, hashed in getattr(
+            staticfiles_storage, 'hashed_files', {}
+        ).items()
+    }
+    host = next(
+        (
+            host for host in settings.ALLOWED_HOSTS
+            if not host.startswith('.') and host != '*'
+        ),
+        'localhost',
+    )
+    client = Client(HTTP_HOST=host)
+    static_url = settings.STATIC_URL
+    if not static_url.startswith('/'):
+        static_url = '/' + static_url
+    for path in paths:
+        response = client.get(path)
+        html = response.content
+        before = after = 0
+        for url in dict.fromkeys(ASSET_RE.findall(html.decode('utf-8'))):
+            if not url.startswith(static_url):
+                continue
+            collected = url[len(static_url):]
+            source = finders.find(originals.get(collected, collected))
+            if source:
+                before += os.path.getsize(source)
+            after += served_size(collected)
+        yield path, len(html), before, after
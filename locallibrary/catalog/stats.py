@@ -0,0 +1,175 @@
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from catalog.models import Author, Book, BookInstance, CatalogStats
+from catalog.constants import LoanStatus
+
+# The counters live in a single row so the home page reads them with one
+# primary key lookup.
+STATS_PK = 1
+
+
+def count_catalog():
+    """Count the catalog objects from scratch."""
+    return {
+        'num_books': Book.objects.count(),
+        'num_instances': BookInstance.objects.count(),
+        'num_instances_available': BookInstance.objects.filter(
+            status__exact=LoanStatus.AVAILABLE.value
+        ).count(),
+        'num_authors': Author.objects.count(),
+    }
+
+
+def rebuild_catalog_stats():
+    """Recompute the counters row and return it."""
+    with transaction.atomic():
+        stats, _ = CatalogStats.objects.update_or_create(
+            pk=STATS_PK,
+            defaults=count_catalog(),
+        )
+    return stats
+
+
+def get_catalog_stats():
+    """Return the counters row, building it on first use."""
+    stats = CatalogStats.objects.filter(pk=STATS_PK).first()
+    if stats is None:
+        stats = rebuild_catalog_stats()
+    return stats
+
+
+async def aget_catalog_stats():
+    """Async counterpart of get_catalog_stats()."""
+    stats = await CatalogStats.objects.filter(pk=STATS_PK).afirst()
+    if stats is None:
+        stats = await sync_to_async(rebuild_catalog_stats)()
+    return stats
+
+
+def adjust_catalog_stats(**deltas):
+    """Apply relative changes to the counters in a single UPDATE.
+
+    Nothing is written while the row does not exist yet; it is built from
+    scratch on the next read instead.
+    """
+    changes = {
+        field: F(field) + delta
+        for field, delta in deltas.items()
+        if delta
+    }
+    if changes:
+        CatalogStats.objects.filter(pk=STATS_PK).update(
+            updated_at=timezone.now(), **changes
+        )
+
+
+# Per-book copy counters
+
+STATUS_COUNTERS = {
+    LoanStatus.AVAILABLE.value: 'copies_available',
+    LoanStatus.ON_LOAN.value: 'copies_on_loan',
+    LoanStatus.RESERVED.value: 'copies_reserved',
+    LoanStatus.MAINTENANCE.value: 'copies_maintenance',
+}
+
+
+def copy_deltas(old_status, new_status, total=0):
+    """Counter changes for a copy moving between two statuses."""
+    deltas = {'copies_total': total}
+    if old_status in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[old_status]] = -1
+    if new_status in STATUS_COUNTERS:
+        field = STATUS_COUNTERS[new_status]
+        deltas[field] = deltas.get(field, 0) + 1
+    return deltas
+
+
+def adjust_book_counters(book_id, **deltas):
+    """Apply changes to one book's counters and bump its updated_at.
+
+    Called whenever one of the book's copies changes, so the UPDATE runs
+    even when no counter moves.
+    """
+    changes = {
+        field: F(field) + delta
+        for field, delta in deltas.items()
+        if delta
+    }
+    if book_id is not None:
+        Book.objects.filter(pk=book_id).update(
+            updated_at=timezone.now(), **changes
+        )
+
+
+def adjust_many_book_counters(deltas_by_book):
+    """Apply per-book counter changes, one UPDATE per distinct change.
+
+    Books whose counters move the same way, for example every book with
+    one copy returned, share a single ``WHERE id IN (...)`` statement.
+    """
+    groups = {}
+    for book_id, deltas in deltas_by_book.items():
+        change = tuple(sorted(
+            (field, delta) for field, delta in deltas.items() if delta
+        ))
+        groups.setdefault(change, []).append(book_id)
+    now = timezone.now()
+    for change, book_ids in groups.items():
+        Book.objects.filter(pk__in=book_ids).update(
+            updated_at=now,
+            **{field: F(field) + delta for field, delta in change}
+        )
+
+
+def count_copies(book_ids):
+    """Count the copies of each book by status with one GROUP BY query."""
+    counts = {
+        book_id: dict.fromkeys(Book.COUNTER_FIELDS, 0)
+        for book_id in book_ids
+    }
+    rows = BookInstance.objects.filter(book_id__in=book_ids).values(
+        'book_id', 'status'
+    ).annotate(n=Count('pk')).order_by()
+    for row in rows:
+        book_counts = counts[row['book_id']]
+        book_counts['copies_total'] += row['n']
+        if row['status'] in STATUS_COUNTERS:
+            book_counts[STATUS_COUNTERS[row['status']]] += row['n']
+    return counts
+
+
+def reconcile_book_counters(book_ids):
+    """Recount the given books and fix any that drifted; return how many."""
+    book_ids = list(book_ids)
+    stored = Book.objects.filter(pk__in=book_ids).values(
+        'pk', *Book.COUNTER_FIELDS
+    )
+    actual = count_copies(book_ids)
+    fixed = 0
+    for book in stored:
+        expected = actual[book['pk']]
+        if any(book[field] != expected[field] for field in expected):
+            Book.objects.filter(pk=book['pk']).update(**expected)
+            fixed += 1
+    return fixed
+
+
+def reconcile_all_book_counters(batch_size=1000):
+    """Walk every book in primary key order; return (checked, fixed)."""
+    checked = fixed = 0
+    last_id = 0
+    while True:
+        book_ids = list(
+            Book.objects.filter(pk__gt=last_id)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not book_ids:
+            return checked, fixed
+        with transaction.atomic():
+            fixed += reconcile_book_counters(book_ids)
+        checked += len(book_ids)
+        last_id = book_ids[-1]
@@ -0,0 +1,94 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.constants import LoanStatus
+from catalog.models import Author, Book, BookInstance, Genre
+
+
+class ResourceApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Big', last_name='Bob')
+        fantasy = Genre.objects.create(name='Fantasy')
+        horror = Genre.objects.create(name='Horror')
+        cls.books = []
+        for number in range(5):
+            book = Book.objects.create(
+                title=f'Book {number}',
+                summary='Summary',
+                isbn=f'978000000000{number}',
+                author=cls.author,
+            )
+            book.genre.add(horror, fantasy)
+            cls.books.append(book)
+        cls.copy = BookInstance.objects.create(
+            book=cls.books[0], status=LoanStatus.AVAILABLE.value
+        )
+
+    def get(self, resource, **params):
+        return self.client.get(
+            reverse('api-resource', args=[resource]), params
+        )
+
+    def test_batch_fetch_keeps_request_order(self):
+        ids = [self.books[2].pk, 0, self.books[0].pk]
+        with self.assertNumQueries(1):
+            response = self.get('books', ids=','.join(map(str, ids)))
+        data = response.json()
+        self.assertEqual(
+            [book['title'] for book in data['results']], ['Book 2', 'Book 0']
+        )
+        self.assertEqual(data['missing'], [0])
+        self.assertEqual(data['results'][1]['copies_available'], 1)
+
+    def test_sparse_fields_skip_joins(self):
+        with self.assertNumQueries(2):
+            response = self.get(
+                'books', isbns='9780000000001',
+                fields='isbn,author_last_name,genres,url',
+            )
+        book = response.json()['results'][0]
+        self.assertEqual(book, {
+            'isbn': '9780000000001',
+            'author_last_name': 'Bob',
+            'genres': ['Fantasy', 'Horror'],
+            'url': self.books[1].get_absolute_url(),
+        })
+
+        with self.assertNumQueries(1) as queries:
+            self.get('books', ids=self.books[0].pk, fields='title')
+        self.assertNotIn('JOIN', queries.captured_queries[0]['sql'])
+
+    def test_listing_is_keyset_paginated(self):
+        first = self.get('books', limit=3).json()
+        self.assertEqual(len(first['results']), 3)
+        second = self.get('books', limit=3, cursor=first['next']).json()
+        self.assertEqual(
+            [book['title'] for book in second['results']],
+            ['Book 3', 'Book 4'],
+        )
+        self.assertIsNone(second['next'])
+
+    def test_bookinstances_by_uuid_and_filters(self):
+        data = self.get(
+            'bookinstances', ids=str(self.copy.pk), fields='id,book_title'
+        ).json()
+        self.assertEqual(data['results'][0]['book_title'], 'Book 0')
+        listed = self.get('bookinstances').json()['results'][0]
+        self.assertNotIn('borrower', listed)
+        data = self.get(
+            'bookinstances', status=LoanStatus.ON_LOAN.value
+        ).json()
+        self.assertEqual(data['results'], [])
+
+    def test_errors(self):
+        self.assertEqual(self.get('loans').status_code, 404)
+        self.assertEqual(self.get('books', fields='secret').status_code, 400)
+        self.assertEqual(self.get('books', ids='one').status_code, 400)
+        self.assertEqual(self.get('books', cursor='bad').status_code, 400)
+        self.assertEqual(self.get('authors', limit='x').status_code, 400)
+        self.assertEqual(
+            self.get('bookinstances', ids='not-a-uuid').status_code, 400
+        )
+        self.assertEqual(self.get('books', author='x').status_code, 400)
@@ -0,0 +1,122 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.http import Http404
+from django.test import AsyncRequestFactory, TestCase
+
+from catalog import async_views
+from catalog.constants import LoanStatus
+from catalog.models import Author, Book, BookInstance
+from catalog.stats import get_catalog_stats
+
+
+class AsyncViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.borrower = User.objects.create_user(
+            username='reader', password='pw'
+        )
+        cls.author = Author.objects.create(first_name='Big', last_name='Bob')
+        cls.books = [
+            Book.objects.create(
+                title=f'Book {number:02d}',
+                summary='Summary',
+                isbn=f'97800000000{number:02d}',
+                author=cls.author,
+            )
+            for number in range(12)
+        ]
+        BookInstance.objects.create(
+            book=cls.books[0],
+            status=LoanStatus.ON_LOAN.value,
+            borrower=cls.borrower,
+            due_back=date.today() + timedelta(days=3),
+        )
+        get_catalog_stats()
+
+    def setUp(self):
+        cache.clear()
+
+    async def get(self, view, path, user=None, **kwargs):
+        request = AsyncRequestFactory().get(
+            path, headers=kwargs.pop('headers', None)
+        )
+        request.session = SessionStore()
+
+        async def auser():
+            return user or AnonymousUser()
+
+        request.auser = auser
+        return await view(request, **kwargs)
+
+    async def test_index_reads_counters(self):
+        response = await self.get(async_views.index, '/catalog/')
+        self.assertEqual(response.context_data['num_books'], 12)
+        self.assertEqual(response.context_data['num_instances'], 1)
+
+    async def test_book_list_is_keyset_paginated(self):
+        response = await self.get(async_views.book_list, '/catalog/books/')
+        page = response.context_data['page_obj']
+        self.assertEqual(len(response.context_data['book_list']), 10)
+        self.assertContains(response, f'?cursor={page.next_cursor}')
+
+        response = await self.get(
+            async_views.book_list, f'/catalog/books/?cursor={page.next_cursor}'
+        )
+        self.assertEqual(
+            [book.title for book in response.context_data['book_list']],
+            ['Book 10', 'Book 11'],
+        )
+
+        response = await self.get(async_views.book_list,
+                                  '/catalog/books/?page=2')
+        self.assertEqual(len(response.context_data['book_list']), 2)
+
+    async def test_book_detail_is_conditional(self):
+        book = self.books[0]
+        response = await self.get(
+            async_views.book_detail, f'/catalog/book/{book.pk}', pk=book.pk
+        )
+        self.assertContains(response, 'Book 00')
+        self.assertEqual(len(response.context_data['book_instances']), 1)
+
+        cache.clear()
+        response = await self.get(
+            async_views.book_detail, f'/catalog/book/{book.pk}', pk=book.pk,
+            headers={'If-None-Match': response['ETag']},
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_missing_author_is_not_found(self):
+        with self.assertRaises(Http404):
+            await self.get(async_views.author_detail, '/catalog/author/0/',
+                           pk=0)
+
+    async def test_author_detail_lists_books(self):
+        response = await self.get(
+            async_views.author_detail, f'/catalog/author/{self.author.pk}/',
+            pk=self.author.pk,
+        )
+        self.assertEqual(len(response.context_data['book_set']), 12)
+        self.assertFalse(response.context_data['can_update_author'])
+
+    async def test_signed_in_pages_read_the_loan_count_async(self):
+        response = await self.get(
+            async_views.book_list, '/catalog/books/', user=self.borrower
+        )
+        self.assertContains(response, 'My Borrowed <span class="">(1)</span>')
+
+    async def test_my_borrowed_requires_login(self):
+        response = await self.get(
+            async_views.loaned_books_by_user, '/catalog/mybooks/'
+        )
+        self.assertEqual(response.status_code, 302)
+
+        response = await self.get(
+            async_views.loaned_books_by_user, '/catalog/mybooks/',
+            user=self.borrower,
+        )
+        self.assertContains(response, 'Book 00')
@@ -0,0 +1,99 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog import auth
+
+PERM = 'catalog.can_mark_returned'
+
+
+@override_settings(PERMISSION_CACHE=True)
+class CachedPermissionBackendTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.permission = Permission.objects.get(codename='can_mark_returned')
+        cls.group = Group.objects.create(name='Librarians')
+        cls.group.permissions.add(cls.permission)
+        cls.user = User.objects.create_user(
+            username='librarian', password='pw'
+        )
+        cls.user.groups.add(cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh_user(self):
+        """The user as the next request would load it."""
+        return User.objects.get(pk=self.user.pk)
+
+    def test_later_requests_do_not_query_permissions(self):
+        self.assertTrue(self.fresh_user().has_perm(PERM))
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm(PERM))
+            self.assertFalse(user.has_perm('catalog.delete_author'))
+
+    def test_revoking_a_group_permission_applies_at_once(self):
+        self.assertTrue(self.fresh_user().has_perm(PERM))
+        self.group.permissions.remove(self.permission)
+        self.assertFalse(self.fresh_user().has_perm(PERM))
+
+    def test_leaving_a_group_applies_at_once(self):
+        self.assertTrue(self.fresh_user().has_perm(PERM))
+        self.user.groups.remove(self.group)
+        self.assertFalse(self.fresh_user().has_perm(PERM))
+
+    def test_deleting_the_group_applies_at_once(self):
+        self.assertTrue(self.fresh_user().has_perm(PERM))
+        self.group.delete()
+        self.assertFalse(self.fresh_user().has_perm(PERM))
+
+    def test_demoting_a_superuser_applies_at_once(self):
+        self.user.is_superuser = True
+        self.user.save()
+        # Caches every permission; has_perm() itself skips the backends
+        # for superusers.
+        self.assertIn(
+            'catalog.delete_author', self.fresh_user().get_all_permissions()
+        )
+        user = self.fresh_user()
+        user.is_superuser = False
+        user.save()
+        self.assertFalse(self.fresh_user().has_perm('catalog.delete_author'))
+
+    def test_signing_in_keeps_the_cache(self):
+        self.assertTrue(self.fresh_user().has_perm(PERM))
+        self.client.login(username='librarian', password='pw')
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm(PERM))
+
+    def test_revocation_is_applied_again_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.group.permissions.remove(self.permission)
+        # A request that read the old set before the commit and cached
+        # it under the new token.
+        cache.set(auth.permissions_key(self.user.pk), {PERM})
+        for callback in callbacks:
+            callback()
+        self.assertFalse(self.fresh_user().has_perm(PERM))
+
+    def test_revoked_user_is_refused_by_the_view(self):
+        self.user.user_permissions.add(self.permission)
+        self.user.groups.clear()
+        self.client.force_login(self.user)
+        url = reverse('api-circulation')
+        response = self.client.post(
+            url, '{"action": "return", "ids": ["x"]}',
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.user.user_permissions.remove(self.permission)
+        response = self.client.post(
+            url, '{"action": "return", "ids": ["x"]}',
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,127 @@
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.circulation import return_copy
+from catalog.constants import LoanStatus
+from catalog.importer import CatalogImporter
+from catalog.models import Author, Book, BookInstance
+from catalog.stats import get_catalog_stats
+
+
+class ConditionalGetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Big', last_name='Bob')
+        cls.book = Book.objects.create(
+            title='Test Book',
+            summary='Summary',
+            isbn='1234567890123',
+            author=cls.author,
+        )
+        cls.copy = BookInstance.objects.create(
+            book=cls.book, status=LoanStatus.AVAILABLE.value
+        )
+        get_catalog_stats()
+
+    def setUp(self):
+        cache.clear()
+
+    def etag(self, url):
+        return self.client.get(url)['ETag']
+
+    def test_unchanged_page_is_not_modified(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_cached_page_answers_conditional_requests(self):
+        url = reverse('authors')
+        etag = self.etag(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_copy_and_author_changes_bump_the_book(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        first = self.etag(url)
+        self.copy.imprint = 'Second printing'
+        self.copy.save()
+        second = self.etag(url)
+        self.assertNotEqual(first, second)
+
+        self.author.last_name = 'Roe'
+        self.author.save()
+        self.assertNotEqual(second, self.etag(url))
+
+    def test_list_changes_when_a_book_is_removed(self):
+        other = Book.objects.create(
+            title='Other Book', summary='Summary', isbn='9876543210123'
+        )
+        url = reverse('books')
+        etag = self.etag(url)
+        other.delete()
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+
+    def test_signed_in_users_get_their_own_validator(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        anonymous = self.etag(url)
+        user = User.objects.create_user(username='reader', password='pw')
+        self.client.force_login(user)
+        response = self.client.get(url)
+        self.assertNotEqual(response['ETag'], anonymous)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_signed_in_validator_follows_loans_and_permissions(self):
+        user = User.objects.create_user(username='reader', password='pw')
+        other = Book.objects.create(
+            title='Other Book', summary='Summary', isbn='9876543210123'
+        )
+        on_loan = BookInstance.objects.create(
+            book=other, status=LoanStatus.ON_LOAN.value, borrower=user
+        )
+        self.client.force_login(user)
+        url = reverse('book-detail', args=[self.book.pk])
+        # Returning a copy of another book changes only the menu's count.
+        first = self.etag(url)
+        return_copy(on_loan.pk)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=first).status_code, 200
+        )
+
+        second = self.etag(url)
+        user.user_permissions.add(
+            Permission.objects.get(codename='can_mark_returned')
+        )
+        self.assertNotEqual(second, self.etag(url))
+
+    def test_imported_books_bump_their_author(self):
+        url = reverse('author-detail', args=[self.author.pk])
+        etag = self.etag(url)
+        CatalogImporter().import_batch([{
+            'isbn': '9876543210123',
+            'title': 'Imported Book',
+            'author_first_name': 'Big',
+            'author_last_name': 'Bob',
+        }])
+        cache.clear()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Imported Book')
+
+    def test_search_api_is_conditional(self):
+        url = reverse('api-search') + '?q=test'
+        etag = self.etag(url)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,181 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import SimpleTestCase, override_settings
+
+from catalog.metrics import (
+    MetricsRegistry, empty_snapshot, merge_snapshot, registry,
+    render_prometheus
+)
+from locallibrary.database import (
+    ConnectionPool, PoolTimeout, with_connection_reuse
+)
+
+
+class ConnectionReuseSettingsTest(SimpleTestCase):
+
+    def test_postgresql_gets_a_pool(self):
+        config = with_connection_reuse({
+            'ENGINE': 'django.db.backends.postgresql',
+            'CONN_MAX_AGE': 600,
+        })
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 10)
+        self.assertEqual(config['OPTIONS']['connect_timeout'], 10)
+
+    def test_mysql_gets_a_pool(self):
+        config = with_connection_reuse({
+            'ENGINE': 'django.db.backends.mysql',
+            'OPTIONS': {'connect_timeout': 3},
+        })
+        self.assertEqual(config['ENGINE'], 'locallibrary.mysql_pool')
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertEqual(config['OPTIONS']['pool']['min_size'], 2)
+        self.assertEqual(config['OPTIONS']['connect_timeout'], 3)
+
+    @mock.patch.dict(os.environ, {'DB_POOL': 'False'})
+    def test_without_a_pool_connections_persist_except_under_asgi(self):
+        mysql = {'ENGINE': 'django.db.backends.mysql'}
+        config = with_connection_reuse(mysql)
+        self.assertEqual(config['ENGINE'], 'django.db.backends.mysql')
+        self.assertEqual(config['CONN_MAX_AGE'], 600)
+        with mock.patch.dict(os.environ, {'DJANGO_ASGI': 'True'}):
+            self.assertEqual(with_connection_reuse(mysql)['CONN_MAX_AGE'], 0)
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+        self.broken = False
+
+    def ping(self):
+        if self.broken:
+            raise OSError('gone away')
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def make_pool(self, **options):
+        return ConnectionPool(
+            FakeConnection, check=FakeConnection.ping, **options
+        )
+
+    def test_connections_are_reused(self):
+        pool = self.make_pool()
+        first = pool.getconn()
+        pool.putconn(first)
+        self.assertIs(pool.getconn(), first)
+        stats = pool.get_stats()
+        self.assertEqual(stats['requests_num'], 2)
+        self.assertEqual(stats['connections_num'], 1)
+        self.assertEqual(stats['pool_size'], 1)
+        self.assertEqual(stats['pool_available'], 0)
+
+    def test_broken_connections_are_replaced(self):
+        pool = self.make_pool()
+        broken = pool.getconn()
+        broken.broken = True
+        pool.putconn(broken)
+        self.assertIsNot(pool.getconn(), broken)
+        self.assertTrue(broken.closed)
+        self.assertEqual(pool.get_stats()['pool_size'], 1)
+
+    def test_a_full_pool_times_out(self):
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.get_stats()['requests_errors'], 1)
+
+    def test_old_connections_are_closed(self):
+        pool = self.make_pool(min_size=0, max_idle=0.01, max_lifetime=60)
+        idle = pool.getconn()
+        pool.putconn(idle)
+        time.sleep(0.02)
+        self.assertIsNot(pool.getconn(), idle)
+        self.assertTrue(idle.closed)
+
+        pool = self.make_pool(max_lifetime=0)
+        old = pool.getconn()
+        pool.putconn(old)
+        self.assertTrue(old.closed)
+        self.assertEqual(pool.get_stats()['pool_size'], 0)
+
+
+class PoolMetricsTest(SimpleTestCase):
+
+    def test_new_connections_are_counted(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+        connection_created.send(sender=type(connection),
+                                connection=connection)
+        self.assertEqual(
+            registry.local_snapshot()['db_connections'],
+            {connection.alias: 1},
+        )
+
+    def test_pools_of_all_workers_are_summed(self):
+        worker = {
+            'db_pools': {'default': {
+                'pool_max': 10, 'pool_size': 4, 'pool_available': 1,
+                'requests_num': 50, 'requests_wait_ms': 1500,
+            }},
+        }
+        merged = merge_snapshot(merge_snapshot(empty_snapshot(), worker),
+                                worker)
+        self.assertEqual(merged['db_pools']['default']['pool_max'], 20)
+
+        text = render_prometheus(merged)
+        self.assertIn(
+            'catalog_db_pool_max_connections{alias="default"} 20', text
+        )
+        self.assertIn(
+            'catalog_db_pool_wait_seconds_total{alias="default"} 3.0', text
+        )
+        self.assertIn('catalog_db_pool_saturation{alias="default"} 0.300',
+                      text)
+
+    def test_exited_workers_keep_their_counters_but_not_their_gauges(self):
+        exited = subprocess.Popen([sys.executable, '-c', ''])
+        exited.wait()
+        worker = {
+            'requests': {'books|GET|200': 5},
+            'db_pools': {'default': {'pool_max': 10, 'requests_num': 50}},
+        }
+        registry.reset()
+        self.addCleanup(registry.reset)
+        with tempfile.TemporaryDirectory() as directory:
+            def write(pid):
+                path = os.path.join(directory, f'metrics-{pid}.json')
+                with open(path, 'w') as f:
+                    json.dump(worker, f)
+                return path
+
+            write(1)
+            write(exited.pid)
+            # Not written for a day, so its PID may belong to anything now.
+            stale = write(os.getpid() + 1)
+            os.utime(stale, (time.time() - 86400,) * 2)
+            with override_settings(METRICS_DIR=directory):
+                snapshot = registry.snapshot()
+        self.assertEqual(snapshot['requests']['books|GET|200'], 15)
+        self.assertEqual(
+            snapshot['db_pools']['default'],
+            {'pool_max': 10, 'requests_num': 150},
+        )
+
+    def test_backends_without_a_pool_report_none(self):
+        self.assertEqual(MetricsRegistry().local_snapshot()['db_pools'], {})
@@ -0,0 +1,128 @@
+import csv
+import json
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import Permission, User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.constants import LoanStatus
+from catalog.models import Author, Book, BookInstance, Genre
+
+
+class ExportTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reporter = User.objects.create_user(
+            username='reporter', password='pw'
+        )
+        cls.reporter.user_permissions.add(
+            *Permission.objects.filter(codename__in=[
+                'view_book', 'view_author', 'view_bookinstance',
+            ])
+        )
+        cls.author = Author.objects.create(first_name='Big', last_name='Bob')
+        other = Author.objects.create(first_name='Jane', last_name='Roe')
+        genre = Genre.objects.create(name='Fantasy')
+        cls.book = Book.objects.create(
+            title='Test Book',
+            summary='Summary',
+            isbn='1234567890123',
+            author=cls.author
+        )
+        cls.book.genre.add(genre)
+        other_book = Book.objects.create(
+            title='Other Book',
+            summary='Summary',
+            isbn='9876543210123',
+            author=other
+        )
+        BookInstance.objects.create(
+            book=cls.book,
+            status=LoanStatus.ON_LOAN.value,
+            borrower=cls.reporter,
+            due_back=date.today() + timedelta(days=3),
+        )
+        BookInstance.objects.create(
+            book=other_book,
+            status=LoanStatus.AVAILABLE.value,
+        )
+
+    def export(self, kind, fmt, **params):
+        response = self.client.get(
+            reverse('export-catalog', args=[kind, fmt]), params
+        )
+        return response
+
+    def test_requires_view_permission(self):
+        response = self.export('books', 'csv')
+        self.assertEqual(response.status_code, 302)
+        User.objects.create_user(username='patron', password='pw')
+        self.client.login(username='patron', password='pw')
+        self.assertEqual(self.export('books', 'csv').status_code, 403)
+
+    def test_books_csv_streams_with_genres(self):
+        self.client.force_login(self.reporter)
+        response = self.export('books', 'csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(
+            StringIO(b''.join(response.streaming_content).decode())
+        ))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['author'], 'Bob, Big')
+        self.assertEqual(rows[0]['genres'], 'Fantasy')
+
+    def test_bookinstance_jsonl_filters(self):
+        self.client.force_login(self.reporter)
+        response = self.export(
+            'bookinstances', 'jsonl',
+            status=LoanStatus.ON_LOAN.value,
+            due_after=date.today().isoformat(),
+            author=self.author.pk,
+        )
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertEqual(record['book__title'], 'Test Book')
+        self.assertEqual(record['borrower__username'], 'reporter')
+
+        response = self.export(
+            'bookinstances', 'jsonl',
+            due_before=date.today().isoformat(),
+        )
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+    def test_invalid_filter_is_bad_request(self):
+        self.client.force_login(self.reporter)
+        response = self.export('bookinstances', 'csv', due_after='soon')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.export('loans', 'csv').status_code, 404)
+
+    def test_copy_filters_on_books_or_authors_are_bad_requests(self):
+        self.client.force_login(self.reporter)
+        for kind in ('books', 'authors'):
+            response = self.export(
+                kind, 'csv', status=LoanStatus.ON_LOAN.value
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(b'status does not apply', response.content)
+            response = self.export(
+                kind, 'csv', due_before=date.today().isoformat()
+            )
+            self.assertEqual(response.status_code, 400)
+        response = self.export('books', 'csv', author=self.author.pk)
+        self.assertEqual(response.status_code, 200)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command(
+            'export_catalog', 'authors', format='jsonl', chunk_size=1,
+            stdout=out,
+        )
+        names = [json.loads(line)['last_name']
+                 for line in out.getvalue().splitlines()]
+        self.assertEqual(names, ['Bob', 'Roe'])
@@ -0,0 +1,298 @@
+import threading
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection, connections
+from django.test import (
+    TestCase, TransactionTestCase, skipUnlessDBFeature
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog import holds
+from catalog.circulation import HELD, LEND, OK, RETURN, apply_batch
+from catalog.constants import HoldStatus, LoanStatus
+from catalog.models import Book, BookInstance, Hold
+from catalog.stats import get_catalog_stats
+
+
+def make_librarian(username='librarian'):
+    librarian = User.objects.create_user(username=username, password='pw')
+    librarian.user_permissions.add(
+        Permission.objects.get(codename='can_mark_returned')
+    )
+    return librarian
+
+
+class HoldQueueTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = make_librarian()
+        cls.patrons = [
+            User.objects.create_user(username=f'patron{i}', password='pw')
+            for i in range(3)
+        ]
+        cls.book = Book.objects.create(
+            title='Popular', summary='Summary', isbn='1234567890123'
+        )
+        cls.on_loan = [
+            BookInstance.objects.create(
+                book=cls.book,
+                status=LoanStatus.ON_LOAN.value,
+                borrower=cls.librarian,
+                due_back=date.today() + timedelta(days=2),
+            )
+            for _ in range(2)
+        ]
+        get_catalog_stats()
+
+    def place_holds(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [
+                holds.place_hold(patron, self.book) for patron in self.patrons
+            ]
+
+    def return_copies(self, copies):
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_batch(
+                self.librarian, RETURN, [str(copy.pk) for copy in copies]
+            )
+
+    def test_returned_copies_go_to_the_oldest_holds(self):
+        first, second, third = self.place_holds()
+        self.return_copies(self.on_loan)
+
+        for hold in (first, second, third):
+            hold.refresh_from_db()
+        self.assertEqual(first.status, HoldStatus.READY.value)
+        self.assertEqual(second.status, HoldStatus.READY.value)
+        self.assertEqual(third.status, HoldStatus.WAITING.value)
+        self.assertNotEqual(first.copy_id, second.copy_id)
+        self.assertEqual(
+            BookInstance.objects.get(pk=first.copy_id).status,
+            LoanStatus.RESERVED.value,
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_reserved, 2)
+        self.assertEqual(self.book.copies_available, 0)
+
+    def test_hold_on_book_with_copy_on_shelf_is_ready_at_once(self):
+        BookInstance.objects.create(
+            book=self.book, status=LoanStatus.AVAILABLE.value
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            hold = holds.place_hold(self.patrons[0], self.book)
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, HoldStatus.READY.value)
+        self.assertIsNotNone(hold.expires_at)
+
+    def test_one_active_hold_per_patron_and_book(self):
+        holds.place_hold(self.patrons[0], self.book)
+        with self.assertRaises(holds.HoldError):
+            holds.place_hold(self.patrons[0], self.book)
+
+    def test_reserved_copy_is_only_lent_to_its_patron(self):
+        first, _, _ = self.place_holds()
+        self.return_copies(self.on_loan[:1])
+        first.refresh_from_db()
+        copy_id = str(first.copy_id)
+
+        results = apply_batch(
+            self.librarian, LEND, [copy_id],
+            borrower=self.patrons[1].username,
+        )
+        self.assertEqual(results[0]['result'], HELD)
+
+        results = apply_batch(
+            self.librarian, LEND, [copy_id],
+            borrower=self.patrons[0].username,
+        )
+        self.assertEqual(results[0]['result'], OK)
+        first.refresh_from_db()
+        self.assertEqual(first.status, HoldStatus.FULFILLED.value)
+
+    def test_cancelled_ready_hold_passes_copy_on(self):
+        first, second, _ = self.place_holds()
+        self.return_copies(self.on_loan[:1])
+        with self.captureOnCommitCallbacks(execute=True):
+            holds.cancel_hold(self.patrons[0], first.pk)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, HoldStatus.CANCELLED.value)
+        self.assertEqual(second.status, HoldStatus.READY.value)
+        self.assertEqual(second.copy_id, first.copy_id)
+
+    def test_uncollected_holds_expire(self):
+        first, second, _ = self.place_holds()
+        self.return_copies(self.on_loan[:1])
+        with self.captureOnCommitCallbacks(execute=True):
+            expired = holds.expire_holds(
+                now=timezone.now() + timedelta(days=8)
+            )
+        self.assertEqual(expired, 1)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, HoldStatus.EXPIRED.value)
+        self.assertEqual(second.status, HoldStatus.READY.value)
+
+    def test_queue_positions(self):
+        self.place_holds()
+        positions = [
+            hold.position
+            for hold in Hold.objects.annotate_position().order_by('pk')
+        ]
+        self.assertEqual(positions, [1, 2, 3])
+
+
+class HoldViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.patron = User.objects.create_user(username='patron', password='pw')
+        cls.book = Book.objects.create(
+            title='Popular', summary='Summary', isbn='1234567890123'
+        )
+
+    def test_place_and_cancel_hold(self):
+        self.client.force_login(self.patron)
+        response = self.client.post(reverse('place-hold', args=[self.book.pk]))
+        self.assertRedirects(response, reverse('my-borrowed'))
+
+        response = self.client.get(reverse('my-borrowed'))
+        self.assertContains(response, 'number 1 in the queue')
+
+        hold = Hold.objects.get()
+        response = self.client.post(reverse('cancel-hold', args=[hold.pk]))
+        self.assertRedirects(response, reverse('my-borrowed'))
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, HoldStatus.CANCELLED.value)
+
+    def test_place_hold_needs_login(self):
+        response = self.client.post(reverse('place-hold', args=[self.book.pk]))
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Hold.objects.exists())
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class HoldContentionTest(TransactionTestCase):
+    """Many returns of a popular book at once, each in its own thread."""
+
+    workers = 16
+    copies = 32
+    waiting = 40
+
+    def test_parallel_returns_serve_each_hold_once(self):
+        librarian = make_librarian()
+        book = Book.objects.create(
+            title='Popular', summary='Summary', isbn='1234567890123'
+        )
+        copies = [
+            BookInstance.objects.create(
+                book=book,
+                status=LoanStatus.ON_LOAN.value,
+                borrower=librarian,
+                due_back=date.today() + timedelta(days=2),
+            )
+            for _ in range(self.copies)
+        ]
+        for i in range(self.waiting):
+            patron = User.objects.create_user(username=f'patron{i}')
+            holds.place_hold(patron, book)
+
+        barrier = threading.Barrier(self.workers)
+        errors = []
+
+        def work(batch):
+            try:
+                barrier.wait()
+                for copy in batch:
+                    apply_batch(librarian, RETURN, [str(copy.pk)])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=work, args=(copies[i::self.workers],))
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        ready = list(Hold.objects.filter(
+            status=HoldStatus.READY.value
+        ).values_list('copy_id', flat=True))
+        self.assertEqual(len(ready), self.copies)
+        self.assertEqual(len(set(ready)), self.copies)
+        self.assertEqual(
+            Hold.objects.filter(status=HoldStatus.WAITING.value).count(),
+            self.waiting - self.copies,
+        )
+        self.assertEqual(
+            BookInstance.objects.filter(
+                status=LoanStatus.RESERVED.value
+            ).count(),
+            self.copies,
+        )
+        book.refresh_from_db()
+        self.assertEqual(book.copies_reserved, self.copies)
+        self.assertEqual(book.copies_available, 0)
+
+
+@skipUnlessDBFeature(
+    'has_select_for_update', 'test_db_allows_multiple_connections'
+)
+class DuplicateHoldTest(TransactionTestCase):
+    """One patron placing the same hold from many requests at once."""
+
+    workers = 8
+
+    def test_parallel_placements_create_one_hold(self):
+        # Without the partial unique index, as on MySQL, which ignores it.
+        constraint = next(
+            constraint for constraint in Hold._meta.constraints
+            if constraint.name == 'hold_one_active_per_patron'
+        )
+        with connection.schema_editor() as editor:
+            editor.remove_constraint(Hold, constraint)
+        self.addCleanup(self.restore_constraint, constraint)
+
+        patron = User.objects.create_user(username='patron')
+        book = Book.objects.create(
+            title='Popular', summary='Summary', isbn='1234567890123'
+        )
+        barrier = threading.Barrier(self.workers)
+        placed = []
+        errors = []
+
+        def work():
+            try:
+                barrier.wait()
+                placed.append(holds.place_hold(patron, book))
+            except holds.HoldError:
+                pass
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=work) for _ in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(placed), 1)
+        self.assertEqual(Hold.objects.active().count(), 1)
+
+    def restore_constraint(self, constraint):
+        Hold.objects.all().delete()
+        with connection.schema_editor() as editor:
+            editor.add_constraint(Hold, constraint)
@@ -0,0 +1,168 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from catalog.constants import LoanStatus
+from catalog.models import Author, Book, BookInstance, CatalogStats, Genre
+from catalog.search import search_books
+
+CSV_DATA = (
+    'isbn,title,summary,author_first_name,author_last_name,genres,copies,'
+    'imprint,status\n'
+    '9780000000001,First,About one,Big,Bob,Fantasy;Horror,2,Penguin,a\n'
+    '9780000000002,Second,About two,Big,Bob,Fantasy,1,Penguin,o\n'
+    '9780000000001,Duplicate,Same ISBN,Big,Bob,Fantasy,5,Penguin,a\n'
+    ',No ISBN,Invalid,Big,Bob,,0,,\n'
+    '9780000000003,Third,About three,Jane,Roe,,0,,\n'
+)
+
+
+class ImportCatalogTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        out = StringIO()
+        call_command('import_catalog', path, stdout=out, stderr=StringIO(),
+                     **options)
+        return out.getvalue()
+
+    def test_import_csv(self):
+        output = self.run_import(self.write('books.csv', CSV_DATA))
+        self.assertIn('Imported 5 rows', output)
+        self.assertIn('3 books', output)
+        self.assertIn('1 duplicate and 1 invalid', output)
+
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Genre.objects.count(), 2)
+        first = Book.objects.get(isbn='9780000000001')
+        self.assertEqual(first.title, 'First')
+        self.assertEqual(str(first.author), 'Bob, Big')
+        self.assertEqual(first.display_genre(), 'Fantasy, Horror')
+        self.assertEqual(first.bookinstance_set.count(), 2)
+        self.assertEqual(
+            BookInstance.objects.filter(
+                status=LoanStatus.ON_LOAN.value
+            ).count(),
+            1,
+        )
+
+    def test_import_keeps_derived_data_in_sync(self):
+        self.run_import(self.write('books.csv', CSV_DATA))
+        stats = CatalogStats.objects.get()
+        self.assertEqual(stats.num_books, 3)
+        self.assertEqual(stats.num_authors, 2)
+        self.assertEqual(stats.num_instances, 3)
+        self.assertEqual(stats.num_instances_available, 2)
+        first = Book.objects.get(isbn='9780000000001')
+        self.assertEqual(first.copies_total, 2)
+        self.assertEqual(first.copies_available, 2)
+        self.assertEqual(
+            [result['book'].title for result in search_books('horror')],
+            ['First'],
+        )
+
+    def test_import_jsonl_reuses_existing_authors_and_genres(self):
+        Author.objects.create(first_name='Big', last_name='Bob')
+        Genre.objects.create(name='Fantasy')
+        lines = [
+            {'isbn': '9780000000004', 'title': 'Fourth',
+             'author_first_name': 'Big', 'author_last_name': 'Bob',
+             'genres': ['Fantasy'], 'copies': 1},
+            {'isbn': '9780000000005', 'title': 'Fifth',
+             'genres': 'Fantasy;Poetry'},
+        ]
+        path = self.write(
+            'books.jsonl', '\n'.join(json.dumps(line) for line in lines)
+        )
+        self.run_import(path, batch_size=1)
+        self.assertEqual(Author.objects.count(), 1)
+        self.assertEqual(Genre.objects.count(), 2)
+        self.assertIsNone(Book.objects.get(isbn='9780000000005').author)
+
+    def test_jsonl_genres_of_the_wrong_type_are_row_errors(self):
+        lines = [
+            {'isbn': '9780000000006', 'title': 'Sixth', 'genres': 7},
+            {'isbn': '9780000000007', 'title': 'Seventh',
+             'genres': {'name': 'Fantasy'}},
+            {'isbn': '9780000000008', 'title': 'Eighth', 'genres': [1]},
+            {'isbn': '9780000000009', 'title': 'Ninth',
+             'genres': ['Poetry']},
+        ]
+        path = self.write(
+            'books.jsonl', '\n'.join(json.dumps(line) for line in lines)
+        )
+        err = StringIO()
+        call_command('import_catalog', path, stdout=StringIO(), stderr=err)
+        self.assertEqual(
+            list(Book.objects.values_list('isbn', flat=True)),
+            ['9780000000009'],
+        )
+        self.assertIn(
+            'row 0: genres must be a string or a list', err.getvalue()
+        )
+
+    def test_jsonl_fields_of_the_wrong_type_are_row_errors(self):
+        lines = [
+            {'isbn': '9780000000006', 'title': 'Sixth', 'summary': 5},
+            {'isbn': '9780000000007', 'title': 'Seventh', 'imprint': [1]},
+            {'isbn': 9780000000008, 'title': 'Eighth'},
+            {'isbn': '9780000000009', 'title': 'Ninth', 'status': ['a']},
+            {'isbn': '9780000000010', 'title': 'Tenth',
+             'author_last_name': {'name': 'Bob'}},
+            ['9780000000011', 'Eleventh'],
+            {'isbn': '9780000000012', 'title': 'Twelfth', 'summary': 'Ok'},
+        ]
+        path = self.write(
+            'books.jsonl', '\n'.join(json.dumps(line) for line in lines)
+        )
+        err = StringIO()
+        call_command('import_catalog', path, stdout=StringIO(), stderr=err)
+        self.assertEqual(
+            list(Book.objects.values_list('isbn', flat=True)),
+            ['9780000000012'],
+        )
+        for message in (
+            'row 0: summary must be a string',
+            'row 1: imprint must be a string',
+            'row 2: isbn must be a string',
+            'row 3: status must be a string',
+            'row 4: author_last_name must be a string',
+            'row 5: record must be an object',
+        ):
+            self.assertIn(message, err.getvalue())
+
+    def test_rerun_is_idempotent(self):
+        path = self.write('books.csv', CSV_DATA)
+        self.run_import(path)
+        output = self.run_import(path)
+        self.assertIn('0 books', output)
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertEqual(BookInstance.objects.count(), 3)
+
+    def test_resume_skips_committed_rows(self):
+        path = self.write('books.csv', CSV_DATA)
+        checkpoint = os.path.join(self.directory.name, 'state.json')
+        with open(checkpoint, 'w') as f:
+            json.dump({'path': os.path.abspath(path), 'rows': 3}, f)
+
+        output = self.run_import(path, checkpoint=checkpoint, resume=True)
+        self.assertIn('Resuming after row 3', output)
+        self.assertEqual(
+            list(Book.objects.values_list('title', flat=True)), ['Third']
+        )
+        with open(checkpoint) as f:
+            self.assertEqual(json.load(f)['rows'], 5)
@@ -0,0 +1,73 @@
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import LiveServerTestCase
+
+from catalog import urls
+from catalog.constants import LoanStatus
+from catalog.loadtest import POST_ONLY, catalog_paths, compare, run_load_test
+from catalog.models import Author, Book, BookInstance
+
+
+class LoadTestTest(LiveServerTestCase):
+
+    def test_run_load_test_records_latencies(self):
+        result = run_load_test(
+            'live', self.live_server_url, ['/catalog/books/'],
+            concurrency=2, duration=0.3,
+        )
+        self.assertGreater(result.requests, 0)
+        self.assertEqual(result.errors, 0)
+        self.assertEqual(set(result.statuses), {200})
+        self.assertGreaterEqual(result.percentile(99), result.percentile(50))
+
+    def test_command_prints_one_row_per_target(self):
+        out = StringIO()
+        call_command(
+            'loadtest', target=[f'a={self.live_server_url}'],
+            path=['/catalog/authors/'], concurrency=1, duration=0.2,
+            stdout=out,
+        )
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+    def test_catalog_paths_cover_every_get_view(self):
+        author = Author.objects.create(first_name='Big', last_name='Bob')
+        book = Book.objects.create(
+            title='Test Book', summary='Summary', isbn='1234567890123',
+            author=author,
+        )
+        BookInstance.objects.create(book=book)
+        names = {name for name, _ in catalog_paths()}
+        self.assertEqual(
+            names,
+            {pattern.name for pattern in urls.urlpatterns} - POST_ONLY,
+        )
+
+    def test_login_cookie_and_json_report(self):
+        user = User.objects.create_user(username='reader', password='pw')
+        BookInstance.objects.create(
+            book=Book.objects.create(
+                title='Test Book', summary='Summary', isbn='1234567890123'
+            ),
+            status=LoanStatus.ON_LOAN.value,
+            borrower=user,
+        )
+        out = StringIO()
+        call_command(
+            'loadtest', target=[f'a={self.live_server_url}'],
+            path=['/catalog/', '/catalog/mybooks/'], concurrency=1,
+            duration=0.2, user='reader', json='-', label='v1',
+            stdout=out, stderr=StringIO(),
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['label'], 'v1')
+        endpoints = report['targets'][0]['endpoints']
+        self.assertEqual(set(endpoints['/catalog/mybooks/']['statuses']),
+                         {'200'})
+        self.assertIn('p95_ms', endpoints['/catalog/'])
+
+        rows = compare(report, report)
+        self.assertEqual([row[1] for row in rows],
+                         ['*', '/catalog/', '/catalog/mybooks/'])
@@ -0,0 +1,99 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.circulation import (
+    LEND, RETURN, apply_batch, renew_copy, return_copy
+)
+from catalog.constants import LoanStatus
+from catalog.loans import loan_summary
+from catalog.models import Book, BookInstance
+
+
+class LoanSummaryTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.patron = User.objects.create_user(username='patron', password='pw')
+        cls.librarian = User.objects.create_user(username='librarian')
+        cls.librarian.user_permissions.add(
+            Permission.objects.get(codename='can_mark_returned')
+        )
+        cls.book = Book.objects.create(
+            title='Due Soon', summary='Summary', isbn='1234567890123'
+        )
+        cls.overdue = BookInstance.objects.create(
+            book=cls.book,
+            status=LoanStatus.ON_LOAN.value,
+            borrower=cls.patron,
+            due_back=date.today() - timedelta(days=1),
+        )
+        cls.current = BookInstance.objects.create(
+            book=cls.book,
+            status=LoanStatus.ON_LOAN.value,
+            borrower=cls.patron,
+            due_back=date.today() + timedelta(days=7),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_one_query_on_a_miss_and_none_after(self):
+        with self.assertNumQueries(1):
+            summary = loan_summary(self.patron)
+        self.assertEqual(
+            [loan.id for loan in summary], [self.overdue.pk, self.current.pk]
+        )
+        self.assertEqual(summary.loans[0].title, 'Due Soon')
+        self.assertEqual(summary.count, 2)
+        self.assertEqual(summary.overdue_count, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(loan_summary(self.patron).count, 2)
+
+    def test_saving_a_copy_clears_its_borrowers_summary(self):
+        loan_summary(self.patron)
+        self.current.borrower = self.librarian
+        self.current.save()
+        self.assertEqual(loan_summary(self.patron).count, 1)
+        self.assertEqual(loan_summary(self.librarian).count, 1)
+
+    def test_circulation_clears_the_summaries(self):
+        loan_summary(self.patron)
+        return_copy(self.current.pk)
+        self.assertEqual(loan_summary(self.patron).count, 1)
+
+        apply_batch(
+            self.librarian, LEND, [str(self.current.pk)],
+            borrower=self.patron.username,
+        )
+        self.assertEqual(loan_summary(self.patron).count, 2)
+
+        apply_batch(self.librarian, RETURN, [str(self.overdue.pk)])
+        self.assertEqual(loan_summary(self.patron).overdue_count, 0)
+
+    def test_renewal_shows_the_new_due_date(self):
+        loan_summary(self.patron)
+        due_back = date.today() + timedelta(days=14)
+        renew_copy(self.overdue.pk, due_back)
+        self.assertEqual(
+            loan_summary(self.patron).loans[-1].due_back, due_back
+        )
+
+    def test_renaming_a_book_clears_its_borrowers_summaries(self):
+        loan_summary(self.patron)
+        self.book.title = 'Renamed'
+        self.book.save()
+        self.assertEqual(loan_summary(self.patron).loans[0].title, 'Renamed')
+
+    def test_pages_render_from_the_summary(self):
+        self.client.force_login(self.patron)
+        response = self.client.get(reverse('my-borrowed'))
+        self.assertContains(response, 'Due Soon', count=2)
+        self.assertContains(response, '<span class="text-danger">(2)</span>')
+        self.assertContains(response, 'class="text-danger"', count=2)
+
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, '(2)')
@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog.metrics import registry, render_prometheus
+from catalog.models import Author
+
+
+@override_settings(METRICS_DIR=None, METRICS_TOKEN='secret')
+class MetricsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            username='staff', password='pw', is_staff=True
+        )
+        Author.objects.create(first_name='Big', last_name='Bob')
+
+    def setUp(self):
+        registry.reset()
+        cache.clear()
+
+    def scrape(self, **extra):
+        return self.client.get(reverse('metrics'), **extra)
+
+    def test_metrics_require_staff_or_token(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        response = self.scrape(HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+        response = self.scrape(HTTP_AUTHORIZATION='Bearer s\xe9cret')
+        self.assertEqual(response.status_code, 403)
+        response = self.scrape(HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.scrape().status_code, 200)
+
+    @override_settings(METRICS_SQL_SAMPLE_RATE=1.0)
+    def test_requests_are_recorded_by_url_name(self):
+        self.client.get(reverse('authors'))
+        self.client.get(reverse('authors'))
+        self.client.get('/catalog/no-such-page/')
+        body = self.scrape(HTTP_AUTHORIZATION='Bearer secret').content.decode()
+
+        self.assertIn(
+            'catalog_http_requests_total'
+            '{view="authors",method="GET",status="200"} 2',
+            body,
+        )
+        self.assertIn('view="<unresolved>",method="GET",status="404"', body)
+        self.assertIn(
+            'catalog_http_request_duration_seconds_count{view="authors"} 2',
+            body,
+        )
+        self.assertIn(
+            'catalog_sql_sampled_requests_total{view="authors"} 2', body
+        )
+        snapshot = registry.local_snapshot()
+        self.assertGreater(snapshot['sql_queries']['authors'], 0)
+
+    async def test_async_requests_count_their_queries(self):
+        await self.async_client.get(reverse('authors'))
+        snapshot = registry.local_snapshot()
+        self.assertGreater(snapshot['sql_queries']['authors'], 0)
+
+    @override_settings(DEBUG=True)
+    def test_asgi_middleware_chain_stays_async(self):
+        # With DEBUG on, Django logs each middleware it has to adapt.
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+
+    @override_settings(METRICS_SQL_SAMPLE_RATE=0.0)
+    def test_sql_timing_respects_sample_rate(self):
+        self.client.get(reverse('authors'))
+        snapshot = registry.local_snapshot()
+        self.assertGreater(snapshot['sql_queries']['authors'], 0)
+        self.assertNotIn('authors', snapshot['sql_seconds'])
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry.observe('books', 'GET', 200, 0.003, 2)
+        registry.observe('books', 'GET', 200, 0.2, 2)
+        body = render_prometheus(registry.local_snapshot())
+        self.assertIn(
+            'catalog_http_request_duration_seconds_bucket'
+            '{view="books",le="0.005"} 1',
+            body,
+        )
+        self.assertIn(
+            'catalog_http_request_duration_seconds_bucket'
+            '{view="books",le="0.25"} 2',
+            body,
+        )
+
+    def test_snapshots_from_other_workers_are_merged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            other = {
+                'requests': {'books|GET|200': 5},
+                'latency': {},
+                'sql_queries': {'books': 10},
+                'sql_seconds': {},
+                'sql_sampled': {},
+            }
+            with open(os.path.join(directory, 'metrics-1.json'), 'w') as f:
+                json.dump(other, f)
+            with override_settings(METRICS_DIR=directory):
+                registry.observe('books', 'GET', 200, 0.01, 3)
+                snapshot = registry.snapshot()
+        self.assertEqual(snapshot['requests']['books|GET|200'], 6)
+        self.assertEqual(snapshot['sql_queries']['books'], 13)
@@ -0,0 +1,87 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from catalog.constants import LoanStatus
+from catalog.models import Book, BookInstance
+from catalog.overdue import borrower_summaries
+
+TODAY = date(2024, 6, 15)
+
+
+class OverdueTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username='alice', password='pw')
+        cls.bob = User.objects.create_user(username='bob', password='pw')
+        book = Book.objects.create(
+            title='Test Book',
+            summary='Summary',
+            isbn='1234567890123',
+        )
+
+        def copy(status, borrower, days):
+            return BookInstance.objects.create(
+                book=book,
+                status=status,
+                borrower=borrower,
+                due_back=TODAY + timedelta(days=days),
+            )
+
+        cls.late = copy(LoanStatus.ON_LOAN.value, cls.alice, -10)
+        copy(LoanStatus.ON_LOAN.value, cls.alice, -3)
+        copy(LoanStatus.ON_LOAN.value, cls.alice, 4)
+        copy(LoanStatus.ON_LOAN.value, cls.bob, -1)
+        copy(LoanStatus.RESERVED.value, cls.bob, -20)
+        copy(LoanStatus.ON_LOAN.value, None, -5)
+
+    def test_overdue_filters_in_sql(self):
+        self.assertEqual(BookInstance.objects.overdue(TODAY).count(), 4)
+        flags = dict(
+            BookInstance.objects.annotate_overdue(TODAY)
+            .values_list('pk', 'overdue')
+        )
+        self.assertTrue(flags[self.late.pk])
+        self.assertEqual(sum(flags.values()), 4)
+
+    def test_summaries_are_grouped_per_borrower(self):
+        summaries = list(borrower_summaries(TODAY, chunk_size=1))
+        self.assertEqual(
+            [(s['username'], s['loans'], s['days_overdue'])
+             for s in summaries],
+            [('alice', 2, 10), ('bob', 1, 1)],
+        )
+        self.assertEqual(
+            summaries[0]['oldest_due_back'], TODAY - timedelta(days=10)
+        )
+
+    def test_sweep_command_replaces_output(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'overdue.csv')
+            out = StringIO()
+            call_command(
+                'sweep_overdue', output=path, today=TODAY.isoformat(),
+                stdout=out,
+            )
+            self.assertIn('2 borrowers', out.getvalue())
+            with open(path) as f:
+                rows = list(csv.DictReader(f))
+            self.assertEqual(rows[1]['username'], 'bob')
+            self.assertEqual(os.listdir(directory), ['overdue.csv'])
+
+    def test_sweep_command_jsonl_to_stdout(self):
+        out = StringIO()
+        call_command(
+            'sweep_overdue', format='jsonl', today=TODAY.isoformat(),
+            stdout=out,
+        )
+        first = json.loads(out.getvalue().splitlines()[0])
+        self.assertEqual(first['oldest_due_back'], '2024-06-05')
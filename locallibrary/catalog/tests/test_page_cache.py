@@ -0,0 +1,121 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import translation
+
+from catalog.constants import LoanStatus
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog import page_cache
+from catalog.page_cache import page_key
+
+
+class PageCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Big', last_name='Bob')
+        cls.genre = Genre.objects.create(name='Fantasy')
+        cls.book = Book.objects.create(
+            title='Test Book',
+            summary='Summary',
+            isbn='1234567890123',
+            author=cls.author,
+        )
+        cls.book.genre.add(cls.genre)
+        cls.other_book = Book.objects.create(
+            title='Other Book',
+            summary='Summary',
+            isbn='9876543210123',
+            author=cls.author,
+        )
+        cls.copy = BookInstance.objects.create(
+            book=cls.book, status=LoanStatus.AVAILABLE.value
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_hit_skips_the_database(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'Test Book')
+
+    def test_key_includes_query_string_and_language(self):
+        request = RequestFactory().get('/catalog/books/?cursor=abc')
+        key = page_key(request)
+        self.assertNotEqual(
+            key, page_key(RequestFactory().get('/catalog/books/'))
+        )
+        with translation.override('vi'):
+            self.assertNotEqual(key, page_key(request))
+
+    def test_copy_change_purges_only_its_book(self):
+        detail = reverse('book-detail', args=[self.book.pk])
+        other = reverse('book-detail', args=[self.other_book.pk])
+        author = reverse('author-detail', args=[self.author.pk])
+        for url in (detail, other, author, reverse('books')):
+            self.client.get(url)
+
+        self.copy.status = LoanStatus.ON_LOAN.value
+        self.copy.save()
+
+        with self.assertNumQueries(0):
+            self.client.get(other)
+        for url in (detail, author, reverse('books')):
+            response = self.client.get(url)
+            self.assertTemplateUsed(response, 'base_generic.html')
+        self.assertContains(
+            self.client.get(reverse('books')), '0 of 1 available'
+        )
+
+    def test_author_and_genre_changes_purge_their_pages(self):
+        detail = reverse('book-detail', args=[self.book.pk])
+        self.client.get(detail)
+        self.genre.name = 'Horror'
+        self.genre.save()
+        self.assertContains(self.client.get(detail), 'Horror')
+
+        self.client.get(reverse('authors'))
+        self.author.last_name = 'Roe'
+        self.author.save()
+        self.assertContains(self.client.get(reverse('authors')), 'Big Roe')
+        self.assertContains(self.client.get(detail), 'Roe, Big')
+
+    def test_signed_in_users_are_not_served_cached_pages(self):
+        url = reverse('books')
+        self.client.get(url)
+        user = User.objects.create_user(username='reader', password='pw')
+        self.client.force_login(user)
+        self.assertContains(self.client.get(url), 'User: reader')
+
+    def test_page_rendered_across_a_purge_is_not_stored(self):
+        request = RequestFactory().get('/catalog/books/')
+        tags = [f'book:{self.book.pk}']
+        started = time.time()
+        # A change commits while the page is being rendered.
+        page_cache.purge(*tags)
+        page_cache.cache_page(request, HttpResponse('old'), tags, started)
+        self.assertIsNone(page_cache.get_cached_page(request))
+
+        later = time.time() + page_cache.CLOCK_SKEW
+        page_cache.cache_page(request, HttpResponse('new'), tags, later)
+        self.assertIsNotNone(page_cache.get_cached_page(request))
+
+    def test_purges_are_repeated_on_commit(self):
+        request = RequestFactory().get('/catalog/books/')
+        tags = [f'book:{self.book.pk}']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.copy.status = LoanStatus.ON_LOAN.value
+            self.copy.save()
+            # Rendered and stored from the uncommitted data's snapshot.
+            page_cache.cache_page(
+                request, HttpResponse('old'), tags,
+                time.time() + page_cache.CLOCK_SKEW,
+            )
+        self.assertIsNone(page_cache.get_cached_page(request))
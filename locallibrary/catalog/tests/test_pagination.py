@@ -0,0 +1,196 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog.constants import LoanStatus
+from catalog.models import Author, Book, BookInstance, CatalogStats
+from catalog.pagination import (
+    EstimatedCountPaginator, InvalidCursor, KeysetPaginator
+)
+
+
+class KeysetPaginatorTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='Big', last_name='Bob')
+        cls.book = Book.objects.create(
+            title='Test Book',
+            summary='Summary',
+            isbn='1234567890123',
+            author=author
+        )
+        # Repeated and missing due dates exercise the tie-breaker and the
+        # NULLS LAST handling.
+        due_dates = [date.today() + timedelta(days=i % 3) for i in range(7)]
+        due_dates += [None] * 4
+        for due_back in due_dates:
+            BookInstance.objects.create(book=cls.book, due_back=due_back)
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(
+            BookInstance.objects.all(), 3, ('due_back', 'id')
+        )
+
+    def walk_forward(self):
+        pages = [self.paginator.page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.page(pages[-1].next_cursor))
+        return pages
+
+    def test_forward_walk_visits_every_row_once_in_order(self):
+        pages = self.walk_forward()
+        rows = [copy for page in pages for copy in page]
+        self.assertEqual(len(pages), 4)
+        self.assertEqual(len(rows), 11)
+        self.assertEqual(len({copy.id for copy in rows}), 11)
+        dated = [copy.due_back for copy in rows if copy.due_back]
+        self.assertEqual(dated, sorted(dated))
+        self.assertEqual([copy.due_back for copy in rows[7:]], [None] * 4)
+
+    def test_previous_cursor_returns_preceding_page(self):
+        pages = self.walk_forward()
+        for before, after in zip(pages, pages[1:]):
+            previous = self.paginator.page(after.previous_cursor)
+            self.assertEqual(
+                [copy.id for copy in previous],
+                [copy.id for copy in before],
+            )
+        self.assertFalse(pages[0].has_previous())
+        self.assertFalse(pages[-1].has_next())
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            self.paginator.page('not-a-cursor')
+
+
+class KeysetListViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for author_id in range(13):
+            Author.objects.create(
+                first_name=f'Christian {author_id}',
+                last_name='Surname',
+            )
+
+    def setUp(self):
+        # Pages cached by an earlier test outlive its rolled back data.
+        cache.clear()
+
+    def test_first_page_links_to_next_cursor(self):
+        response = self.client.get(reverse('authors'))
+        page = response.context['page_obj']
+        self.assertTrue(response.context['is_paginated'])
+        self.assertEqual(len(response.context['author_list']), 10)
+        self.assertContains(response, f'?cursor={page.next_cursor}')
+
+    def test_next_and_previous_cursor(self):
+        first = self.client.get(reverse('authors')).context['page_obj']
+        response = self.client.get(
+            reverse('authors'), {'cursor': first.next_cursor}
+        )
+        second = response.context['page_obj']
+        self.assertEqual(len(response.context['author_list']), 3)
+        self.assertFalse(second.has_next())
+
+        response = self.client.get(
+            reverse('authors'), {'cursor': second.previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context['author_list']), list(first.object_list)
+        )
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(reverse('authors'), {'cursor': '!!'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_borrowed_list_pages_through_the_loan_summary(self):
+        user = User.objects.create_user(username='reader', password='pw')
+        author = Author.objects.first()
+        book = Book.objects.create(
+            title='Loaned',
+            summary='Summary',
+            isbn='1234567890123',
+            author=author
+        )
+        for days in range(12):
+            BookInstance.objects.create(
+                book=book,
+                borrower=user,
+                status=LoanStatus.ON_LOAN.value,
+                due_back=date.today() + timedelta(days=days),
+            )
+        self.client.force_login(user)
+        response = self.client.get(reverse('my-borrowed'))
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 10)
+        response = self.client.get(
+            reverse('my-borrowed'), {'page': page.next_page_number()}
+        )
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+
+@override_settings(PAGINATION_EXACT_COUNT_LIMIT=5)
+class EstimatedCountPaginatorTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='Big', last_name='Bob')
+        for number in range(8):
+            Book.objects.create(
+                title=f'Book {number}',
+                summary='Summary',
+                isbn=f'{number:013d}',
+                author=author
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unfiltered_count_comes_from_catalog_stats(self):
+        # Pretend the table is far bigger than the rows in the test.
+        CatalogStats.objects.update(num_books=1000)
+        paginator = EstimatedCountPaginator(Book.objects.order_by('pk'), 10)
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 1000)
+        self.assertTrue(paginator.count_is_estimated)
+        self.assertEqual(paginator.num_pages, 100)
+
+    def test_small_tables_are_counted_exactly(self):
+        paginator = EstimatedCountPaginator(Author.objects.order_by('pk'), 10)
+        self.assertEqual(paginator.count, 1)
+        self.assertFalse(paginator.count_is_estimated)
+
+    def test_selective_filter_is_counted_exactly(self):
+        paginator = EstimatedCountPaginator(
+            Book.objects.filter(title__in=['Book 1', 'Book 2']), 10
+        )
+        self.assertEqual(paginator.count, 2)
+        self.assertFalse(paginator.count_is_estimated)
+
+    def test_broad_filter_without_planner_estimate_is_exact(self):
+        # SQLite has no row estimates, and PostgreSQL's falls short of the
+        # rows already counted, so the capped count is not enough.
+        paginator = EstimatedCountPaginator(
+            Book.objects.filter(title__startswith='Book'), 10
+        )
+        self.assertEqual(paginator.count, 8)
+        self.assertFalse(paginator.count_is_estimated)
+
+    def test_book_list_says_about(self):
+        CatalogStats.objects.update(num_books=1000)
+        # Numbered pages are the ones with a count.
+        response = self.client.get(reverse('books'), {'page': 1})
+        self.assertTrue(response.context['paginator'].count_is_estimated)
+        self.assertContains(response, 'of about 100.')
+
+    def test_admin_changelist_says_about(self):
+        CatalogStats.objects.update(num_books=1000)
+        admin = User.objects.create_superuser('admin', password='pw')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:catalog_book_changelist'))
+        self.assertContains(response, 'about 1000 books')
@@ -0,0 +1,144 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog.constants import LoanStatus
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog.query_budget import (
+    QueryBudgetExceeded, QueryBudgetTestMixin, count_queries
+)
+from catalog.stats import get_catalog_stats
+
+
+class QueryBudgetTest(TestCase):
+
+    def test_overrun_raises_in_strict_mode(self):
+        with override_settings(QUERY_BUDGET_STRICT=True):
+            with self.assertRaises(QueryBudgetExceeded):
+                with count_queries(1, 'test'):
+                    list(Author.objects.all())
+                    list(Book.objects.all())
+
+    def test_overrun_logs_otherwise(self):
+        with override_settings(QUERY_BUDGET_STRICT=False):
+            with self.assertLogs('catalog.query_budget', 'WARNING'):
+                with count_queries(0, 'test') as counter:
+                    list(Author.objects.all())
+        self.assertEqual(counter.count, 1)
+
+
+class CatalogViewQueryBudgetTest(QueryBudgetTestMixin, TestCase):
+    """Every catalog view stays within its budget at any page size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='librarian', password='pw')
+        cls.user.user_permissions.add(
+            Permission.objects.get(codename='can_mark_returned')
+        )
+        cls.author = Author.objects.create(first_name='Big', last_name='Bob')
+        cls.genre = Genre.objects.create(name='Fantasy')
+
+    def add_books(self, count):
+        for i in range(count):
+            book = Book.objects.create(
+                title=f'Book {i}',
+                summary='Summary',
+                isbn=f'{Book.objects.count():013d}',
+                author=self.author
+            )
+            book.genre.add(self.genre)
+            BookInstance.objects.create(
+                book=book,
+                borrower=self.user,
+                status=LoanStatus.ON_LOAN.value,
+                due_back=date.today() + timedelta(days=i),
+            )
+
+    def urls(self):
+        book = Book.objects.last()
+        copy = book.bookinstance_set.get()
+        return [
+            reverse('index'),
+            reverse('books'),
+            reverse('book-detail', args=[book.pk]),
+            reverse('my-borrowed'),
+            reverse('renew-book-librarian', args=[copy.pk]),
+            reverse('authors'),
+            reverse('author-detail', args=[self.author.pk]),
+            reverse('author-create'),
+            reverse('author-update', args=[self.author.pk]),
+            reverse('author-delete', args=[self.author.pk]),
+            reverse('search') + '?q=book',
+        ]
+
+    def test_views_within_budget_for_small_and_full_pages(self):
+        get_catalog_stats()
+        self.client.force_login(self.user)
+        for count in (1, 20):
+            self.add_books(count)
+            for url in self.urls():
+                with self.subTest(url=url, books=count):
+                    response = self.assertWithinQueryBudget(url)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_returns_and_renewals_within_budget(self):
+        get_catalog_stats()
+        self.add_books(1)
+        copy = BookInstance.objects.get()
+        renew = reverse('renew-book-librarian', args=[copy.pk])
+        due_back = {'renewal_date': date.today() + timedelta(weeks=2)}
+        self.client.force_login(self.user)
+
+        response = self.assertWithinQueryBudget(renew, due_back, 'post')
+        self.assertEqual(response.status_code, 302)
+        response = self.assertWithinQueryBudget(
+            reverse('mark-returned', args=[copy.pk]), method='post'
+        )
+        self.assertEqual(response.status_code, 302)
+        # Renewing the copy just returned is refused on the form.
+        response = self.assertWithinQueryBudget(renew, due_back, 'post')
+        self.assertContains(response, 'no longer on loan')
+
+
+class AdminQueryCountTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', password='pw'
+        )
+        cls.author = Author.objects.create(first_name='Big', last_name='Bob')
+        cls.genre = Genre.objects.create(name='Fantasy')
+
+    def add_books(self, count):
+        for i in range(count):
+            book = Book.objects.create(
+                title=f'Book {i}',
+                summary='Summary',
+                isbn=f'{Book.objects.count():013d}',
+                author=self.author
+            )
+            book.genre.add(self.genre)
+            BookInstance.objects.create(book=book, imprint='Imprint')
+
+    def count_changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        self.client.force_login(self.admin)
+        for name in ('book', 'bookinstance'):
+            url = reverse(f'admin:catalog_{name}_changelist')
+            with self.subTest(changelist=name):
+                self.add_books(1)
+                few = self.count_changelist_queries(url)
+                self.add_books(10)
+                many = self.count_changelist_queries(url)
+                self.assertEqual(few, many)
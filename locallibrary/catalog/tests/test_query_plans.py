@@ -0,0 +1,39 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from catalog.models import Book
+from catalog.query_plans import explain, full_scans
+
+
+class ElsewhereRouter:
+    """Route writes to an alias that is not configured."""
+
+    def db_for_write(self, model, **hints):
+        return 'elsewhere'
+
+
+class QueryPlanTest(TestCase):
+
+    def test_every_view_query_uses_an_index(self):
+        out = StringIO()
+        call_command('check_query_plans', books=200, stdout=out)
+        self.assertIn('Every plan uses an index.', out.getvalue())
+        self.assertEqual(Book.objects.count(), 0)
+
+    @override_settings(
+        DATABASE_ROUTERS=['catalog.tests.test_query_plans.ElsewhereRouter']
+    )
+    def test_seed_stays_on_the_checked_database(self):
+        out = StringIO()
+        call_command(
+            'check_query_plans', books=20, database='default', stdout=out
+        )
+        self.assertIn('Every plan uses an index.', out.getvalue())
+        self.assertEqual(Book.objects.count(), 0)
+
+    def test_unindexed_filter_is_reported(self):
+        plan = explain(Book.objects.filter(summary='Summary'))
+        self.assertEqual(full_scans(plan, connection.vendor), ['catalog_book'])
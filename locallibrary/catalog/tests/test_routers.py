@@ -0,0 +1,139 @@
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase,
+    TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from catalog.loans import loan_summary
+from catalog.models import Author, Book, BookInstance
+from catalog.routers import (
+    STICKY_COOKIE, PrimaryReplicaRouter, ReplicaStickinessMiddleware,
+    check_replica, health, use_primary
+)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        health.reset()
+        self.addCleanup(health.reset)
+        # Record the replica as healthy so no check is made.
+        health.checked['replica1'] = (True, time.monotonic())
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_a_replica_and_writes_to_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Book), 'replica1')
+        self.assertEqual(self.router.db_for_write(Book), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'catalog'))
+
+    def test_select_for_update_uses_the_primary(self):
+        with self.settings(
+            DATABASE_ROUTERS=['catalog.routers.PrimaryReplicaRouter']
+        ):
+            self.assertEqual(Book.objects.all().db, 'replica1')
+            self.assertEqual(
+                BookInstance.objects.select_for_update().db, 'default'
+            )
+
+    def test_pinned_reads_use_the_primary(self):
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Book), 'default')
+        self.assertEqual(self.router.db_for_read(Book), 'replica1')
+
+    def test_unhealthy_replica_falls_back_to_the_primary(self):
+        health.checked['replica1'] = (False, time.monotonic())
+        self.assertEqual(self.router.db_for_read(Book), 'default')
+
+    def test_stale_check_is_repeated(self):
+        health.checked['replica1'] = (True, 0)
+        # There is no replica1 connection here, so the new check fails.
+        self.assertEqual(self.router.db_for_read(Book), 'default')
+        self.assertFalse(health.checked['replica1'][0])
+
+    def read_alias(self, request):
+        def get_response(request):
+            return HttpResponse(self.router.db_for_read(Book))
+
+        middleware = ReplicaStickinessMiddleware(get_response)
+        return middleware(request)
+
+    def test_writes_stick_to_the_primary(self):
+        factory = RequestFactory()
+        response = self.read_alias(factory.post('/catalog/author/create/'))
+        self.assertEqual(response.content, b'default')
+        cookie = response.cookies[STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], 10)
+
+        factory.cookies[STICKY_COOKIE] = cookie.value
+        response = self.read_alias(factory.get('/catalog/books/'))
+        self.assertEqual(response.content, b'default')
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+        factory.cookies[STICKY_COOKIE] = str(time.time() - 1)
+        response = self.read_alias(factory.get('/catalog/books/'))
+        self.assertEqual(response.content, b'replica1')
+
+
+    async def test_writes_stick_to_the_primary_under_asgi(self):
+        async def get_response(request):
+            return HttpResponse(self.router.db_for_read(Book))
+
+        middleware = ReplicaStickinessMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        factory = AsyncRequestFactory()
+        response = await middleware(factory.post('/catalog/author/create/'))
+        self.assertEqual(response.content, b'default')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        response = await middleware(factory.get('/catalog/books/'))
+        self.assertEqual(response.content, b'replica1')
+
+
+class ReplicaCheckTest(TestCase):
+
+    def test_check_replica(self):
+        self.assertTrue(check_replica('default'))
+        self.assertFalse(check_replica('missing'))
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_reads_in_a_transaction_use_the_primary(self):
+        health.checked['replica1'] = (True, time.monotonic())
+        self.addCleanup(health.reset)
+        # TestCase runs each test inside a transaction.
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(Book), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], PERMISSION_CACHE=True)
+class SharedCacheFillTest(TransactionTestCase):
+    """Shared cache entries are filled from the primary.
+
+    replica1 is recorded as healthy but has no connection, so any read
+    routed to it fails.
+    """
+
+    def setUp(self):
+        cache.clear()
+        health.reset()
+        self.addCleanup(health.reset)
+        health.checked['replica1'] = (True, time.monotonic())
+        with use_primary():
+            self.user = User.objects.create_user(username='reader')
+            self.book = Book.objects.create(
+                title='Test Book', summary='Summary', isbn='1234567890123',
+                author=Author.objects.create(first_name='Big', last_name='Bob'),
+            )
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(Book), 'replica1')
+
+    def test_page_cache_misses_read_the_primary(self):
+        response = self.client.get(reverse('book-detail', args=[self.book.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_loan_summaries_and_permissions_read_the_primary(self):
+        self.assertEqual(loan_summary(self.user).count, 0)
+        self.assertFalse(self.user.has_perm('catalog.can_mark_returned'))
@@ -0,0 +1,129 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.models import Author, Book, Genre
+from catalog.search import get_search_backend, search_books
+
+
+class SearchIndexTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(
+            first_name='Ursula',
+            last_name='Le Guin'
+        )
+        cls.genre = Genre.objects.create(name='Fantasy')
+        cls.book = Book.objects.create(
+            title='A Wizard of Earthsea',
+            summary='A young mage learns the true names of things.',
+            isbn='9780553383041',
+            author=cls.author
+        )
+        cls.book.genre.add(cls.genre)
+        cls.other = Book.objects.create(
+            title='The Dispossessed',
+            summary='A physicist travels between twin worlds. Wizard free.',
+            isbn='9780061054884',
+            author=cls.author
+        )
+
+    def titles(self, query):
+        return [result['book'].title for result in search_books(query)]
+
+    def test_matches_title_summary_author_and_genre(self):
+        self.assertEqual(self.titles('earthsea'), ['A Wizard of Earthsea'])
+        self.assertEqual(self.titles('physicist'), ['The Dispossessed'])
+        self.assertEqual(len(self.titles('guin')), 2)
+        self.assertEqual(self.titles('fantasy'), ['A Wizard of Earthsea'])
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(
+            self.titles('wizard'),
+            ['A Wizard of Earthsea', 'The Dispossessed'],
+        )
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        self.book.summary = '<b>Magic</b> & more at the edge of the world.'
+        self.book.save()
+        snippet = search_books('magic')[0]['snippet']
+        self.assertIn('<mark>Magic</mark>', snippet)
+        self.assertIn('&amp;', snippet)
+        # PostgreSQL's headline drops tags; the others keep them escaped.
+        self.assertNotIn('<b>', snippet)
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.titles('"wizard" (*'), self.titles('wizard'))
+        self.assertEqual(self.titles('  '), [])
+
+    def test_index_follows_updates(self):
+        self.author.last_name = 'Kroeber'
+        self.author.save()
+        self.assertEqual(len(self.titles('kroeber')), 2)
+
+        self.genre.name = 'Mythopoeia'
+        self.genre.save()
+        self.assertEqual(self.titles('mythopoeia'), ['A Wizard of Earthsea'])
+
+        self.book.genre.clear()
+        self.assertEqual(self.titles('mythopoeia'), [])
+
+        self.other.delete()
+        self.assertEqual(self.titles('physicist'), [])
+
+    def test_index_follows_related_deletes(self):
+        self.genre.delete()
+        self.assertEqual(self.titles('fantasy'), [])
+        self.author.delete()
+        self.assertEqual(self.titles('ursula'), [])
+
+    def test_rebuild_command(self):
+        get_search_backend().clear()
+        self.assertEqual(self.titles('earthsea'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=1, stdout=out)
+        self.assertIn('Indexed 2 books', out.getvalue())
+        self.assertEqual(self.titles('earthsea'), ['A Wizard of Earthsea'])
+
+    def test_rebuild_prunes_entries_of_missing_books(self):
+        backend = get_search_backend()
+        backend.index([(self.other.pk + 1000, 'Ghost', 'Gone.', '', '')])
+        self.assertEqual(len(backend.search('ghost', 10)), 1)
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(backend.search('ghost', 10), [])
+        self.assertEqual(self.titles('earthsea'), ['A Wizard of Earthsea'])
+
+
+class SearchViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='Frank', last_name='Herbert')
+        Book.objects.create(
+            title='Dune',
+            summary='Spice and sandworms on Arrakis.',
+            isbn='9780441013593',
+            author=author
+        )
+
+    def test_search_page(self):
+        response = self.client.get(reverse('search'), {'q': 'arrakis'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'catalog/search_results.html')
+        self.assertContains(response, '<mark>Arrakis</mark>')
+
+    def test_search_api(self):
+        response = self.client.get(reverse('api-search'), {'q': 'herbert'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['title'] for result in results], ['Dune'])
+        self.assertEqual(results[0]['author'], 'Herbert, Frank')
+
+    def test_search_api_rejects_bad_limit(self):
+        response = self.client.get(
+            reverse('api-search'), {'q': 'dune', 'limit': 'many'}
+        )
+        self.assertEqual(response.status_code, 400)
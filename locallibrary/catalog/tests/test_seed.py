@@ -0,0 +1,60 @@
+import random
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from catalog.models import Author, Book, BookInstance, CatalogStats
+from catalog.seed import zipf_sample
+from catalog.stats import count_catalog, reconcile_all_book_counters
+
+
+class SeedCatalogTest(TestCase):
+
+    def seed(self, **options):
+        out = StringIO()
+        call_command('seed_catalog', stdout=out, seed=1, batch_size=50,
+                     **options)
+        return out.getvalue()
+
+    def test_seeds_the_requested_counts(self):
+        output = self.seed(authors=20, books=200, genres=5,
+                           copies_per_book=2, users=10, loans=100)
+        self.assertIn('200 books, 400 copies', output)
+        self.assertEqual(Author.objects.count(), 20)
+        self.assertEqual(Book.objects.count(), 200)
+        self.assertEqual(BookInstance.objects.count(), 400)
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(
+            BookInstance.objects.on_loan().count(),
+            int(output.split(' loans')[0].rsplit(' ', 1)[1]),
+        )
+
+    def test_derived_data_is_in_sync(self):
+        self.seed(authors=5, books=50, users=5, loans=40)
+        self.assertEqual(reconcile_all_book_counters(), (50, 0))
+        stats = CatalogStats.objects.get()
+        for name, value in count_catalog().items():
+            self.assertEqual(getattr(stats, name), value)
+
+    def test_runs_add_to_the_catalog(self):
+        self.seed(books=10, loans=0)
+        self.seed(books=10, loans=0)
+        self.assertEqual(Book.objects.count(), 20)
+
+    def test_popularity_is_skewed(self):
+        self.seed(authors=50, books=500, loans=0)
+        counts = sorted(
+            Author.objects.annotate(n=Count('book')).values_list(
+                'n', flat=True
+            ),
+            reverse=True,
+        )
+        self.assertGreater(counts[0], 10 * counts[len(counts) // 2])
+
+    def test_zipf_sample_favours_the_first_items(self):
+        picks = zipf_sample(random.Random(0), ['a', 'b', 'c'], 1000, 1.0)
+        self.assertGreater(picks.count('a'), picks.count('c'))
+        self.assertEqual(zipf_sample(random.Random(0), [], 5, 1.0), [])
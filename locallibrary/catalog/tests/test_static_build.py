@@ -0,0 +1,84 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from catalog.static_build import UsedSelectors, trim_css, used_selectors
+
+
+def used(source):
+    selectors = UsedSelectors()
+    selectors.feed_template(source)
+    return selectors
+
+
+class TrimCssTest(SimpleTestCase):
+
+    def test_drops_rules_for_unused_classes_and_elements(self):
+        css = (
+            '/* header */ .row{display:flex}.lead{font-size:2rem}'
+            'h6{margin:0}p,samp{color:red}'
+        )
+        trimmed = trim_css(css, used('<p class="row">x</p>'))
+        self.assertEqual(trimmed, '.row{display:flex}\np{color:red}')
+
+    def test_media_queries_and_pseudo_classes(self):
+        css = (
+            '@media (min-width: 576px){.col-sm-2{flex:0}.col-lg-2{flex:1}}'
+            '@media print{.d-print{display:none}}'
+            'a:not([href]):not(.btn){color:inherit}'
+            '*,::before{box-sizing:border-box}'
+        )
+        trimmed = trim_css(css, used('<div class="col-sm-2"><a></a></div>'))
+        self.assertIn('@media (min-width: 576px){.col-sm-2{flex:0}}', trimmed)
+        self.assertNotIn('col-lg-2', trimmed)
+        self.assertNotIn('@media print', trimmed)
+        self.assertIn('a:not([href]):not(.btn){color:inherit}', trimmed)
+        self.assertIn('*,::before{box-sizing:border-box}', trimmed)
+
+    def test_classes_inside_template_tags_count(self):
+        selectors = used_selectors()
+        self.assertIn('text-danger', selectors.classes)
+        self.assertIn('sidebar-nav', selectors.classes)
+        self.assertIn('form', selectors.elements)
+
+    def test_markup_rendered_for_forms_counts(self):
+        selectors = used_selectors()
+        for element in ('th', 'td', 'label', 'input', 'select', 'textarea'):
+            self.assertIn(element, selectors.elements)
+        for name in ('errorlist', 'nonfield', 'helptext'):
+            self.assertIn(name, selectors.classes)
+        trimmed = trim_css('th{text-align:left}', selectors)
+        self.assertEqual(trimmed, 'th{text-align:left}')
+
+
+class BuildStaticTest(TestCase):
+
+    def test_build_trims_hashes_compresses_and_reports(self):
+        with tempfile.TemporaryDirectory() as static_root:
+            with override_settings(STATIC_ROOT=static_root):
+                out = StringIO()
+                call_command(
+                    'build_static', '--path', '/catalog/books/',
+                    verbosity=0, stdout=out,
+                )
+                bootstrap = staticfiles_storage.stored_name(
+                    'css/bootstrap.min.css'
+                )
+                path = staticfiles_storage.path(bootstrap)
+
+                self.assertNotEqual(bootstrap, 'css/bootstrap.min.css')
+                self.assertTrue(os.path.exists(path + '.gz'))
+                with open(path) as f:
+                    css = f.read()
+                self.assertNotIn('.display-1', css)
+                self.assertIn('.container-fluid', css)
+                self.assertIn('/catalog/books/', out.getvalue())
+                self.assertIn('saved', out.getvalue())
+                response = self.client.get('/catalog/books/')
+                self.assertContains(
+                    response, f'rel="stylesheet" href="/static/{bootstrap}"'
+                )
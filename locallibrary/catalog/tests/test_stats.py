@@ -0,0 +1,184 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.constants import LoanStatus
+from catalog.models import Author, Book, BookInstance, CatalogStats
+from catalog.stats import (
+    get_catalog_stats, rebuild_catalog_stats, reconcile_book_counters
+)
+
+
+class CatalogStatsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Big', last_name='Bob')
+        cls.book = Book.objects.create(
+            title='Test Book',
+            summary='Summary',
+            isbn='1234567890123',
+            author=cls.author
+        )
+        BookInstance.objects.create(
+            book=cls.book,
+            status=LoanStatus.AVAILABLE.value
+        )
+
+    def assertStats(self, **expected):
+        stats = CatalogStats.objects.get()
+        for field, value in expected.items():
+            self.assertEqual(getattr(stats, field), value, field)
+
+    def test_first_read_builds_counters(self):
+        CatalogStats.objects.all().delete()
+        stats = get_catalog_stats()
+        self.assertEqual(stats.num_books, 1)
+        self.assertEqual(stats.num_instances, 1)
+        self.assertEqual(stats.num_instances_available, 1)
+        self.assertEqual(stats.num_authors, 1)
+
+    def test_counters_follow_creates_and_deletes(self):
+        get_catalog_stats()
+        author = Author.objects.create(first_name='Jane', last_name='Roe')
+        book = Book.objects.create(
+            title='Other Book',
+            summary='Summary',
+            isbn='9876543210123',
+            author=author
+        )
+        copy = BookInstance.objects.create(
+            book=book,
+            status=LoanStatus.AVAILABLE.value
+        )
+        self.assertStats(
+            num_books=2,
+            num_instances=2,
+            num_instances_available=2,
+            num_authors=2,
+        )
+
+        copy.delete()
+        book.delete()
+        author.delete()
+        self.assertStats(
+            num_books=1,
+            num_instances=1,
+            num_instances_available=1,
+            num_authors=1,
+        )
+
+    def test_counters_follow_status_changes(self):
+        get_catalog_stats()
+        copy = BookInstance.objects.get()
+        copy.status = LoanStatus.ON_LOAN.value
+        copy.save()
+        self.assertStats(num_instances=1, num_instances_available=0)
+
+        copy.imprint = 'Second printing'
+        copy.save()
+        self.assertStats(num_instances_available=0)
+
+        copy = BookInstance.objects.get()
+        copy.status = LoanStatus.AVAILABLE.value
+        copy.save()
+        self.assertStats(num_instances_available=1)
+
+    def test_rebuild_fixes_drift(self):
+        stats = get_catalog_stats()
+        stats.num_books = 42
+        stats.save()
+        self.assertEqual(rebuild_catalog_stats().num_books, 1)
+
+    def test_rebuild_command(self):
+        out = StringIO()
+        call_command('rebuild_catalog_stats', stdout=out)
+        self.assertIn('1 books', out.getvalue())
+        self.assertStats(num_books=1, num_authors=1)
+
+    def test_index_reads_counters(self):
+        get_catalog_stats()
+        CatalogStats.objects.update(num_books=7)
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['num_books'], 7)
+
+
+class BookCountersTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = Book.objects.create(
+            title='Test Book',
+            summary='Summary',
+            isbn='1234567890123',
+        )
+        cls.other_book = Book.objects.create(
+            title='Other Book',
+            summary='Summary',
+            isbn='9876543210123',
+        )
+
+    def assertCounters(self, book, **expected):
+        book.refresh_from_db()
+        for field, value in expected.items():
+            self.assertEqual(getattr(book, field), value, field)
+
+    def test_counters_follow_copies(self):
+        copy = BookInstance.objects.create(
+            book=self.book, status=LoanStatus.AVAILABLE.value
+        )
+        BookInstance.objects.create(
+            book=self.book, status=LoanStatus.MAINTENANCE.value
+        )
+        self.assertCounters(
+            self.book, copies_total=2, copies_available=1,
+            copies_maintenance=1,
+        )
+
+        copy.status = LoanStatus.ON_LOAN.value
+        copy.save()
+        self.assertCounters(
+            self.book, copies_total=2, copies_available=0, copies_on_loan=1
+        )
+
+        copy.book = self.other_book
+        copy.save()
+        self.assertCounters(self.book, copies_total=1, copies_on_loan=0)
+        self.assertCounters(self.other_book, copies_total=1, copies_on_loan=1)
+
+        BookInstance.objects.get(pk=copy.pk).delete()
+        self.assertCounters(self.other_book, copies_total=0, copies_on_loan=0)
+
+    def test_saving_a_stale_book_keeps_counters(self):
+        stale = Book.objects.get(pk=self.book.pk)
+        BookInstance.objects.create(
+            book=self.book, status=LoanStatus.AVAILABLE.value
+        )
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertCounters(self.book, title='Renamed', copies_available=1)
+
+    def test_reconcile_fixes_drift(self):
+        BookInstance.objects.create(
+            book=self.book, status=LoanStatus.RESERVED.value
+        )
+        Book.objects.filter(pk=self.book.pk).update(
+            copies_total=5, copies_reserved=0
+        )
+        self.assertEqual(
+            reconcile_book_counters([self.book.pk, self.other_book.pk]), 1
+        )
+        self.assertCounters(self.book, copies_total=1, copies_reserved=1)
+
+        out = StringIO()
+        call_command('reconcile_book_counters', batch_size=1, stdout=out)
+        self.assertIn('Checked 2 books, fixed 0', out.getvalue())
+
+    def test_book_list_shows_availability(self):
+        BookInstance.objects.create(
+            book=self.book, status=LoanStatus.AVAILABLE.value
+        )
+        response = self.client.get(reverse('books'))
+        self.assertContains(response, '1 of 1 available')
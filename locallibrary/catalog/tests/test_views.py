@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
@@ -19,6 +20,10 @@ class AuthorListViewTest(TestCase):
                 last_name=f'Surname {author_id}',
                 )
 
+    def setUp(self):
+        # Pages cached by an earlier test outlive its rolled back data.
+        cache.clear()
+
     def test_view_url_exists_at_desired_location(self):
         response = self.client.get('/catalog/authors/')
         self.assertEqual(response.status_code, 200)
@@ -75,13 +80,11 @@ class IndexViewTest(TestCase):
         response = self.client.get(reverse('index'))
         self.assertTemplateUsed(response, 'index.html')
 
-    def test_session_visit_count_increments(self):
-        session = self.client.session
-        session['num_visits'] = 5
-        session.save()
-
+    def test_visit_count_increments(self):
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['num_visits'], 1)
         response = self.client.get(reverse('index'))
-        self.assertEqual(response.context['num_visits'], 5)
+        self.assertEqual(response.context['num_visits'], 2)
 
 
 class BookListViewTest(TestCase):
@@ -96,6 +99,10 @@ class BookListViewTest(TestCase):
                 author=author
             )
 
+    def setUp(self):
+        # Pages cached by an earlier test outlive its rolled back data.
+        cache.clear()
+
     def test_view_url_exists(self):
         response = self.client.get('/catalog/books/')
         self.assertEqual(response.status_code, 200)
@@ -137,6 +144,10 @@ class BookDetailViewTest(TestCase):
             status=LoanStatus.AVAILABLE.value
         )
 
+    def setUp(self):
+        # Pages cached by an earlier test outlive its rolled back data.
+        cache.clear()
+
     def test_view_url_exists(self):
         book = Book.objects.first()
         response = self.client.get(reverse('book-detail', args=[book.id]))
@@ -163,6 +174,10 @@ class AuthorDetailViewTest(TestCase):
             last_name='Doe'
         )
 
+    def setUp(self):
+        # Pages cached by an earlier test outlive its rolled back data.
+        cache.clear()
+
     def test_view_url_exists(self):
         response = self.client.get(reverse(
             'author-detail',
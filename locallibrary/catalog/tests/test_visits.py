@@ -0,0 +1,93 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog.models import CatalogStats
+from catalog.sessions import purge_expired_sessions
+from catalog.stats import get_catalog_stats
+from catalog.visits import PENDING_KEY, count_visit, flush_visits
+
+
+@override_settings(VISITS_WRITE_BEHIND=True)
+class VisitCountTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        get_catalog_stats()
+
+    def test_home_page_does_not_write_to_the_database(self):
+        # The stats row is the only thing read; no session is created.
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertFalse(Session.objects.exists())
+
+    def test_tampered_cookie_starts_over(self):
+        self.client.cookies['num_visits'] = '99'
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['num_visits'], 1)
+
+    def test_visits_are_written_behind(self):
+        for _ in range(3):
+            self.client.get(reverse('index'))
+        self.assertEqual(CatalogStats.objects.get().num_visits, 0)
+
+        self.assertEqual(flush_visits(), 3)
+        self.assertEqual(CatalogStats.objects.get().num_visits, 3)
+        self.assertEqual(flush_visits(), 0)
+
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['num_total_visits'], 3)
+
+    def test_flush_keeps_visits_counted_meanwhile(self):
+        count_visit()
+        count_visit()
+        cache.decr(PENDING_KEY, 1)
+        count_visit()
+        out = StringIO()
+        call_command('flush_visits', stdout=out)
+        self.assertIn('Flushed 2 visits', out.getvalue())
+
+    @override_settings(VISITS_WRITE_BEHIND=False)
+    def test_without_a_shared_cache_visits_go_to_the_row(self):
+        for _ in range(3):
+            self.client.get(reverse('index'))
+        self.assertEqual(CatalogStats.objects.get().num_visits, 3)
+        self.assertIsNone(cache.get(PENDING_KEY))
+        self.assertEqual(flush_visits(), 0)
+
+
+class PurgeSessionsTest(TestCase):
+
+    def create_session(self, expire_date):
+        session = SessionStore()
+        session['key'] = 'value'
+        session.create()
+        Session.objects.filter(session_key=session.session_key).update(
+            expire_date=expire_date
+        )
+
+    def test_purges_only_expired_sessions(self):
+        now = timezone.now()
+        for days in (1, 2, 3):
+            self.create_session(now - timedelta(days=days))
+        self.create_session(now + timedelta(days=1))
+
+        self.assertEqual(purge_expired_sessions(batch_size=2), 3)
+        self.assertEqual(Session.objects.count(), 1)
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies'
+    )
+    def test_command_skips_cookie_sessions(self):
+        out = StringIO()
+        call_command('purge_sessions', stdout=out)
+        self.assertIn('nothing to purge', out.getvalue())
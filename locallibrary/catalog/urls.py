@@ -1,12 +1,43 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
 
+# Serve the read views natively under ASGI; the sync views would each cost
+# a thread hop there.
+if settings.CATALOG_ASYNC_VIEWS:
+    read_views = {
+        'index': async_views.index,
+        'books': async_views.book_list,
+        'book-detail': async_views.book_detail,
+        'my-borrowed': async_views.loaned_books_by_user,
+        'authors': async_views.author_list,
+        'author-detail': async_views.author_detail,
+    }
+else:
+    read_views = {
+        'index': views.index,
+        'books': views.BookListView.as_view(),
+        'book-detail': views.BookDetailView.as_view(),
+        'my-borrowed': views.LoanedBooksByUserListView.as_view(),
+        'authors': views.AuthorListView.as_view(),
+        'author-detail': views.AuthorDetailView.as_view(),
+    }
 
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('books/', views.BookListView.as_view(), name='books'),
-    path('book/<int:pk>', views.BookDetailView.as_view(), name='book-detail'),
-    path('mybooks/', views.LoanedBooksByUserListView.as_view(), name='my-borrowed'),
+    path('', read_views['index'], name='index'),
+    path('books/', read_views['books'], name='books'),
+    path('search/', views.search, name='search'),
+    path('api/search/', api.search_api, name='api-search'),
+    path(
+        'api/circulation/', api.circulation_api, name='api-circulation'
+    ),
+    path('api/<str:resource>/', api.resource_api, name='api-resource'),
+    path('book/<int:pk>', read_views['book-detail'], name='book-detail'),
+    path('mybooks/', read_views['my-borrowed'], name='my-borrowed'),
+    path('book/<int:pk>/hold/', views.place_hold, name='place-hold'),
+    path(
+        'holds/<int:pk>/cancel/', views.cancel_hold, name='cancel-hold'
+    ),
     path(
         'books/<uuid:pk>/return/',
         views.MarkBookAsReturnedView.as_view(),
@@ -17,13 +48,18 @@ urlpatterns = [
         views.renew_book_librarian,
         name='renew-book-librarian'
     ),
-    path('authors/', views.AuthorListView.as_view(), name='authors'),
+    path('authors/', read_views['authors'], name='authors'),
     path(
         "author/<int:pk>/",
-        views.AuthorDetailView.as_view(),
+        read_views['author-detail'],
         name="author-detail",
     ),
     path('author/create/', views.AuthorCreate.as_view(), name='author-create'),
     path('author/<int:pk>/update/', views.AuthorUpdate.as_view(), name='author-update'),
     path('author/<int:pk>/delete/', views.AuthorDelete.as_view(), name='author-delete'),
+    path(
+        'export/<str:kind>.<str:fmt>',
+        views.export_catalog,
+        name='export-catalog',
+    ),
 ]
@@ -1,54 +1,78 @@
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render, get_object_or_404, redirect
 from django.views import generic, View
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.core.exceptions import ValidationError
-from django.http import HttpResponseRedirect
+from django.http import (
+    Http404, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseRedirect,
+    StreamingHttpResponse
+)
 from django.urls import reverse, reverse_lazy
+from django.views.decorators.http import require_POST
 from django.utils.translation import gettext_lazy as _
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 
 from catalog.models import Book, Author, BookInstance, Genre
 from catalog.constants import LoanStatus, PAGINATION_SIZE
+from catalog.conditional import (
+    ConditionalGetMixin, latest_change, object_change
+)
+from catalog.exports import (
+    CONTENT_TYPES, EXPORTS, ExportError, parse_filters, stream_export
+)
 from catalog.forms import RenewBookForm
+from catalog import circulation, holds, page_cache
+from catalog.loans import loan_summary
+from catalog.page_cache import PageCacheMixin
+from catalog.pagination import (
+    EstimatedCountPaginator, KeysetPaginationMixin
+)
+from catalog.query_budget import QueryBudgetMixin, query_budget
+from catalog.search import search_books
+from catalog.stats import get_catalog_stats
+from catalog.visits import count_visit, remember_visit, visitor_visits
 
 import datetime
 
+# One more than the page reads: without VISITS_WRITE_BEHIND, count_visit()
+# updates the stats row.
+@query_budget(4)
 def index(request):
     """View function for home page of site."""
 
-    # Generate counts of some of the main objects
-    num_books = Book.objects.count()
-    num_instances = BookInstance.objects.count()
+    # Counts of the main objects, maintained by signals in catalog.signals
+    stats = get_catalog_stats()
 
-    # Available books (status = 'a')
-    num_instances_available = BookInstance.objects.filter(
-        status__exact=LoanStatus.AVAILABLE.value
-    ).count()
-
-    # The 'all()' is implied by default.
-    num_authors = Author.objects.count()
-
-    # Number of visits to this view, as counted in the session variable.
-    num_visits = request.session.get('num_visits', 1)
-    request.session['num_visits'] = num_visits + 1
+    # Number of visits to this view, counted in a signed cookie rather than
+    # the session so that the page does not create one.
+    num_visits = visitor_visits(request)
+    count_visit()
 
     context = {
-        'num_books': num_books,
-        'num_instances': num_instances,
-        'num_instances_available': num_instances_available,
-        'num_authors': num_authors,
+        'num_books': stats.num_books,
+        'num_instances': stats.num_instances,
+        'num_instances_available': stats.num_instances_available,
+        'num_authors': stats.num_authors,
         'num_visits': num_visits,
+        'num_total_visits': stats.num_visits,
     }
 
     # Render the HTML template index.html with the data in the context variable
-    return render(request, 'index.html', context=context)
+    response = render(request, 'index.html', context=context)
+    return remember_visit(response, num_visits)
 
 
-class BookListView(generic.ListView):
+class BookListView(
+    PageCacheMixin, ConditionalGetMixin, QueryBudgetMixin,
+    KeysetPaginationMixin, generic.ListView
+):
 
     model = Book
+    queryset = Book.objects.select_related('author').order_by('title', 'id')
+    query_budget = 3
     paginate_by = PAGINATION_SIZE
+    paginator_class = EstimatedCountPaginator
+    keyset_ordering = ('title', 'id')
     context_object_name = 'book_list'
     template_name = 'catalog/book_list.html'
 
@@ -59,13 +83,34 @@ class BookListView(generic.ListView):
         context['some_data'] = 'This is just some data'
         return context
 
+    def get_last_modified(self):
+        return latest_change(Book)
+
+    def get_page_cache_tags(self, context):
+        return page_cache.book_list_tags(context)
+
+
+@query_budget(4)
+def search(request):
+    """View function for full-text search over the catalog."""
+    query = request.GET.get('q', '')
+    context = {
+        'query': query,
+        'results': search_books(query, limit=PAGINATION_SIZE * 2),
+    }
+    return render(request, 'catalog/search_results.html', context=context)
+
 
-class BookDetailView(generic.DetailView):
+class BookDetailView(
+    PageCacheMixin, ConditionalGetMixin, QueryBudgetMixin, generic.DetailView
+):
     model = Book
+    queryset = Book.objects.select_related('author').prefetch_related('genre')
+    query_budget = 7
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        book_instances = self.object.bookinstance_set.select_related().all()
+        book_instances = self.object.bookinstance_set.all()
         
         # Add a flag to each book instance to indicate if it is available
         for copy in book_instances:
@@ -78,6 +123,11 @@ class BookDetailView(generic.DetailView):
 
         return context
 
+    def get_last_modified(self):
+        return object_change(Book, self.kwargs['pk'])
+
+    def get_page_cache_tags(self, context):
+        return page_cache.book_detail_tags(context)
 
     def book_detail_view(request, primary_key):
         book = get_object_or_404(Book, pk=primary_key)
@@ -93,27 +143,59 @@ class BookDetailView(generic.DetailView):
             context=context
         )
 
-class LoanedBooksByUserListView(generic.ListView):
+class LoanedBooksByUserListView(
+    QueryBudgetMixin, LoginRequiredMixin, generic.ListView
+):
 
     model = BookInstance
     template_name = "catalog/bookinstance_list_borrowed_user.html"
+    context_object_name = "bookinstance_list"
+    query_budget = 4
     paginate_by = PAGINATION_SIZE
 
     def get_queryset(self):
-        """Return the books on loan to the current user."""
-        return (
-            BookInstance.objects.filter(
-                borrower=self.request.user,
-                status__exact=LoanStatus.ON_LOAN.value
-            ).order_by("due_back")
-        )
+        """Return the books on loan to the current user, from the cache."""
+        self.loan_summary = loan_summary(self.request.user)
+        return self.loan_summary.loans
 
-class MarkBookAsReturnedView(PermissionRequiredMixin, View):
+    def get_context_data(self, **kwargs):
+        """Add the user's holds, with their places in the queues."""
+        context = super().get_context_data(**kwargs)
+        context["loan_summary"] = self.loan_summary
+        context["holds"] = holds.patron_holds(self.request.user)
+        return context
+
+
+@require_POST
+@login_required
+def place_hold(request, pk):
+    """Queue the user for the next copy of a book."""
+    book = get_object_or_404(Book, pk=pk)
+    try:
+        holds.place_hold(request.user, book)
+    except holds.HoldError as e:
+        return HttpResponseBadRequest(str(e))
+    return HttpResponseRedirect(reverse("my-borrowed"))
+
+
+@require_POST
+@login_required
+def cancel_hold(request, pk):
+    try:
+        holds.cancel_hold(request.user, pk)
+    except holds.HoldError:
+        raise Http404(_("No such hold."))
+    return HttpResponseRedirect(reverse("my-borrowed"))
+
+class MarkBookAsReturnedView(QueryBudgetMixin, PermissionRequiredMixin, View):
 
     permission_required = "catalog.can_mark_returned"
+    query_budget = 7
 
     def get(self, request, *args, **kwargs):
-        book_instance = get_object_or_404(BookInstance, pk=kwargs["pk"])
+        book_instance = get_object_or_404(
+            BookInstance.objects.select_related("book"), pk=kwargs["pk"]
+        )
         return render(
             request,
             "catalog/bookinstance_mark_as_returned.html",
@@ -124,48 +206,60 @@ class MarkBookAsReturnedView(PermissionRequiredMixin, View):
 
     def post(self, request, *args, **kwargs):
         """Process the form submission (confirm return)."""
-        book_instance = get_object_or_404(BookInstance, pk=kwargs["pk"])
-        book_instance.status = LoanStatus.AVAILABLE.value
-        book_instance.borrower = None
-        book_instance.save()
+        book_instance = get_object_or_404(
+            BookInstance.objects.only("book_id", "borrower_id"),
+            pk=kwargs["pk"],
+        )
+        # A copy another desk has just returned is left as it is.
+        circulation.return_copy(
+            book_instance.pk, book_instance.book_id, book_instance.borrower_id
+        )
 
         # Redirect to the book detail page after returning
-        return redirect("book-detail", pk=book_instance.book.pk)
+        return redirect("book-detail", pk=book_instance.book_id)
 
 
+@query_budget(3)
 @login_required
 def my_borrowed_books(request):
-    borrowed_books = BookInstance.objects.filter(
-        borrower=request.user,
-        status=LoanStatus.ON_LOAN.value
-    )
+    summary = loan_summary(request.user)
     context = {
-        'borrowed_books': borrowed_books,
+        'loan_summary': summary,
+        'borrowed_books': summary.loans,
         'LoanStatus': LoanStatus,
     }
     return render(request, 'catalog/my_borrowed_books.html', context=context)
 
-class AuthorCreate(CreateView):
+class AuthorCreate(QueryBudgetMixin, CreateView):
     model = Author
+    query_budget = 4
     fields = ['first_name', 'last_name', 'date_of_birth', 'date_of_death']
     initial = {'date_of_death': '11/06/2020'}
 
-class AuthorUpdate(UpdateView):
+class AuthorUpdate(QueryBudgetMixin, UpdateView):
     model = Author
+    query_budget = 8
     fields = ['first_name', 'last_name', 'date_of_birth', 'date_of_death']
 
-class AuthorDelete(DeleteView):
+class AuthorDelete(QueryBudgetMixin, DeleteView):
     model = Author
+    query_budget = 10
     success_url = reverse_lazy('authors')
 
-class AuthorListView(generic.ListView):
+class AuthorListView(
+    PageCacheMixin, ConditionalGetMixin, QueryBudgetMixin,
+    KeysetPaginationMixin, generic.ListView
+):
     """Generic class-based view for a list of authors."""
 
     model = Author
+    query_budget = 5
     paginate_by = PAGINATION_SIZE
+    paginator_class = EstimatedCountPaginator
     context_object_name = "author_list"
     template_name = "catalog/author_list.html"
-    queryset = Author.objects.all().order_by("last_name", "first_name")
+    queryset = Author.objects.all().order_by("last_name", "first_name", "id")
+    keyset_ordering = ("last_name", "first_name", "id")
 
     def get_context_data(self, **kwargs):
         """Add additional context data to the view."""
@@ -175,10 +269,19 @@ class AuthorListView(generic.ListView):
         )
         return context
 
-class AuthorDetailView(generic.DetailView):
+    def get_last_modified(self):
+        return latest_change(Author)
+
+    def get_page_cache_tags(self, context):
+        return page_cache.author_list_tags(context)
+
+class AuthorDetailView(
+    PageCacheMixin, ConditionalGetMixin, QueryBudgetMixin, generic.DetailView
+):
     """Generic class-based view for an author detail page."""
 
     model = Author
+    query_budget = 6
 
     def get_context_data(self, **kwargs):
         """Add additional context data to the view."""
@@ -194,36 +297,50 @@ class AuthorDetailView(generic.DetailView):
         )
         return context
 
+    def get_last_modified(self):
+        return object_change(Author, self.kwargs['pk'])
+
+    def get_page_cache_tags(self, context):
+        return page_cache.author_detail_tags(context)
+
 
+@query_budget(7)
 @login_required
 @permission_required('catalog.can_mark_returned', raise_exception=True)
 def mark_book_returned(request, bookinstance_id):
-    bookinstance = get_object_or_404(BookInstance, id=bookinstance_id)
+    bookinstance = get_object_or_404(
+        BookInstance.objects.only('book_id', 'borrower_id'), id=bookinstance_id
+    )
     if request.method == 'POST':
-        bookinstance.status = LoanStatus.AVAILABLE.value
-        bookinstance.borrower = None
-        bookinstance.due_date = None
-        bookinstance.save()
+        circulation.return_copy(
+            bookinstance.pk, bookinstance.book_id, bookinstance.borrower_id
+        )
     return redirect('catalog:my_borrowed_books')
 
 
+@query_budget(6)
 @login_required
 @permission_required('catalog.can_mark_returned', raise_exception=True)
 def renew_book_librarian(request, pk):
     """View function for renewing a specific BookInstance by librarian."""
     
-    book_instance = get_object_or_404(BookInstance, pk=pk)
+    book_instance = get_object_or_404(
+        BookInstance.objects.select_related('book', 'borrower'), pk=pk
+    )
     
     # If this is a POST request then process the Form data
     if request.method == 'POST':
         form = RenewBookForm(request.POST)
         # Check if the form is valid:
         if form.is_valid():
-        # process the data in form.cleaned_data as required (here we just write it to the modeldue_back field)
-            book_instance.due_back = form.cleaned_data['renewal_date']
-            book_instance.save()
-
-            return HttpResponseRedirect(reverse('my-borrowed') )
+            # Only the due date is written, and only while still on loan.
+            renewed = circulation.renew_copy(
+                book_instance.pk, form.cleaned_data['renewal_date'],
+                book_instance.book_id, book_instance.borrower_id,
+            )
+            if renewed:
+                return HttpResponseRedirect(reverse('my-borrowed'))
+            form.add_error(None, _('This copy is no longer on loan.'))
 
     # If this is a GET (or any other method) create the default form.
     else:
@@ -236,3 +353,27 @@ def renew_book_librarian(request, pk):
     }
 
     return render(request, 'catalog/book_renew_librarian.html', context)
+
+
+@login_required
+def export_catalog(request, kind, fmt):
+    """Stream books, authors or copies as CSV or JSON Lines."""
+    export = EXPORTS.get(kind)
+    if export is None or fmt not in CONTENT_TYPES:
+        raise Http404(_('Unknown export.'))
+    if not request.user.has_perm(
+        f'catalog.view_{export.model._meta.model_name}'
+    ):
+        return HttpResponseForbidden()
+    try:
+        filters = parse_filters(kind, request.GET)
+    except ExportError as e:
+        return HttpResponseBadRequest(str(e))
+
+    response = StreamingHttpResponse(
+        stream_export(kind, fmt, filters), content_type=CONTENT_TYPES[fmt]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{kind}.{fmt}"'
+    )
+    return response
@@ -0,0 +1,78 @@
+"""Home page visit counting without a database write per request.
+
+Each visitor's own count travels in a signed cookie, so viewing the home
+page neither creates nor saves a session. With VISITS_WRITE_BEHIND on,
+the site-wide total is incremented in the cache and written behind to
+``CatalogStats.num_visits`` by flush_visits(), which the flush_visits
+command runs periodically. That needs a cache shared by every worker and
+the command; otherwise each visit is added to the row as it happens.
+"""
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import F
+
+from catalog.models import CatalogStats
+from catalog.stats import STATS_PK
+
+VISITS_COOKIE = 'num_visits'
+VISITS_SALT = 'catalog.visits'
+VISITS_MAX_AGE = 365 * 24 * 60 * 60
+PENDING_KEY = 'visits:pending'
+
+
+def visitor_visits(request):
+    """Return this visit's number for the visitor, starting at 1."""
+    try:
+        return int(request.get_signed_cookie(
+            VISITS_COOKIE, salt=VISITS_SALT, max_age=VISITS_MAX_AGE
+        ))
+    except (KeyError, signing.BadSignature, ValueError):
+        return 1
+
+
+def remember_visit(response, num_visits):
+    """Store the visitor's next visit number on the response."""
+    response.set_signed_cookie(
+        VISITS_COOKIE, num_visits + 1, salt=VISITS_SALT,
+        max_age=VISITS_MAX_AGE, httponly=True, samesite='Lax',
+    )
+    return response
+
+
+def count_visit():
+    """Add one visit to the pending total, or to the stats row."""
+    if not getattr(settings, 'VISITS_WRITE_BEHIND', False):
+        CatalogStats.objects.filter(pk=STATS_PK).update(
+            num_visits=F('num_visits') + 1
+        )
+        return
+    try:
+        cache.incr(PENDING_KEY)
+    except ValueError:
+        # First visit since the last flush; if another request created
+        # the key in the meantime, add() fails and we increment after all.
+        if not cache.add(PENDING_KEY, 1, timeout=None):
+            cache.incr(PENDING_KEY)
+
+
+def flush_visits():
+    """Move the pending visits into the stats row; return how many.
+
+    The pending count is decremented rather than deleted, so visits
+    counted while the flush runs stay pending for the next one.
+    """
+    pending = cache.get(PENDING_KEY) or 0
+    if not pending:
+        return 0
+    try:
+        cache.decr(PENDING_KEY, pending)
+    except ValueError:
+        # The key expired or was evicted since it was read.
+        return 0
+    # updated_at is left alone: it tells conditional GETs when the catalog
+    # itself last changed.
+    CatalogStats.objects.filter(pk=STATS_PK).update(
+        num_visits=F('num_visits') + pending
+    )
+    return pending
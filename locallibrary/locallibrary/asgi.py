@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'locallibrary.settings')
+# Read by locallibrary.database to choose connection reuse defaults.
+os.environ['DJANGO_ASGI'] = 'True'
 
 application = get_asgi_application()
@@ -0,0 +1,226 @@
+"""Connection pooling and reuse for the DATABASES settings.
+
+PostgreSQL connections come from a psycopg pool per process. Django has
+no pool for MySQL, so MySQL goes through the locallibrary.mysql_pool
+backend, which keeps a ConnectionPool from this module per process with
+the same options and statistics. With DB_POOL=False each thread keeps its
+connection open for ``DB_CONN_MAX_AGE`` seconds instead; that defaults to
+0 under ASGI, where requests do not reuse threads. Either way connections
+are health checked before they are reused.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+POOL_ENGINES = {
+    'django.db.backends.postgresql': 'django.db.backends.postgresql',
+    'django.db.backends.mysql': 'locallibrary.mysql_pool',
+}
+NETWORK_ENGINES = (
+    'django.db.backends.postgresql', 'django.db.backends.mysql',
+)
+
+
+def pool_options():
+    """Keyword arguments for psycopg_pool.ConnectionPool."""
+    return {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        # Seconds a request waits for a free connection before failing.
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '600')),
+        'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),
+    }
+
+
+def default_conn_max_age():
+    """Seconds to keep an unpooled connection; none under ASGI.
+
+    An ASGI server runs each request's database work in whichever thread
+    is free, so a persistent connection is left open per thread rather
+    than per worker. locallibrary.asgi sets DJANGO_ASGI.
+    """
+    return '0' if os.getenv('DJANGO_ASGI') == 'True' else '600'
+
+
+def with_connection_reuse(config):
+    """Return a copy of one DATABASES entry set up to reuse connections."""
+    config = dict(config)
+    options = dict(config.get('OPTIONS', {}))
+    engine = config.get('ENGINE')
+    pooled = (
+        engine in POOL_ENGINES
+        and os.getenv('DB_POOL', 'True') == 'True'
+    )
+    if pooled:
+        config['ENGINE'] = POOL_ENGINES[engine]
+        options['pool'] = pool_options()
+        # Django requires this with a pool; the pool keeps them open.
+        config['CONN_MAX_AGE'] = 0
+    else:
+        config['CONN_MAX_AGE'] = int(
+            os.getenv('DB_CONN_MAX_AGE', default_conn_max_age())
+        )
+    config['CONN_HEALTH_CHECKS'] = True
+    if engine in NETWORK_ENGINES:
+        options.setdefault(
+            'connect_timeout', int(os.getenv('DB_CONNECT_TIMEOUT', '10'))
+        )
+    config['OPTIONS'] = options
+    return config
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool's timeout."""
+
+
+class ConnectionPool:
+    """A thread-safe pool of DB-API connections for one database.
+
+    Its options and get_stats() keys follow psycopg_pool's, so both kinds
+    of pool are reported alike in /metrics. Idle connections are handed
+    out most recently used first, after ``check`` confirms they still
+    work; ones idle longer than ``max_idle`` (beyond ``min_size``) or
+    older than ``max_lifetime`` are closed instead.
+    """
+
+    def __init__(self, connect, check=None, min_size=2, max_size=10,
+                 timeout=10.0, max_idle=600.0, max_lifetime=3600.0):
+        self.connect = connect
+        self.check = check
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.condition = threading.Condition()
+        # (connection, opened at, returned at), most recent last.
+        self.idle = deque()
+        self.opened_at = {}
+        self.size = 0
+        self.waiting = 0
+        self.requests_num = 0
+        self.requests_wait_ms = 0
+        self.requests_errors = 0
+        self.connections_num = 0
+
+    def getconn(self):
+        """Check out a connection, opening one if the pool has room."""
+        while True:
+            conn = self.take()
+            if conn is None:
+                return self.open()
+            if self.check is None or self.usable(conn):
+                return conn
+            self.discard(conn)
+
+    def take(self):
+        """An idle connection, or None once room is reserved for one."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self.condition:
+            self.waiting += 1
+            try:
+                while True:
+                    self.prune()
+                    if self.idle:
+                        conn, opened_at, _ = self.idle.pop()
+                        if time.monotonic() - opened_at >= self.max_lifetime:
+                            self.drop(conn)
+                            continue
+                        break
+                    if self.size < self.max_size:
+                        self.size += 1
+                        conn = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.requests_errors += 1
+                        raise PoolTimeout(
+                            f'No connection free after {self.timeout}s.'
+                        )
+                    self.condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.requests_num += 1
+            self.requests_wait_ms += int(
+                (time.monotonic() - started) * 1000
+            )
+            return conn
+
+    def open(self):
+        try:
+            conn = self.connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.opened_at[id(conn)] = time.monotonic()
+            self.connections_num += 1
+        return conn
+
+    def usable(self, conn):
+        try:
+            self.check(conn)
+        except Exception:
+            return False
+        return True
+
+    def putconn(self, conn):
+        """Return a connection, closing it if it is too old."""
+        now = time.monotonic()
+        with self.condition:
+            opened_at = self.opened_at.get(id(conn), now)
+            if now - opened_at < self.max_lifetime:
+                self.idle.append((conn, opened_at, now))
+                self.condition.notify()
+                return
+        self.discard(conn)
+
+    def discard(self, conn):
+        """Close a connection and give its place back to the pool."""
+        with self.condition:
+            self.drop(conn)
+
+    def drop(self, conn):
+        # Called with the condition held.
+        self.opened_at.pop(id(conn), None)
+        self.size -= 1
+        self.condition.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def prune(self):
+        # Called with the condition held; the oldest returns come first.
+        now = time.monotonic()
+        while self.idle and self.size > self.min_size:
+            conn, opened_at, returned_at = self.idle[0]
+            if now - returned_at < self.max_idle:
+                break
+            self.idle.popleft()
+            self.drop(conn)
+
+    def close(self):
+        """Close the idle connections."""
+        with self.condition:
+            while self.idle:
+                self.drop(self.idle.popleft()[0])
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                'pool_min': self.min_size,
+                'pool_max': self.max_size,
+                'pool_size': self.size,
+                'pool_available': len(self.idle),
+                'requests_waiting': self.waiting,
+                'requests_num': self.requests_num,
+                'requests_wait_ms': self.requests_wait_ms,
+                'requests_errors': self.requests_errors,
+                'connections_num': self.connections_num,
+            }
@@ -0,0 +1,79 @@
+"""Django's MySQL backend, taking its connections from a pool.
+
+Set up by locallibrary.database.with_connection_reuse, which passes the
+pool options in ``OPTIONS['pool']`` as for PostgreSQL. Like Django's
+PostgreSQL pool, there is one pool per database alias and process, kept
+in ``_connection_pools`` where catalog.metrics finds it.
+"""
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.mysql import base
+
+from locallibrary.database import ConnectionPool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    _connection_pools = {}
+    _pools_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        options = self.settings_dict['OPTIONS'].get('pool')
+        if not options:
+            return None
+        with self._pools_lock:
+            if self.alias not in self._connection_pools:
+                if self.settings_dict.get('CONN_MAX_AGE', 0) != 0:
+                    raise ImproperlyConfigured(
+                        "Pooling doesn't support persistent connections."
+                    )
+                params = self.get_connection_params()
+                check = (
+                    ping if self.settings_dict['CONN_HEALTH_CHECKS']
+                    else None
+                )
+                self._connection_pools[self.alias] = ConnectionPool(
+                    lambda: base.Database.connect(**params),
+                    check=check,
+                    **({} if options is True else options),
+                )
+        return self._connection_pools[self.alias]
+
+    def close_pool(self):
+        pool = self.pool
+        if pool is not None:
+            pool.close()
+            del self._connection_pools[self.alias]
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection = pool.getconn()
+        if connection.encoders.get(bytes) is bytes:
+            connection.encoders.pop(bytes)
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if self.connection is None or pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            try:
+                # Leave nothing half done for the next request.
+                self.connection.rollback()
+            except base.Database.Error:
+                pool.discard(self.connection)
+            else:
+                pool.putconn(self.connection)
+            self.connection = None
+
+
+def ping(connection):
+    connection.ping()
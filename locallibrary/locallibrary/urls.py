@@ -5,9 +5,12 @@ from django.views.generic.base import RedirectView
 from django.conf import settings
 from django.conf.urls.static import static
 
+from catalog.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('catalog/', include('catalog.urls')),
     path('', RedirectView.as_view(url='catalog/')),
     path('accounts/', include('django.contrib.auth.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)